@@ -1,25 +1,58 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, send_file
+from flask import (Flask, Response, render_template, jsonify, request, redirect, url_for, flash, send_file, g,
+                   has_request_context, make_response, session, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
+from markupsafe import escape, Markup
+from functools import wraps
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from datetime import datetime, timedelta
 import os
 import secrets
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import time
 from werkzeug.security import generate_password_hash, check_password_hash
-import qrcode
-from PIL import Image
 import io
-import requests # New import for fetching images from Cloudinary
 
 from werkzeug.utils import secure_filename
 import uuid
 from flask_wtf.csrf import generate_csrf # New import for CSRF token
-import cloudinary
-import cloudinary.uploader
-from cloudinary.utils import cloudinary_url
 from dotenv import load_dotenv
+from config import config as config_classes
+from search_utils import init_search_index, detect_search_index, apply_search
+from geo_utils import (geohash_encode, geohash_center, geohash_cell_size,
+                       parse_bbox, precision_for_zoom, CLUSTER_PRECISIONS, POINTS_MIN_ZOOM)
+from spatial_utils import init_spatial_index, detect_spatial_index, filter_bbox, filter_radius, nearest
+from migration_utils import applied_versions, has_table, migrate, stamp
+from migrations import MIGRATIONS
+from engine_utils import engine_options, pool_status, set_statement_timeout
+from sqlite_utils import SqliteWriterLock, set_sqlite_pragmas, sqlite_maintenance, sqlite_path
+from replica_utils import REPLICA_BIND_PREFIX, ReplicaRouter, RoutingSession
+from pagination_utils import encode_cursor, decode_cursor, keyset_paginate, KeysetPage
+from jobs_utils import work as run_job_worker, backoff_delay, worker_id, PermanentJobError, STALE_LOCK_SECONDS
+from pdf_utils import PdfArtifactCache, pdf_content_key
+from asset_utils import AssetFetcher
+from view_utils import ViewCounter, is_bot, visitor_key
+from notify_utils import NotificationBroker
+from user_cache_utils import UserIdentityCache
+from image_utils import (make_renditions, make_avatar, parse_renditions, srcset, pick_rendition, image_dhash,
+                         UnreadableImage, CARD_SIZES, DETAIL_SIZES)
+from export_utils import EXPORT_FORMATS, EXPORT_WRITERS, EXPORT_BATCH_SIZE
+from http_cache_utils import LRUCache, make_etag, RESPONSE_CACHE_MAX_BYTES, FRAGMENT_CACHE_MAX_BYTES
+from image_hash_utils import ImageHashIndex, hamming, image_similarity, DUPLICATE_DISTANCE, IMAGE_MATCH_DISTANCE
+from concurrent.futures import ThreadPoolExecutor
+from mailer_utils import SmtpConnection, build_message, group_digests
+from stats_utils import (STATS_CACHE_TTL, TTLCache, signalement_counter_keys,
+                         counters_from_groups, stats_from_counters)
+from matching_utils import (COMPLEMENTARY_TYPES, DATE_WINDOW_DAYS, MATCH_THRESHOLD, MAX_DISTANCE_KM,
+                            to_record, score_candidates, rematch_all)
+import atexit
+import click
+import hashlib
+import json
+from collections import defaultdict
+from sqlalchemy.orm import Session, load_only, selectinload, with_expression, make_transient_to_detached
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 load_dotenv() # Load environment variables from .env file
 
@@ -38,16 +71,8 @@ def nl2br(value):
 # Ajoutez le filtre à Jinja
 app.jinja_env.filters['nl2br'] = nl2br
 
-# Cloudinary Configuration
+# Cloudinary : configuré depuis CLOUDINARY_URL au premier envoi (import différé)
 CLOUDINARY_URL = os.environ.get('CLOUDINARY_URL')
-if not CLOUDINARY_URL:
-    print("CRITICAL: CLOUDINARY_URL environment variable is not set. Cloudinary uploads will fail.")
-else:
-    try:
-        cloudinary.config(secure=True) # Configure from CLOUDINARY_URL environment variable
-        print("Cloudinary configured from CLOUDINARY_URL.")
-    except Exception as e:
-        print(f"CRITICAL: Error configuring Cloudinary from CLOUDINARY_URL: {e}. Check format.")
 
 
 def upload_to_cloudinary(file_stream, folder_name, public_id=None):
@@ -62,6 +87,10 @@ def upload_to_cloudinary(file_stream, folder_name, public_id=None):
         print("Cloudinary not configured. Cannot upload file.")
         return None
     try:
+        import cloudinary
+        import cloudinary.uploader
+        cloudinary.config(secure=True)
+
         # If it's a file from request.files, ensure stream position is at start.
         # If it's BytesIO, ensure position is at start.
         if hasattr(file_stream, 'seek') and callable(file_stream.seek):
@@ -80,35 +109,20 @@ def upload_to_cloudinary(file_stream, folder_name, public_id=None):
         print(f"Error uploading to Cloudinary: {e}")
         return None
 
+def require_cloudinary():
+    """
+    Fait échouer la tâche en cours sans nouvel essai si Cloudinary n'est pas
+    configuré : tant que CLOUDINARY_URL manque, chaque tentative échouerait.
+    """
+    if not CLOUDINARY_URL:
+        raise PermanentJobError("Cloudinary non configuré (CLOUDINARY_URL absent)")
+
 # Configuration for file uploads - only allowed extensions are relevant now
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-
-# Database configuration: Use PostgreSQL on Render if DATABASE_URL is set, otherwise use SQLite
-database_url = os.environ.get('DATABASE_URL')
-if database_url:
-    # Adapt for pg8000 driver if necessary (Render uses pg8000 by default)
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql+pg8000://", 1)
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-    print(f"DEBUG: Using PostgreSQL database from DATABASE_URL: {database_url}")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///signalalert.db'
-    print("DEBUG: Using SQLite database.")
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['MAIL_ENABLED'] = True
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', '')
-app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', '')
-app.config['MAIL_DEFAULT_SENDER'] = 'support@signalalert.bj'
-app.config['RESET_TOKEN_EXPIRATION'] = 3600
-
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
+# Extensions liées à l'application par create_app()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+login_manager = LoginManager()
 login_manager.login_view = 'login'
 
 
@@ -121,11 +135,19 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     avatar_url = db.Column(db.String(500), nullable=True)
+    # Nombre de notifications non lues, maintenu par _update_unread_counters
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     signalements = db.relationship('Signalement', backref='author', lazy=True)
     comments = db.relationship('Comment', backref='author', lazy=True)
     reset_tokens = db.relationship('PasswordResetToken', backref='user', lazy=True, cascade='all, delete-orphan')
     notifications = db.relationship('Notification', backref='user', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Console d'administration : pagination par clé (created_at, id), filtrable par statut
+        db.Index('ix_user_created_id', 'created_at', 'id'),
+        db.Index('ix_user_active_created_id', 'is_active', 'created_at', 'id'),
+    )
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -136,9 +158,9 @@ class User(UserMixin, db.Model):
 class PasswordResetToken(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     token = db.Column(db.String(100), unique=True, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # purge des jetons expirés
     used = db.Column(db.Boolean, default=False)
     
     def is_valid(self):
@@ -156,7 +178,11 @@ class Signalement(db.Model):
     reward = db.Column(db.String(100))
     status = db.Column(db.String(20), default='active')  # active, found
     image_url = db.Column(db.String(500))
+    # Déclinaisons de l'image en JSON : {"webp": {"320": url, ...}, "jpeg": {...}}
+    image_renditions = db.Column(db.Text, nullable=True)
+    image_hash = db.Column(db.String(16), nullable=True, index=True)  # dHash 64 bits (hexadécimal)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     qr_code_url = db.Column(db.String(500), nullable=True) # New column for QR code
     
@@ -168,9 +194,44 @@ class Signalement(db.Model):
     additional_info = db.Column(db.Text, nullable=True)
     phone = db.Column(db.String(50), nullable=True)
     email = db.Column(db.String(120), nullable=True) # Assuming this is separate from 'contact'
+    geohash = db.Column(db.String(12), nullable=True, index=True) # Calculé depuis lat/lng
+    match_count = db.Column(db.Integer, default=0)
     
     comments = db.relationship('Comment', backref='signalement', lazy=True, cascade='all, delete-orphan')
 
+    # Extrait de la description, chargé à la demande par les vues en liste
+    excerpt = db.query_expression()
+
+    @property
+    def renditions(self):
+        return parse_renditions(self.image_renditions)
+
+    def image_srcset(self, fmt='jpeg'):
+        """Attribut srcset de l'image (None pour les images antérieures aux déclinaisons)."""
+        return srcset(self.renditions, fmt)
+
+    __table_args__ = (
+        # Index de blocage du moteur de correspondances
+        db.Index('ix_signalement_blocking', 'category', 'geohash', 'date'),
+        # Pagination par clé (created_at, id), globale et par statut
+        db.Index('ix_signalement_created_id', 'created_at', 'id'),
+        db.Index('ix_signalement_status_created_id', 'status', 'created_at', 'id'),
+        # Console d'administration : filtres par auteur et par type
+        db.Index('ix_signalement_user_created_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_signalement_type_status_created_id', 'type', 'status', 'created_at', 'id'),
+        # Liste publique filtrée par type seul ou par catégorie
+        db.Index('ix_signalement_type_created_id', 'type', 'created_at', 'id'),
+        db.Index('ix_signalement_category_created_id', 'category', 'created_at', 'id'),
+    )
+
+@db.event.listens_for(Signalement, 'before_insert')
+@db.event.listens_for(Signalement, 'before_update')
+def _update_signalement_geohash(mapper, connection, target):
+    if target.lat is not None and target.lng is not None:
+        target.geohash = geohash_encode(target.lat, target.lng)
+    else:
+        target.geohash = None
+
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
@@ -178,6 +239,13 @@ class Comment(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     signalement_id = db.Column(db.Integer, db.ForeignKey('signalement.id'), nullable=False)
 
+    __table_args__ = (
+        # Pagination par clé (timestamp, id), globale, par auteur et par signalement
+        db.Index('ix_comment_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_comment_user_timestamp_id', 'user_id', 'timestamp', 'id'),
+        db.Index('ix_comment_signalement_timestamp_id', 'signalement_id', 'timestamp', 'id'),
+    )
+
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -186,93 +254,635 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     link = db.Column(db.String(255))
 
+    __table_args__ = (
+        # Boîte de réception paginée par (timestamp, id) et mise à jour des non lues
+        db.Index('ix_notification_user_read_timestamp', 'user_id', 'is_read', 'timestamp'),
+        db.Index('ix_notification_user_timestamp_id', 'user_id', 'timestamp', 'id'),
+        # Archivage des notifications lues anciennes (archive_notifications)
+        db.Index('ix_notification_read_timestamp', 'is_read', 'timestamp'),
+    )
 
+class NotificationArchive(db.Model):
+    """Notifications lues anciennes, sorties de la table chaude par archive_notifications()."""
+    __tablename__ = 'notification_archive'
 
-cloudinary.config( 
- 
-)
-# ⬇⬇⬇⬇⬇⬇⬇⬇⬇ AJOUTEZ CE CODE ICI ⬇⬇⬇⬇⬇⬇⬇⬇⬇
-# Initialisation automatique de la base de données au démarrage
-with app.app_context():
-    try:
-        # Créer toutes les tables si elles n'existent pas
-        db.create_all()
-        print("✅ Tables de la base de données créées avec succès !")
-        
-        # Créer l'utilisateur admin par défaut si nécessaire
-        if not User.query.filter_by(email='admin@signalalert.bj').first():
-            admin = User(
-                username='admin',
-                email='admin@signalalert.bj',
-                is_active=True
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-            db.session.commit()
-            print("✅ Utilisateur admin créé avec succès")
-    except Exception as e:
-        print(f"⚠️  Note lors de l'initialisation de la base de données: {e}")
-        # Ne pas lever l'exception pour ne pas bloquer le démarrage
-# ⬆⬆⬆⬆⬆⬆⬆⬆⬆ FIN DU CODE À AJOUTER ⬆⬆⬆⬆⬆⬆⬆⬆⬆
+    id = db.Column(db.Integer, primary_key=True)  # identifiant d'origine
+    name = db.Column(db.String(255), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    timestamp = db.Column(db.DateTime)
+    link = db.Column(db.String(255))
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+class Match(db.Model):
+    __tablename__ = 'matches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # signalement1_id est toujours le plus petit des deux identifiants
+    signalement1_id = db.Column(db.Integer, db.ForeignKey('signalement.id', ondelete='CASCADE'), nullable=False, index=True)
+    signalement2_id = db.Column(db.Integer, db.ForeignKey('signalement.id', ondelete='CASCADE'), nullable=False, index=True)
+    similarity_score = db.Column(db.Float)
+    status = db.Column(db.String(20), default='pending')  # pending, confirmed, rejected
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    signalement1 = db.relationship('Signalement', foreign_keys=[signalement1_id])
+    signalement2 = db.relationship('Signalement', foreign_keys=[signalement2_id])
+
+    __table_args__ = (
+        db.UniqueConstraint('signalement1_id', 'signalement2_id', name='uq_match_pair'),
+    )
+
+class MapCluster(db.Model):
+    """Agrégat des signalements actifs géolocalisés par cellule geohash, pour la carte."""
+    __tablename__ = 'map_cluster'
 
+    precision = db.Column(db.Integer, primary_key=True)
+    cell = db.Column(db.String(12), primary_key=True)
+    center_lat = db.Column(db.Float, nullable=False)
+    center_lng = db.Column(db.Float, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    lat_sum = db.Column(db.Float, nullable=False, default=0.0)
+    lng_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_map_cluster_viewport', 'precision', 'center_lat', 'center_lng'),
+    )
+
+class Job(db.Model):
+    """Tâche d'arrière-plan persistée, exécutée par `flask run-worker`."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    data = db.Column(db.LargeBinary, nullable=True)  # fichier à téléverser, effacé après succès
+    idempotency_key = db.Column(db.String(255), unique=True, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=8)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    @property
+    def params(self):
+        return json.loads(self.payload or '{}')
+
+class OutboundEmail(db.Model):
+    """
+    Email en attente d'envoi par `flask run-mailer`. Les lignes partageant une
+    `digest_key` (notifications d'un même utilisateur) partent en un seul email.
+    """
+    __tablename__ = 'outbound_email'
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_address = db.Column(db.String(120), nullable=True)  # sinon l'email de user_id
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=True)
+    subject = db.Column(db.String(255), nullable=False)
+    text_body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text, nullable=True)
+    link = db.Column(db.String(500), nullable=True)  # lien de l'élément de récapitulatif
+    digest_key = db.Column(db.String(100), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=6)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_outbound_email_status_run_at', 'status', 'run_at'),
+    )
+
+class EmailDeadLetter(db.Model):
+    """Emails abandonnés après `max_attempts` échecs, conservés pour analyse ou renvoi manuel."""
+    __tablename__ = 'email_dead_letter'
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_address = db.Column(db.String(120), nullable=True)
+    subject = db.Column(db.String(255), nullable=False)
+    text_body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime)
+    failed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StatCounter(db.Model):
+    """Compteurs de statistiques matérialisés (voir stats_utils)."""
+    __tablename__ = 'stat_counter'
+
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+UPSERT_BATCH_ROWS = 1000  # lignes par INSERT : reste sous la limite de paramètres liés du pilote
+
+def _upsert_increments(connection, table, key_columns, increment_columns, rows):
+    """INSERT ... ON CONFLICT DO UPDATE qui ajoute les valeurs aux lignes existantes."""
+    insert = pg_insert if connection.dialect.name == 'postgresql' else sqlite_insert
+    for start in range(0, len(rows), UPSERT_BATCH_ROWS):
+        stmt = insert(table).values(rows[start:start + UPSERT_BATCH_ROWS])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + stmt.excluded[column] for column in increment_columns}
+        )
+        connection.execute(stmt)
+
+# Maintien incrémental des agrégats de la carte
+
+def _previous_value(signalement, attr):
+    history = db.inspect(signalement).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(signalement, attr)
+
+def _add_cluster_delta(deltas, lat, lng, sign):
+    for precision in CLUSTER_PRECISIONS:
+        delta = deltas[(precision, geohash_encode(lat, lng, precision))]
+        delta[0] += sign
+        delta[1] += sign * lat
+        delta[2] += sign * lng
+
+def _apply_cluster_deltas(connection, deltas):
+    rows = []
+    for (precision, cell), (total, lat_sum, lng_sum) in deltas.items():
+        if total == 0 and lat_sum == 0 and lng_sum == 0:
+            continue
+        center_lat, center_lng = geohash_center(cell)
+        rows.append({'precision': precision, 'cell': cell, 'center_lat': center_lat,
+                     'center_lng': center_lng, 'total': total, 'lat_sum': lat_sum, 'lng_sum': lng_sum})
+    if not rows:
+        return
+
+    table = MapCluster.__table__
+    _upsert_increments(connection, table, ['precision', 'cell'], ['total', 'lat_sum', 'lng_sum'], rows)
+    connection.execute(db.delete(table).where(table.c.total <= 0))
+
+@db.event.listens_for(Session, 'after_flush')
+def _update_map_clusters(session, flush_context):
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for obj in session.new:
+        if isinstance(obj, Signalement) and obj.status == 'active' and obj.lat is not None and obj.lng is not None:
+            _add_cluster_delta(deltas, obj.lat, obj.lng, 1)
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Signalement):
+            continue
+        old = tuple(_previous_value(obj, attr) for attr in ('status', 'lat', 'lng'))
+        new = None if obj in session.deleted else (obj.status, obj.lat, obj.lng)
+        if old == new:
+            continue
+        if old[0] == 'active' and old[1] is not None and old[2] is not None:
+            _add_cluster_delta(deltas, old[1], old[2], -1)
+        if new and new[0] == 'active' and new[1] is not None and new[2] is not None:
+            _add_cluster_delta(deltas, new[1], new[2], 1)
+    if deltas:
+        _apply_cluster_deltas(session.connection(), deltas)
+
+# Maintien transactionnel des compteurs de statistiques
+
+stats_cache = TTLCache(STATS_CACHE_TTL)
+
+@db.event.listens_for(Session, 'after_flush')
+def _update_stat_counters(session, flush_context):
+    deltas = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, Signalement):
+            for key in signalement_counter_keys(obj.status, obj.type):
+                deltas[key] += 1
+        elif isinstance(obj, User):
+            deltas['users'] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Signalement):
+            old = (_previous_value(obj, 'status'), _previous_value(obj, 'type'))
+            if old != (obj.status, obj.type):
+                for key in signalement_counter_keys(*old):
+                    deltas[key] -= 1
+                for key in signalement_counter_keys(obj.status, obj.type):
+                    deltas[key] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Signalement):
+            for key in signalement_counter_keys(_previous_value(obj, 'status'), _previous_value(obj, 'type')):
+                deltas[key] -= 1
+        elif isinstance(obj, User):
+            deltas['users'] -= 1
+
+    _apply_stat_deltas(session, deltas)
+
+def _apply_stat_deltas(session, deltas):
+    rows = [{'name': name, 'value': value} for name, value in deltas.items() if value]
+    if rows:
+        _upsert_increments(session.connection(), StatCounter.__table__, ['name'], ['value'], rows)
+        session.info['stats_changed'] = True
+
+# Maintien transactionnel du compteur de notifications non lues
+
+@db.event.listens_for(Session, 'after_flush')
+def _update_unread_counters(session, flush_context):
+    deltas = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, Notification) and not obj.is_read:
+            deltas[obj.user_id] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Notification):
+            was_read = bool(_previous_value(obj, 'is_read'))
+            if was_read != bool(obj.is_read):
+                deltas[obj.user_id] += -1 if obj.is_read else 1
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and not _previous_value(obj, 'is_read'):
+            deltas[obj.user_id] -= 1
+
+    rows = [{'b_id': user_id, 'b_delta': delta} for user_id, delta in sorted(deltas.items()) if delta]
+    if rows:
+        _invalidate_cached_users(session, [row['b_id'] for row in rows])
+        table = User.__table__
+        session.connection().execute(
+            table.update()
+                 .where(table.c.id == db.bindparam('b_id'))
+                 .values(unread_notifications=table.c.unread_notifications + db.bindparam('b_delta')),
+            rows
+        )
+
+# Chaque notification part aussi par email, regroupée par destinataire
+
+@db.event.listens_for(Session, 'after_flush')
+def _queue_notification_emails(session, flush_context):
+    notifications = [obj for obj in session.new if isinstance(obj, Notification)]
+    if not notifications:
+        return
+    base_url = request.host_url if has_request_context() else app.config['MAIL_BASE_URL'] + '/'
+    run_at = datetime.utcnow() + timedelta(seconds=app.config['MAIL_DIGEST_WINDOW'])
+    session.connection().execute(OutboundEmail.__table__.insert(), [{
+        'user_id': n.user_id,
+        'subject': n.name[:255],
+        'text_body': n.name,
+        'link': base_url.rstrip('/') + n.link if n.link and n.link.startswith('/') else n.link,
+        'digest_key': f"notifications:{n.user_id}",
+        'status': 'pending',
+        'attempts': 0,
+        'max_attempts': 6,
+        'run_at': run_at,
+        'created_at': datetime.utcnow(),
+    } for n in notifications])
+
+# Version du contenu public, base des ETag et des caches de réponses
+
+CONTENT_VERSION_KEY = 'content:version'
+CONTENT_MODIFIED_KEY = 'content:modified'  # horodatage (epoch) de la dernière écriture
+
+content_version_cache = TTLCache(1)
+
+def _upsert_values(connection, table, key_columns, rows):
+    """INSERT ... ON CONFLICT DO UPDATE qui remplace les valeurs des lignes existantes."""
+    insert = pg_insert if connection.dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column.name: stmt.excluded[column.name] for column in table.c if column.name not in key_columns}
+    )
+    connection.execute(stmt)
+
+@db.event.listens_for(Session, 'after_flush')
+def _bump_content_version(session, flush_context):
+    public = (Signalement, Comment, User)
+    if any(isinstance(obj, public) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        _mark_content_changed(session)
+
+def _mark_content_changed(session):
+    """Incrémente la version du contenu dans la transaction en cours (aussi pour les requêtes ensemblistes)."""
+    connection = session.connection()
+    _upsert_increments(connection, StatCounter.__table__, ['name'], ['value'],
+                       [{'name': CONTENT_VERSION_KEY, 'value': 1}])
+    _upsert_values(connection, StatCounter.__table__, ['name'],
+                   [{'name': CONTENT_MODIFIED_KEY, 'value': int(time.time())}])
+    session.info['content_changed'] = True
+
+def content_version():
+    """
+    (version, date de dernière modification) du contenu public. Lue au plus
+    une fois par seconde et par processus ; remise à zéro localement au commit.
+    """
+    cached = content_version_cache.get('version')
+    if cached is None:
+        values = dict(db.session.execute(
+            db.select(StatCounter.name, StatCounter.value)
+              .where(StatCounter.name.in_([CONTENT_VERSION_KEY, CONTENT_MODIFIED_KEY]))
+        ).all())
+        modified = datetime.utcfromtimestamp(values.get(CONTENT_MODIFIED_KEY) or int(app_started_at))
+        cached = (values.get(CONTENT_VERSION_KEY, 0), modified)
+        content_version_cache.set('version', cached)
+    return cached
+
+@db.event.listens_for(Session, 'after_commit')
+def _invalidate_content_version(session):
+    if session.info.pop('content_changed', False):
+        content_version_cache.clear()
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_content_change(session):
+    session.info.pop('content_changed', None)
+
+@db.event.listens_for(Session, 'after_commit')
+def _invalidate_stats_cache(session):
+    if session.info.pop('stats_changed', False):
+        stats_cache.clear()
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_stats_change(session):
+    session.info.pop('stats_changed', None)
+
+def compute_stat_counters():
+    """Recalcule tous les compteurs avec une seule requête agrégée."""
+    total_users = db.select(db.func.count(User.id)).scalar_subquery()
+    rows = db.session.execute(
+        db.select(Signalement.type, Signalement.status, db.func.count(Signalement.id), total_users)
+          .group_by(Signalement.type, Signalement.status)
+    ).all()
+    users = rows[0][3] if rows else db.session.scalar(db.select(db.func.count(User.id)))
+    return counters_from_groups([row[:3] for row in rows], users)
+
+def reconcile_stat_counters():
+    """
+    Réécrit la table stat_counter à partir des données réelles.
+    :return: Dictionnaire {compteur: (valeur stockée, valeur réelle)} des écarts.
+    """
+    # Les clés 'content:*' (version du contenu) ne sont pas des statistiques
+    statistics = ~StatCounter.name.startswith('content:')
+    stored = {c.name: c.value for c in StatCounter.query.filter(statistics).all()}
+    actual = compute_stat_counters()
+    drift = {name: (stored.get(name, 0), actual.get(name, 0))
+             for name in set(stored) | set(actual)
+             if stored.get(name, 0) != actual.get(name, 0)}
+    StatCounter.query.filter(statistics).delete(synchronize_session=False)
+    db.session.add_all([StatCounter(name=name, value=value) for name, value in actual.items()])
+    db.session.commit()
+    stats_cache.clear()
+    return drift
+
+def get_stats():
+    """Statistiques globales, servies depuis le cache puis la table stat_counter."""
+    stats = stats_cache.get('stats')
+    if stats is None:
+        counters = {c.name: c.value for c in StatCounter.query.all()}
+        if all(name.startswith('content:') for name in counters):
+            # Premier accès : la table n'a jamais été remplie
+            try:
+                reconcile_stat_counters()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Erreur lors de l'initialisation des compteurs de statistiques: {e}")
+            counters = {c.name: c.value for c in StatCounter.query.all()}
+        stats = stats_from_counters(counters)
+        stats_cache.set('stats', stats)
+    return stats
+
+def _flush_signalement_views(increments):
+    """
+    Reporte les vues en attente : un seul UPDATE exécuté par lot, ids triés
+    (ordre de verrouillage stable). Passe par la session pour prendre son tour
+    dans la file d'écriture SQLite (sqlite_writer) comme les autres écritures.
+    """
+    table = Signalement.__table__
+    statement = table.update()\
+        .where(table.c.id == db.bindparam('b_id'))\
+        .values(views=db.func.coalesce(table.c.views, 0) + db.bindparam('b_views'),
+                updated_at=table.c.updated_at)  # une vue n'est pas une modification du contenu
+    rows = [{'b_id': signalement_id, 'b_views': count} for signalement_id, count in sorted(increments.items())]
+    with app.app_context():
+        try:
+            db.session.execute(statement, rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+def _poll_notifications(last_id, user_ids, since):
+    """Une requête par intervalle et par processus pour toutes les connexions SSE."""
+    with app.app_context():
+        if last_id is None:
+            return db.session.query(db.func.max(Notification.id)).scalar() or 0, [], {}
+        if not user_ids:
+            return last_id, [], {}
+        # Les ids au-dessus de last_id, plus la fenêtre récente relue : une
+        # notification validée après une plus récente (id inférieur) y est
+        # retrouvée ; le broker écarte celles déjà diffusées
+        newest = db.session.query(db.func.max(Notification.id)).scalar() or last_id
+        rows = db.session.execute(
+            db.select(Notification.id, Notification.user_id, Notification.name,
+                      Notification.link, Notification.timestamp)
+              .where(Notification.user_id.in_(user_ids),
+                     db.or_(Notification.id > last_id, Notification.timestamp >= since))
+              .order_by(Notification.id)
+        ).all()
+        counts = dict(db.session.execute(
+            db.select(User.id, User.unread_notifications).where(User.id.in_(user_ids))
+        ).all())
+        notifications = [(row.user_id, {'id': row.id, 'name': row.name, 'link': row.link,
+                                        'timestamp': row.timestamp.isoformat() if row.timestamp else None})
+                         for row in rows]
+        return max([newest] + [row.id for row in rows]), notifications, counts
+
+notification_broker = NotificationBroker(_poll_notifications)
+
+# Compteur de vues en écriture différée, vidé à l'arrêt du processus
+view_counter = ViewCounter(_flush_signalement_views)
+atexit.register(view_counter.shutdown)
+
+def record_signalement_view(signalement_id, author_id=None):
+    """Compte une vue de la page détail (hors robots, auteur et doublons récents)."""
+    user_agent = request.headers.get('User-Agent', '')
+    if is_bot(user_agent):
+        return
+    user_id = current_user.id if current_user.is_authenticated else None
+    if user_id is not None and user_id == author_id:
+        return
+    view_counter.start()
+    view_counter.record(signalement_id, visitor_key(user_id, request.remote_addr, user_agent))
+
+# Caches HTTP : réponses publiques complètes (visiteurs anonymes) et fragments rendus
+
+app_started_at = time.time()
+response_cache = LRUCache(RESPONSE_CACHE_MAX_BYTES)
+fragment_cache = LRUCache(FRAGMENT_CACHE_MAX_BYTES)
+
+def cached_public_view(max_age=30, on_anonymous_request=None):
+    """
+    Met en cache la réponse d'une vue GET publique pour les visiteurs anonymes.
+    La clé couvre la route, ses arguments et la date du jour (dates relatives
+    affichées) ; la version du contenu en fait partie, si bien que toute
+    écriture invalide les entrées. Gère If-None-Match / If-Modified-Since et
+    autorise un proxy à mettre en cache. Les utilisateurs connectés (pages
+    personnalisées) et les réponses porteuses d'un message flash ne sont pas
+    mis en cache. `on_anonymous_request(**kwargs)` est appelé même quand la
+    réponse vient du cache (compteur de vues).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or current_user.is_authenticated or session.get('_flashes'):
+                response = make_response(view(*args, **kwargs))
+                response.headers.setdefault('Cache-Control', 'private, no-cache')
+                return response
+
+            if on_anonymous_request:
+                on_anonymous_request(**kwargs)
+            started = time.perf_counter()
+            version, modified = content_version()
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))), datetime.utcnow().date())
+            etag = make_etag(key, version)
+
+            if etag in request.if_none_match or (
+                    not request.if_none_match and request.if_modified_since
+                    and request.if_modified_since.replace(tzinfo=None) >= modified.replace(microsecond=0)):
+                response = Response(status=304)
+                kind = 'not_modified'
+            else:
+                entry = response_cache.get((key, version))
+                if entry is not None:
+                    body, status, mimetype = entry
+                    response = Response(body, status=status, mimetype=mimetype)
+                    kind = 'hit'
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    response_cache.set((key, version), (body, response.status_code, response.mimetype), len(body))
+                    kind = 'miss'
+
+            response.set_etag(etag)
+            response.last_modified = modified
+            response.headers['Cache-Control'] = f'public, max-age={max_age}, stale-while-revalidate={max_age}'
+            response.vary.add('Cookie')
+            response.headers['X-Cache'] = kind.upper().replace('_', '-')
+            response_cache.record(kind, time.perf_counter() - started)
+            return response
+        return wrapper
+    return decorator
+
+def render_signalement_card(signalement):
+    """Carte de la liste des signalements, rendue une fois par version du signalement et par jour."""
+    key = ('signalement_card', signalement.id, signalement.updated_at,
+           signalement.author.username if signalement.author else None, datetime.utcnow().date())
+    html = fragment_cache.get(key)
+    if html is None:
+        started = time.perf_counter()
+        html = render_template('partials/signalement_card.html', signalement=signalement)
+        fragment_cache.set(key, html, len(html))
+        fragment_cache.record('miss', time.perf_counter() - started)
+    else:
+        fragment_cache.record('hit', 0.0)
+    return Markup(html)
+
+app.jinja_env.globals['render_signalement_card'] = render_signalement_card
+
+user_cache = None  # UserIdentityCache, créé par create_app()
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """
+    Utilisateur courant, reconstruit depuis le cache d'identités quand c'est
+    possible (seuls is_active et password_hash sont relus en base). L'objet
+    est rattaché à la session comme s'il avait été chargé : les modifications
+    (avatar, mot de passe...) sont enregistrées normalement.
+    """
+    user_id = int(user_id)
+    values = user_cache.get(user_id)
+    if values is not None:
+        # Désactivation et changement de mot de passe effectifs tout de suite,
+        # y compris faits depuis une autre instance : deux colonnes relues par
+        # clé primaire à chaque requête, le reste de l'identité vient du cache
+        current = db.session.execute(
+            db.select(User.is_active, User.password_hash).where(User.id == user_id)
+        ).first()
+        if current is None or tuple(current) != (values['is_active'], values['password_hash']):
+            user_cache.discard(user_id)
+            values = None
+    if values is None:
+        loaded_at = time.time()  # avant la lecture : une invalidation concurrente l'emporte
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs},
+                           loaded_at)
+        return user
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def _invalidate_cached_users(session, user_ids):
+    """Marque des utilisateurs à retirer du cache d'identités au commit."""
+    session.info.setdefault('user_cache_invalidate', set()).update(user_ids)
+
+@db.event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    # Profil, avatar, mot de passe, is_active (admin_toggle_user_active), suppression
+    changed = {obj.id for obj in list(session.dirty) + list(session.deleted)
+               if isinstance(obj, User) and obj.id is not None}
+    if changed:
+        _invalidate_cached_users(session, changed)
+
+@db.event.listens_for(Session, 'after_commit')
+def _flush_user_cache_invalidations(session):
+    user_ids = session.info.pop('user_cache_invalidate', None)
+    if user_ids:
+        user_cache.invalidate(user_ids)
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_user_cache_invalidations(session):
+    session.info.pop('user_cache_invalidate', None)
 
 # Fonctions utilitaires
+def enqueue_email(to_address, subject, text_body, html_body=None):
+    """
+    Ajoute un email à la file d'envoi ; il part avec le commit de l'appelant,
+    sans attendre le serveur SMTP.
+    """
+    email = OutboundEmail(to_address=to_address, subject=subject, text_body=text_body, html_body=html_body)
+    db.session.add(email)
+    return email
+
 def send_reset_email(user, token):
-    """Envoie un email de réinitialisation"""
-    if not app.config['MAIL_ENABLED']:
-        print(f"[DEV] Email de réinitialisation pour {user.email}")
-        print(f"[DEV] Lien: http://localhost:5000/reset-password/{token}")
-        return True
-    
+    """Planifie l'email de réinitialisation"""
+    reset_url = url_for('reset_password', token=token, _external=True)
+
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <body>
+        <h1>Réinitialisation de mot de passe</h1>
+        <p>Bonjour {user.username},</p>
+        <p>Cliquez sur ce lien pour réinitialiser votre mot de passe :</p>
+        <a href="{reset_url}">{reset_url}</a>
+        <p>Ce lien expirera dans 1 heure.</p>
+    </body>
+    </html>
+    """
+
+    text = f"""
+    Réinitialisation de mot de passe
+
+    Bonjour {user.username},
+
+    Cliquez sur ce lien pour réinitialiser votre mot de passe :
+    {reset_url}
+
+    Ce lien expirera dans 1 heure.
+    """
+
     try:
-        reset_url = f"http://localhost:5000/reset-password/{token}"
-        
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = 'Réinitialisation de votre mot de passe - SignalAlert'
-        msg['From'] = app.config['MAIL_DEFAULT_SENDER']
-        msg['To'] = user.email
-        
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <body>
-            <h1>Réinitialisation de mot de passe</h1>
-            <p>Bonjour {user.username},</p>
-            <p>Cliquez sur ce lien pour réinitialiser votre mot de passe :</p>
-            <a href="{reset_url}">{reset_url}</a>
-            <p>Ce lien expirera dans 1 heure.</p>
-        </body>
-        </html>
-        """
-        
-        text = f"""
-        Réinitialisation de mot de passe
-        
-        Bonjour {user.username},
-        
-        Cliquez sur ce lien pour réinitialiser votre mot de passe :
-        {reset_url}
-        
-        Ce lien expirera dans 1 heure.
-        """
-        
-        msg.attach(MIMEText(text, 'plain'))
-        msg.attach(MIMEText(html, 'html'))
-        
-        with smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT']) as server:
-            server.starttls()
-            server.login(app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
-            server.send_message(msg)
-        
+        enqueue_email(user.email, 'Réinitialisation de votre mot de passe - SignalAlert', text, html)
+        db.session.commit()
         return True
     except Exception as e:
+        db.session.rollback()
         print(f"Erreur envoi email: {e}")
         return False
 
@@ -294,10 +904,616 @@ def create_reset_token(user):
     
     return token
 
+# Profils de chargement par vue : colonnes utiles uniquement et relations
+# chargées en une requête groupée plutôt qu'une par ligne.
+
+def signalement_card_options():
+    """Cartes de signalement (accueil, liste) : sans la description complète."""
+    return (
+        load_only(Signalement.id, Signalement.type, Signalement.title, Signalement.location,
+                  Signalement.date, Signalement.category, Signalement.status, Signalement.image_url,
+                  Signalement.image_renditions, Signalement.created_at, Signalement.updated_at,
+                  Signalement.user_id),
+        with_expression(Signalement.excerpt, db.func.substr(Signalement.description, 1, 160)),
+        selectinload(Signalement.author).load_only(User.id, User.username),
+    )
+
+def signalement_api_options():
+    """Liste JSON des signalements."""
+    return (
+        load_only(Signalement.id, Signalement.type, Signalement.title, Signalement.description,
+                  Signalement.location, Signalement.date, Signalement.category, Signalement.reward,
+                  Signalement.image_url, Signalement.image_renditions, Signalement.created_at,
+                  Signalement.user_id),
+        selectinload(Signalement.author).load_only(User.id, User.username),
+    )
+
+def comment_list_options():
+    """Commentaires affichés avec leur auteur et le titre de leur signalement."""
+    return (
+        selectinload(Comment.author).load_only(User.id, User.username),
+        selectinload(Comment.signalement).load_only(Signalement.id, Signalement.title),
+    )
+
+# Index plein texte et spatial : créés par `flask init-db`, retrouvés à la
+# première requête de chaque worker (create_app n'accède pas à la base)
+
+index_backends_detected = False
+
+@app.before_request
+def detect_index_backends():
+    global index_backends_detected
+    if not index_backends_detected:
+        detect_search_index(db.engine)
+        detect_spatial_index(db.engine)
+        index_backends_detected = True
+
+# Garde-fou contre les requêtes N+1
+
+bind_query_counts = defaultdict(int)  # moteur -> requêtes exécutées par ce processus
+
+@db.event.listens_for(Engine, 'before_cursor_execute')
+def _count_sql_queries(conn, cursor, statement, parameters, context, executemany):
+    bind_query_counts[conn.engine] += 1
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+@app.after_request
+def _check_sql_query_budget(response):
+    budget = app.config.get('SQL_QUERY_BUDGET')
+    count = g.get('sql_query_count', 0)
+    if budget is not None:
+        response.headers['X-SQL-Query-Count'] = str(count)
+        if count > budget:
+            message = f"{request.method} {request.path} a exécuté {count} requêtes SQL (budget : {budget})"
+            if app.testing:
+                raise AssertionError(message)
+            print(f"WARNING: {message}")
+    return response
+
+# File d'écriture SQLite : une transaction d'écriture à la fois, tous workers confondus
+
+sqlite_writer = None  # SqliteWriterLock, créé par create_app() pour une base SQLite fichier
+
+def _hold_sqlite_writer(session):
+    if sqlite_writer is None or session.info.get('sqlite_writer'):
+        return
+    if sqlite_writer.acquire():
+        session.info['sqlite_writer'] = True
+    else:
+        print("WARNING: file d'écriture SQLite saturée, écriture tentée sans attendre son tour")
+
+@db.event.listens_for(Session, 'before_flush')
+def _queue_sqlite_flush(session, flush_context, instances):
+    _hold_sqlite_writer(session)
+
+@db.event.listens_for(Session, 'do_orm_execute')
+def _queue_sqlite_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _hold_sqlite_writer(orm_execute_state.session)
+
+@db.event.listens_for(Session, 'after_transaction_end')
+def _release_sqlite_writer(session, transaction):
+    if transaction.parent is None and session.info.pop('sqlite_writer', False):
+        sqlite_writer.release()
+
+# Lectures sur réplica pour les vues en lecture seule
+
+replica_router = None  # ReplicaRouter, créé par create_app() si des réplicas sont configurés
+PRIMARY_PIN_KEY = '_db_primary_until'
+
+def read_replica(view):
+    """
+    Vue en lecture seule : ses SELECT partent sur un réplica à jour, sauf si le
+    visiteur vient d'écrire (lecture de ses propres écritures sur le primaire).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if replica_router is not None and session.get(PRIMARY_PIN_KEY, 0) <= time.time():
+            chosen = replica_router.choose()
+            if chosen is not None:
+                db.session.info['replica'] = chosen[1]
+        return view(*args, **kwargs)
+    return wrapper
+
+def _left_replica(session):
+    # Une session qui écrit relit ensuite sur le primaire
+    session.info.pop('replica', None)
+    if has_request_context():
+        g.db_wrote = True
+
+@db.event.listens_for(Session, 'after_flush')
+def _leave_replica_after_flush(session, flush_context):
+    _left_replica(session)
+
+@db.event.listens_for(Session, 'do_orm_execute')
+def _leave_replica_for_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _left_replica(orm_execute_state.session)
+
+@app.after_request
+def _pin_writer_to_primary(response):
+    if replica_router is not None and g.get('db_wrote'):
+        session[PRIMARY_PIN_KEY] = time.time() + app.config['DB_REPLICA_PIN_SECONDS']
+    return response
+
+def find_match_candidates(signalement, limit=200):
+    """
+    Candidats d'un signalement via l'index de blocage :
+    type complémentaire + même catégorie + index spatial + fenêtre de dates.
+    """
+    types = COMPLEMENTARY_TYPES.get(signalement.type, ())
+    if not types:
+        return []
+
+    window = timedelta(days=DATE_WINDOW_DAYS)
+    query = Signalement.query.filter(
+        Signalement.id != signalement.id,
+        Signalement.type.in_(types),
+        Signalement.status == 'active',
+        Signalement.date.between(signalement.date - window, signalement.date + window)
+    )
+    if signalement.category:
+        query = query.filter(Signalement.category == signalement.category)
+    else:
+        query = query.filter(Signalement.category.is_(None))
+
+    if signalement.lat is not None and signalement.lng is not None:
+        query = filter_radius(query, Signalement, signalement.lat, signalement.lng, MAX_DISTANCE_KM)
+    else:
+        query = query.filter(Signalement.geohash.is_(None))
+
+    return query.order_by(Signalement.created_at.desc()).limit(limit).all()
+
+def _image_hash_rows(since=None):
+    query = db.select(Signalement.id, Signalement.image_hash, Signalement.updated_at)\
+              .where(Signalement.image_hash.isnot(None))
+    if since is not None:
+        query = query.where(Signalement.updated_at >= since)
+    with app.app_context():
+        return db.session.execute(query).all()
+
+# Index des empreintes d'images, tenu à jour par un thread dans chaque processus
+image_index = ImageHashIndex(_image_hash_rows)
+
+def _index_image_hash(session, signalement_id, image_hash):
+    """Ajoute une empreinte à l'index local au commit (jamais pour une ligne annulée)."""
+    session.info.setdefault('image_index_add', {})[signalement_id] = image_hash
+
+@db.event.listens_for(Session, 'after_commit')
+def _flush_image_index_additions(session):
+    for signalement_id, image_hash in session.info.pop('image_index_add', {}).items():
+        image_index.add(signalement_id, image_hash)
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_image_index_additions(session):
+    session.info.pop('image_index_add', None)
+
+@app.before_request
+def start_image_index():
+    # Construit en arrière-plan dès la première requête, jamais pendant une recherche
+    image_index.start()
+
+def find_similar_images(image_hash, max_distance, exclude_id=None, types=None):
+    """
+    Signalements actifs dont l'image est à au plus `max_distance` de `image_hash`.
+    :return: Liste de (signalement, distance), les plus proches d'abord.
+    """
+    hits = [(item_id, d) for item_id, d in image_index.search(image_hash, max_distance) if item_id != exclude_id]
+    if not hits:
+        return []
+    query = Signalement.query.filter(Signalement.id.in_([item_id for item_id, _ in hits]),
+                                     Signalement.status == 'active',
+                                     Signalement.image_hash.isnot(None))
+    if types is not None:
+        query = query.filter(Signalement.type.in_(types))
+    found = {s.id: s for s in query.all()}
+    results = []
+    for item_id, _ in hits:
+        s = found.pop(item_id, None)
+        if s is not None:
+            # L'index peut être en retard sur une image remplacée : distance recalculée
+            distance = hamming(int(s.image_hash, 16), int(image_hash, 16))
+            if distance <= max_distance:
+                results.append((s, distance))
+    results.sort(key=lambda item: item[1])
+    return results
+
+def find_image_candidates(signalement, max_distance):
+    """Signalements de type complémentaire d'un autre auteur dont la photo est proche."""
+    types = COMPLEMENTARY_TYPES.get(signalement.type, ())
+    if not signalement.image_hash or not types:
+        return []
+    return [(s, d) for s, d in find_similar_images(signalement.image_hash, max_distance,
+                                                    exclude_id=signalement.id, types=types)
+            if s.user_id != signalement.user_id]
+
+def update_matches_for_signalement(signalement):
+    """
+    Recalcule les correspondances d'un signalement créé ou modifié.
+    Les nouvelles paires sont enregistrées dans Match, incrémentent match_count
+    et notifient les deux auteurs ; les paires en attente devenues trop faibles sont retirées.
+    Exécuté par le worker (tâche 'match_signalement'), qui valide la session.
+    :return: Le nombre de nouvelles correspondances.
+    """
+    existing = {}
+    for match in Match.query.filter(db.or_(Match.signalement1_id == signalement.id,
+                                           Match.signalement2_id == signalement.id)).all():
+        other_id = match.signalement2_id if match.signalement1_id == signalement.id else match.signalement1_id
+        existing[other_id] = match
+
+    scores = {}
+    candidates = {}
+    if signalement.status == 'active':
+        candidates = {c.id: c for c in find_match_candidates(signalement)}
+        if candidates:
+            scores = dict(score_candidates(to_record(signalement),
+                                           [to_record(c) for c in candidates.values()],
+                                           threshold=MATCH_THRESHOLD))
+        # Photos du même objet : candidats hors blocage (catégorie ou lieu mal saisis)
+        for other, distance in find_image_candidates(signalement, IMAGE_MATCH_DISTANCE):
+            candidates.setdefault(other.id, other)
+            image_score = round(image_similarity(distance) * 100, 1)
+            scores[other.id] = max(scores.get(other.id, 0), image_score)
+
+    created = 0
+    for other_id, score in scores.items():
+        match = existing.get(other_id)
+        if match:
+            if match.status == 'pending':
+                match.similarity_score = score
+            continue
+
+        other = candidates[other_id]
+        db.session.add(Match(
+            signalement1_id=min(signalement.id, other_id),
+            signalement2_id=max(signalement.id, other_id),
+            similarity_score=score
+        ))
+        for mine, theirs in ((signalement, other), (other, signalement)):
+            mine.match_count = (mine.match_count or 0) + 1
+            db.session.add(Notification(
+                name=f"Correspondance possible ({score:.0f}%) pour votre signalement : \"{mine.title}\"",
+                user_id=mine.user_id,
+                link=url_for('signalement_detail', id=theirs.id)
+            ))
+        created += 1
+
+    for other_id, match in existing.items():
+        if match.status == 'pending' and other_id not in scores:
+            other = db.session.get(Signalement, other_id)
+            for s in (signalement, other):
+                if s is not None and s.match_count:
+                    s.match_count -= 1
+            db.session.delete(match)
+
+    return created
+
+def match_count_subquery():
+    """Nombre de correspondances non rejetées du signalement courant (pour UPDATE ... SET match_count)."""
+    return db.select(db.func.count(Match.id)).where(
+        db.or_(Match.signalement1_id == Signalement.id, Match.signalement2_id == Signalement.id),
+        Match.status != 'rejected'
+    ).scalar_subquery()
+
+# TÂCHES D'ARRIÈRE-PLAN
+
+job_handlers = {}
+
+def job_handler(kind):
+    """Enregistre la fonction décorée comme gestionnaire des tâches `kind`."""
+    def decorator(func):
+        job_handlers[kind] = func
+        return func
+    return decorator
+
+def enqueue_job(kind, params, data=None, idempotency_key=None):
+    """
+    Ajoute une tâche à la session courante : elle est enregistrée avec le
+    commit de l'appelant. Si une tâche de même clé d'idempotence existe déjà
+    (et n'a pas définitivement échoué), rien n'est ajouté.
+    :return: La tâche créée, ou None si elle était déjà connue.
+    """
+    if idempotency_key:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            if existing.status != 'failed':
+                return None
+            # Un nouvel essai remplace la tâche en échec
+            db.session.delete(existing)
+            db.session.flush()
+    job = Job(kind=kind, payload=json.dumps(params), data=data, idempotency_key=idempotency_key)
+    db.session.add(job)
+    return job
+
+def enqueue_qrcode(signalement):
+    """Planifie le QR code du signalement ; sans effet si l'URL encodée n'a pas changé."""
+    signalement_url = url_for('signalement_detail', id=signalement.id, _external=True)
+    digest = hashlib.sha1(signalement_url.encode('utf-8')).hexdigest()[:16]
+    return enqueue_job('generate_qrcode', {'signalement_id': signalement.id, 'url': signalement_url},
+                       idempotency_key=f"qrcode:{signalement.id}:{digest}")
+
+def enqueue_matching(signalement):
+    """Planifie le calcul des correspondances ; sans effet si les champs comparés n'ont pas changé."""
+    record = to_record(signalement)
+    record.update(location=signalement.location, image_hash=signalement.image_hash, status=signalement.status)
+    digest = hashlib.sha1(repr(sorted(record.items())).encode('utf-8')).hexdigest()[:16]
+    return enqueue_job('match_signalement', {'signalement_id': signalement.id},
+                       idempotency_key=f"match:{signalement.id}:{digest}")
+
+@job_handler('match_signalement')
+def _match_signalement_job(job):
+    signalement = db.session.get(Signalement, job.params['signalement_id'])
+    if signalement is None:
+        return
+    # Contexte de requête factice : les liens des notifications passent par url_for
+    with app.test_request_context('/'):
+        created = update_matches_for_signalement(signalement)
+    if created:
+        print(f"{created} correspondance(s) trouvée(s) pour le signalement {signalement.id}")
+
+def enqueue_image_upload(signalement, file):
+    """
+    Planifie l'envoi vers Cloudinary de l'image téléversée pour un signalement.
+    L'empreinte perceptuelle est calculée tout de suite (décodage réduit) pour
+    que doublons et correspondances soient détectés dès l'enregistrement ;
+    elle n'entre dans l'index qu'une fois la transaction de l'appelant validée.
+    """
+    data = file.read()
+    try:
+        signalement.image_hash = image_dhash(data)
+        _index_image_hash(db.session, signalement.id, signalement.image_hash)
+    except UnreadableImage as e:
+        signalement.image_hash = None
+        print(f"Empreinte d'image impossible pour le signalement {signalement.id}: {e}")
+    signalement_url = url_for('signalement_detail', id=signalement.id, _external=True)
+    return enqueue_job('upload_signalement_image', {'signalement_id': signalement.id, 'url': signalement_url},
+                       data=data)
+
+def enqueue_avatar_upload(user, file):
+    """Planifie le recadrage et l'envoi de l'avatar d'un utilisateur."""
+    return enqueue_job('upload_user_avatar', {'user_id': user.id}, data=file.read())
+
+# Encodage et envoi des déclinaisons en parallèle (Pillow libère le GIL pendant l'encodage)
+image_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='image')
+
+def upload_renditions(data, folder):
+    """
+    Produit les déclinaisons WebP/JPEG de l'image et les envoie vers Cloudinary.
+    :return: {format: {largeur: url}}
+    :raises UnreadableImage: si l'image ne peut pas être décodée.
+    """
+    renditions = make_renditions(data)
+    base_id = uuid.uuid4().hex
+    futures = {
+        (fmt, width): image_executor.submit(upload_to_cloudinary, io.BytesIO(content), folder,
+                                            f"{base_id}_{width}_{fmt}")
+        for (fmt, width), content in renditions.items()
+    }
+    urls = {}
+    for (fmt, width), future in futures.items():
+        url = future.result()
+        if not url:
+            raise RuntimeError("Échec de l'upload d'une déclinaison vers Cloudinary")
+        urls.setdefault(fmt, {})[str(width)] = url
+    return urls
+
+@job_handler('upload_signalement_image')
+def _upload_signalement_image_job(job):
+    signalement = db.session.get(Signalement, job.params['signalement_id'])
+    if signalement is None:
+        return
+    require_cloudinary()
+    try:
+        urls = upload_renditions(job.data, "signal_images")
+    except UnreadableImage as e:
+        # Fichier corrompu ou non image : inutile de réessayer
+        print(f"Image ignorée pour le signalement {signalement.id}: {e}")
+        return
+    signalement.image_renditions = json.dumps(urls)
+    # image_url reste la version de référence (API, affiche PDF, anciennes vues)
+    signalement.image_url = pick_rendition(urls, 'jpeg', 1280)
+    # L'affiche change avec l'image
+    if job.params.get('url'):
+        enqueue_pdf_render(signalement, job.params['url'])
+
+@job_handler('upload_user_avatar')
+def _upload_user_avatar_job(job):
+    user = db.session.get(User, job.params['user_id'])
+    if user is None:
+        return
+    require_cloudinary()
+    try:
+        avatar = make_avatar(job.data)
+    except UnreadableImage as e:
+        print(f"Avatar ignoré pour l'utilisateur {user.id}: {e}")
+        return
+    uploaded_url = upload_to_cloudinary(io.BytesIO(avatar), "avatars", public_id=f"user_avatar_{user.id}")
+    if not uploaded_url:
+        raise RuntimeError("Échec de l'upload de l'avatar vers Cloudinary")
+    user.avatar_url = uploaded_url
+
+@job_handler('generate_qrcode')
+def _generate_qrcode_job(job):
+    params = job.params
+    signalement = db.session.get(Signalement, params['signalement_id'])
+    if signalement is None:
+        return
+    require_cloudinary()
+    qr_code_url = generate_qrcode_for_signalement(signalement.id, params['url'])
+    if not qr_code_url:
+        raise RuntimeError("Échec de la génération du QR code")
+    signalement.qr_code_url = qr_code_url
+
+def schedule_sqlite_maintenance(delay=None):
+    """Planifie la prochaine maintenance SQLite ; une seule tâche par créneau, même à plusieurs workers."""
+    interval = app.config['SQLITE_MAINTENANCE_INTERVAL']
+    run_at = time.time() + (interval if delay is None else delay)
+    job = enqueue_job('sqlite_maintenance', {}, idempotency_key=f"sqlite_maintenance:{int(run_at // interval)}")
+    if job is not None:
+        job.run_at = datetime.utcfromtimestamp(run_at)
+    return job
+
+@job_handler('sqlite_maintenance')
+def _sqlite_maintenance_job(job):
+    report = sqlite_maintenance(db.engine, sqlite_writer)
+    print(f"Maintenance SQLite : {json.dumps(report)}")
+    schedule_sqlite_maintenance()
+
+# Envoi des emails (processus `flask run-mailer`)
+
+def _claim_outbound_emails(worker, batch_size):
+    """
+    Réserve les emails dus, plus toutes les lignes en attente des récapitulatifs
+    concernés (elles partent ensemble). Réservation par UPDATE conditionnel,
+    comme pour la file de tâches.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=STALE_LOCK_SECONDS)
+    claimable = db.or_(
+        OutboundEmail.status == 'pending',
+        db.and_(OutboundEmail.status == 'sending', OutboundEmail.locked_at < stale)
+    )
+    due = db.session.execute(
+        db.select(OutboundEmail.id, OutboundEmail.digest_key)
+          .where(claimable, db.or_(OutboundEmail.status == 'sending', OutboundEmail.run_at <= now))
+          .order_by(OutboundEmail.run_at, OutboundEmail.id)
+          .limit(batch_size)
+    ).all()
+    if not due:
+        return []
+
+    targets = OutboundEmail.id.in_([row.id for row in due])
+    digest_keys = {row.digest_key for row in due if row.digest_key}
+    if digest_keys:
+        targets = db.or_(targets, OutboundEmail.digest_key.in_(digest_keys))
+    db.session.execute(
+        db.update(OutboundEmail)
+          .where(targets, claimable)
+          .values(status='sending', locked_at=now, locked_by=worker)
+          .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return OutboundEmail.query.filter_by(status='sending', locked_by=worker, locked_at=now)\
+                              .order_by(OutboundEmail.id).all()
+
+def _render_outbound_email(rows, addresses):
+    """Message pour un email individuel ou le récapitulatif de plusieurs notifications."""
+    first = rows[0]
+    recipient = first.to_address or addresses.get(first.user_id)
+    if not recipient:
+        raise LookupError("Aucune adresse de destination")
+    if not first.digest_key:
+        return build_message(app.config['MAIL_DEFAULT_SENDER'], recipient,
+                             first.subject, first.text_body, first.html_body)
+
+    subject = f"{first.subject} - SignalAlert" if len(rows) == 1 \
+        else f"{len(rows)} nouvelles notifications - SignalAlert"
+    text = "\n\n".join(f"- {row.text_body}\n  {row.link or ''}".rstrip() for row in rows)
+    items = "".join(
+        f'<li><a href="{escape(row.link)}">{escape(row.text_body)}</a></li>' if row.link
+        else f"<li>{escape(row.text_body)}</li>"
+        for row in rows
+    )
+    html = f"<html><body><h1>Vos notifications SignalAlert</h1><ul>{items}</ul></body></html>"
+    return build_message(app.config['MAIL_DEFAULT_SENDER'], recipient, subject, text, html)
+
+def _retry_or_dead_letter(rows, error, recipient=None, permanent=False):
+    """Replanifie les lignes avec backoff, ou les déplace vers email_dead_letter."""
+    message = str(error)[:2000] or type(error).__name__
+    for row in rows:
+        row.attempts += 1
+        row.last_error = message
+        if permanent or row.attempts >= row.max_attempts:
+            db.session.add(EmailDeadLetter(
+                to_address=row.to_address or recipient, subject=row.subject, text_body=row.text_body,
+                html_body=row.html_body, attempts=row.attempts, last_error=message, created_at=row.created_at
+            ))
+            db.session.delete(row)
+        else:
+            row.status = 'pending'
+            row.locked_at = None
+            row.locked_by = None
+            row.run_at = datetime.utcnow() + timedelta(seconds=backoff_delay(row.attempts))
+
+def deliver_outbound_emails(smtp, worker, batch_size):
+    """
+    Envoie un lot d'emails sur la connexion `smtp`. Chaque email est validé
+    séparément : un arrêt brutal ne fait renvoyer que l'email en cours.
+    :return: (lignes traitées, emails envoyés)
+    """
+    rows = _claim_outbound_emails(worker, batch_size)
+    if not rows:
+        return 0, 0
+    user_ids = {row.user_id for row in rows if row.user_id and not row.to_address}
+    addresses = dict(db.session.execute(
+        db.select(User.id, User.email).where(User.id.in_(user_ids))
+    ).all()) if user_ids else {}
+
+    groups = group_digests(rows)
+    sent = 0
+    for index, group in enumerate(groups):
+        recipient = group[0].to_address or addresses.get(group[0].user_id)
+        try:
+            msg = _render_outbound_email(group, addresses)
+            if app.config['MAIL_ENABLED']:
+                smtp.send(msg)
+            else:
+                print(f"[DEV] Email pour {msg['To']} : {msg['Subject']}")
+        except (LookupError, smtplib.SMTPRecipientsRefused) as e:
+            _retry_or_dead_letter(group, e, recipient, permanent=True)
+        except (OSError, smtplib.SMTPException) as e:
+            # Serveur injoignable : inutile d'essayer le reste du lot maintenant
+            print(f"Erreur envoi email: {e}")
+            _retry_or_dead_letter(group, e, recipient)
+            remaining = [row.id for later in groups[index + 1:] for row in later]
+            if remaining:
+                db.session.execute(
+                    db.update(OutboundEmail).where(OutboundEmail.id.in_(remaining))
+                      .values(status='pending', locked_at=None, locked_by=None)
+                      .execution_options(synchronize_session=False)
+                )
+            db.session.commit()
+            return len(rows), sent
+        else:
+            for row in group:
+                db.session.delete(row)
+            sent += 1
+        db.session.commit()
+    return len(rows), sent
+
+def run_mailer(poll_interval=2.0, burst=False):
+    """Boucle d'envoi : garde la connexion SMTP ouverte tant qu'il y a du travail."""
+    smtp = SmtpConnection(app.config['MAIL_SERVER'], app.config['MAIL_PORT'],
+                          app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'],
+                          use_tls=app.config['MAIL_USE_TLS'])
+    worker = worker_id()
+    total = 0
+    try:
+        while True:
+            started = time.monotonic()
+            processed, sent = deliver_outbound_emails(smtp, worker, app.config['MAIL_BATCH_SIZE'])
+            if processed:
+                elapsed = time.monotonic() - started
+                print(f"{sent} email(s) envoyé(s) pour {processed} ligne(s) en {elapsed:.2f} s "
+                      f"({sent / elapsed if elapsed else 0:.1f} emails/s)")
+                total += sent
+                continue
+            db.session.remove()
+            if burst:
+                return total
+            time.sleep(poll_interval)
+    finally:
+        smtp.close()
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@app.context_processor
+def inject_image_sizes():
+    return dict(card_image_sizes=CARD_SIZES, detail_image_sizes=DETAIL_SIZES)
+
 @app.context_processor
 def inject_now():
     return {'now': datetime.utcnow()}
@@ -309,13 +1525,10 @@ def inject_csrf_token():
 @app.context_processor
 def inject_notifications():
     if current_user.is_authenticated:
-        unread_count = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
-        return dict(unread_notifications_count=unread_count)
+        return dict(unread_notifications_count=current_user.unread_notifications or 0)
     return dict(unread_notifications_count=0)
 
-import io
 import base64
-from weasyprint import HTML
 
 def generate_qrcode_for_signalement(signalement_id, url_for_qrcode):
     """
@@ -324,6 +1537,8 @@ def generate_qrcode_for_signalement(signalement_id, url_for_qrcode):
     :param url_for_qrcode: L'URL que le QR code doit encoder.
     :return: L'URL du QR code sauvegardé sur Cloudinary, ou None en cas d'échec.
     """
+    import qrcode  # import différé : bibliothèque chargée au premier QR code
+
     try:
         # Générer le QR code en mémoire
         qr = qrcode.QRCode(
@@ -350,16 +1565,24 @@ def generate_qrcode_for_signalement(signalement_id, url_for_qrcode):
         print(f"Erreur lors de la génération et de l'upload du QR code pour le signalement {signalement_id}: {e}")
         return None
 
-@app.route('/signalement/<int:id>/generer_pdf')
-@login_required
-def generer_signalement_pdf(id):
+pdf_cache = None  # PdfArtifactCache, créé par create_app()
+
+# Récupération mutualisée des images distantes (PDF, miniatures, correspondances...), créée par create_app()
+asset_fetcher = None
+
+def pdf_cache_key(signalement, signalement_url):
+    template_source = app.jinja_env.loader.get_source(app.jinja_env, 'rapport_pdf.html')[0]
+    return pdf_content_key(signalement, signalement_url, template_source)
+
+def render_signalement_pdf(signalement, signalement_url, base_url=None):
     """
     Génère une affiche PDF stylisée pour un signalement en utilisant WeasyPrint.
     """
-    signalement = Signalement.query.get_or_404(id)
-    
-    # 1. Générer le QR Code en mémoire (same as before)
-    signalement_url = url_for('signalement_detail', id=signalement.id, _external=True)
+    # Imports différés : WeasyPrint charge Pango/HarfBuzz, inutile hors rendu PDF
+    import qrcode
+    from weasyprint import HTML
+
+    # 1. Générer le QR Code en mémoire
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
     qr.add_data(signalement_url)
     qr.make(fit=True)
@@ -373,13 +1596,10 @@ def generer_signalement_pdf(id):
     # 2. Encoder l'image du signalement en Base64 (si elle existe)
     image_base64 = None
     if signalement.image_url:
-        try:
-            response = requests.get(signalement.image_url)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            image_base64 = base64.b64encode(response.content).decode('utf-8')
-        except requests.exceptions.RequestException as e:
-            print(f"Warning: Could not fetch image from Cloudinary for PDF generation: {e}")
-            # image_base64 reste None, le template doit gérer ce cas
+        image_bytes = asset_fetcher.fetch(pick_rendition(signalement.renditions, 'jpeg', 960) or signalement.image_url)
+        if image_bytes:
+            image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        # sinon image_base64 reste None, le template doit gérer ce cas
     
     # 3. Rendre le template HTML avec les données
     rendered_html = render_template('rapport_pdf.html', 
@@ -388,33 +1608,71 @@ def generer_signalement_pdf(id):
                                     image_base64=image_base64) # Passer l'image encodée
     
     # 4. Générer le PDF avec WeasyPrint
-    pdf = HTML(string=rendered_html, base_url=request.url_root).write_pdf()
-    
-    # 5. Retourner le PDF en tant que réponse
-    return send_file(
-        io.BytesIO(pdf),
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=f'signalement_{signalement.id}.pdf'
-    )
+    return HTML(string=rendered_html, base_url=base_url).write_pdf()
+
+def enqueue_pdf_render(signalement, signalement_url):
+    """Planifie le pré-rendu de l'affiche ; sans effet si son contenu n'a pas changé."""
+    key = pdf_cache_key(signalement, signalement_url)
+    return enqueue_job('render_pdf', {'signalement_id': signalement.id, 'url': signalement_url},
+                       idempotency_key=f"pdf:{key}")
+
+@job_handler('render_pdf')
+def _render_pdf_job(job):
+    params = job.params
+    signalement = db.session.get(Signalement, params['signalement_id'])
+    if signalement is None:
+        return
+    key = pdf_cache_key(signalement, params['url'])
+    if pdf_cache.get(key):
+        return
+    # Contexte de requête factice : les context processors en ont besoin
+    with app.test_request_context('/'):
+        pdf_cache.store(key, render_signalement_pdf(signalement, params['url']))
+
+@app.route('/signalement/<int:id>/generer_pdf')
+@login_required
+def generer_signalement_pdf(id):
+    """
+    Sert l'affiche PDF d'un signalement depuis le cache disque (rendu à la
+    demande si elle n'a pas encore été pré-générée par le worker).
+    """
+    signalement = Signalement.query.get_or_404(id)
+    signalement_url = url_for('signalement_detail', id=signalement.id, _external=True)
+    key = pdf_cache_key(signalement, signalement_url)
+
+    path = pdf_cache.get(key)
+    if path is None and key not in request.if_none_match:
+        path = pdf_cache.store(key, render_signalement_pdf(signalement, signalement_url, request.url_root))
+
+    if path is None:
+        response = app.response_class(status=304)
+        response.set_etag(key)
+    else:
+        # send_file gère If-None-Match / Range et répond 304 si l'ETag correspond
+        response = send_file(
+            path,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'signalement_{signalement.id}.pdf',
+            etag=key,
+            conditional=True
+        )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 # ROUTES PRINCIPALES
 
 @app.route('/')
+@read_replica
+@cached_public_view()
 def index():
-    signalements = Signalement.query.filter_by(status='active').order_by(Signalement.created_at.desc()).limit(6).all()
-    
-    stats = {
-        'total_signalements': Signalement.query.count(),
-        'found_items': Signalement.query.filter_by(status='found').count(),
-        'total_users': User.query.count(),
-    }
+    signalements = Signalement.query.options(*signalement_card_options())\
+                                    .filter_by(status='active')\
+                                    .order_by(Signalement.created_at.desc())\
+                                    .limit(6).all()
     
-    stats_by_category = {
-        'lost': Signalement.query.filter_by(type='lost', status='active').count(),
-        'missing': Signalement.query.filter_by(type='missing', status='active').count(),
-        'stolen': Signalement.query.filter_by(type='stolen', status='active').count()
-    }
+    stats = get_stats()
+    stats_by_category = stats['by_type']
     
     return render_template('index.html', 
                           signalements=signalements,
@@ -422,9 +1680,22 @@ def index():
                           stats_by_category=stats_by_category,
                           current_user=current_user)
 
+def estimate_signalement_total(type_filter, status_filter):
+    """Total d'une liste filtrée par type/statut lu dans les compteurs matérialisés, ou None."""
+    stats = get_stats()
+    if not type_filter:
+        return {'': stats['total_signalements'],
+                'active': stats['active_signalements'],
+                'found': stats['found_items']}.get(status_filter)
+    if status_filter == 'active':
+        return stats['by_type'].get(type_filter)
+    return None
+
 @app.route('/signalements')
+@read_replica
+@cached_public_view()
 def signalements():
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     type_filter = request.args.get('type', '')
     search = request.args.get('search', '')
     category_filter = request.args.get('category', '')
@@ -432,14 +1703,11 @@ def signalements():
     start_date_filter = request.args.get('start_date', '')
     end_date_filter = request.args.get('end_date', '')
     
-    query = Signalement.query
+    query = Signalement.query.options(*signalement_card_options())
     
     if type_filter:
         query = query.filter_by(type=type_filter)
     
-    if search:
-        query = query.filter(Signalement.title.contains(search) | Signalement.description.contains(search))
-
     if category_filter:
         query = query.filter_by(category=category_filter)
 
@@ -460,11 +1728,31 @@ def signalements():
         except ValueError:
             flash('Format de date de fin invalide.', 'error')
     
-    signalements = query.order_by(Signalement.created_at.desc())\
-                       .paginate(page=page, per_page=12, error_out=False)
+    per_page = app.config.get('ITEMS_PER_PAGE', 12)
+    link_args = {k: v for k, v in request.args.items() if k not in ('page', 'cursor')}
+    
+    if search:
+        # Recherche plein texte triée par pertinence : pagination par numéro de page, sans COUNT
+        rows = apply_search(query, Signalement, search).offset((page - 1) * per_page).limit(per_page + 1).all()
+        signalements = KeysetPage(rows[:per_page])
+        next_url = url_for('signalements', page=page + 1, **link_args) if len(rows) > per_page else None
+        prev_url = url_for('signalements', page=page - 1, **link_args) if page > 1 else None
+    else:
+        # Les plus récents d'abord, pagination par clé (created_at, id)
+        has_other_filters = bool(category_filter or start_date_filter or end_date_filter)
+        total = None if has_other_filters else estimate_signalement_total(type_filter, status_filter)
+        columns = [Signalement.created_at, Signalement.id]
+        try:
+            signalements = keyset_paginate(query, columns, request.args.get('cursor'), per_page, total)
+        except ValueError:
+            signalements = keyset_paginate(query, columns, None, per_page, total)
+        next_url = url_for('signalements', cursor=signalements.next_cursor, **link_args) if signalements.has_next else None
+        prev_url = url_for('signalements', cursor=signalements.prev_cursor, **link_args) if signalements.has_prev else None
     
     return render_template('signalements.html',
                           signalements=signalements,
+                          next_url=next_url,
+                          prev_url=prev_url,
                           current_filter=type_filter,
                           search_query=search,
                           category_query=category_filter,
@@ -474,16 +1762,27 @@ def signalements():
                           current_user=current_user)
 
 @app.route('/map')
+@read_replica
+@cached_public_view(max_age=300)
 def map_view():
     return render_template('map.html', current_user=current_user)
 
 @app.route('/signalement/<int:id>')
+@read_replica
+@cached_public_view(on_anonymous_request=lambda id: record_signalement_view(id))
 def signalement_detail(id):
     signalement = Signalement.query.get_or_404(id)
-    comments = Comment.query.filter_by(signalement_id=id).order_by(Comment.timestamp.desc()).all()
+    comments = Comment.query.options(selectinload(Comment.author).load_only(User.id, User.username))\
+                            .filter_by(signalement_id=id)\
+                            .order_by(Comment.timestamp.desc())\
+                            .all()
+    if current_user.is_authenticated:
+        # Les visiteurs anonymes sont comptés par cached_public_view, y compris sur cache
+        record_signalement_view(signalement.id, signalement.user_id)
     return render_template('signalement_detail.html',
                           signalement=signalement,
                           comments=comments,
+                          pending_views=view_counter.pending(signalement.id),
                           current_user=current_user)
 
 @app.route('/signalement/<int:id>/comment', methods=['POST'])
@@ -517,15 +1816,116 @@ def add_comment(id):
     flash('Votre commentaire a été ajouté.', 'success')
     return redirect(url_for('signalement_detail', id=id))
 
+NOTIFICATIONS_PER_PAGE = 20
+NOTIFICATION_RETENTION_DAYS = 90
+
+def mark_notifications_read(user_id, *criteria):
+    """
+    Marque comme lues, en un seul UPDATE, les notifications non lues de
+    l'utilisateur répondant à `criteria`, et ajuste son compteur.
+    :return: Le nombre de notifications marquées.
+    """
+    result = db.session.execute(
+        db.update(Notification)
+          .where(Notification.user_id == user_id, Notification.is_read == False, *criteria)
+          .values(is_read=True)
+          .execution_options(synchronize_session=False)
+    )
+    marked = result.rowcount
+    if marked:
+        _invalidate_cached_users(db.session, [user_id])
+        db.session.execute(
+            db.update(User)
+              .where(User.id == user_id)
+              .values(unread_notifications=db.case(
+                  (User.unread_notifications > marked, User.unread_notifications - marked), else_=0
+              ))
+        )
+    return marked
+
+def archive_notifications(older_than_days=NOTIFICATION_RETENTION_DAYS, batch_size=1000):
+    """
+    Déplace par lots les notifications lues plus anciennes que `older_than_days`
+    vers notification_archive (INSERT ... SELECT puis DELETE, une transaction par lot).
+    :return: Le nombre de notifications archivées.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    source, archive = Notification.__table__, NotificationArchive.__table__
+    archived = 0
+    while True:
+        ids = db.session.execute(
+            db.select(source.c.id)
+              .where(source.c.is_read == True, source.c.timestamp < cutoff)
+              .order_by(source.c.id)
+              .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return archived
+        db.session.execute(archive.insert().from_select(
+            ['id', 'name', 'user_id', 'timestamp', 'link'],
+            db.select(source.c.id, source.c.name, source.c.user_id, source.c.timestamp, source.c.link)
+              .where(source.c.id.in_(ids))
+        ))
+        db.session.execute(source.delete().where(source.c.id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+
 @app.route('/notifications')
 @login_required
 def notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.timestamp.desc()).all()
-    # Marquer les notifications comme lues
-    for notification in notifications:
-        notification.is_read = True
+    query = Notification.query.filter_by(user_id=current_user.id)
+    columns = [Notification.timestamp, Notification.id]
+    try:
+        page = keyset_paginate(query, columns, request.args.get('cursor'), NOTIFICATIONS_PER_PAGE)
+    except ValueError:
+        page = keyset_paginate(query, columns, None, NOTIFICATIONS_PER_PAGE)
+
+    # Seule la page affichée est marquée comme lue ; les objets sont détachés
+    # pour garder leur état d'origine (mise en évidence des nouvelles).
+    unread_ids = [n.id for n in page.items if not n.is_read]
+    for notification in page.items:
+        db.session.expunge(notification)
+    if unread_ids:
+        mark_notifications_read(current_user.id, Notification.id.in_(unread_ids))
+        db.session.commit()
+
+    # Jeton « tout marquer jusqu'ici » : clé de la notification la plus récente affichée
+    mark_read_until = encode_cursor([page.items[0].timestamp.isoformat(), page.items[0].id]) if page.items else None
+    return render_template('notifications.html',
+                           notifications=page.items,
+                           mark_read_until=mark_read_until,
+                           next_url=url_for('notifications', cursor=page.next_cursor) if page.has_next else None,
+                           prev_url=url_for('notifications', cursor=page.prev_cursor) if page.has_prev else None)
+
+@app.route('/notifications/mark-read', methods=['POST'])
+@login_required
+def mark_all_notifications_read():
+    """Marque comme lues toutes les notifications jusqu'au jeton fourni (ou toutes)."""
+    criteria = []
+    until = decode_cursor(request.form.get('until'))
+    if until and len(until) == 2:
+        try:
+            key = (datetime.fromisoformat(until[0]), int(until[1]))
+        except (TypeError, ValueError):
+            key = None
+        if key:
+            criteria.append(db.tuple_(Notification.timestamp, Notification.id) <= db.tuple_(*key))
+    marked = mark_notifications_read(current_user.id, *criteria)
     db.session.commit()
-    return render_template('notifications.html', notifications=notifications)
+    flash(f"{marked} notification(s) marquée(s) comme lue(s).", 'success')
+    return redirect(url_for('notifications'))
+
+@app.route('/notifications/stream')
+@login_required
+def notifications_stream():
+    """Flux SSE : nouvelles notifications et compteur de non lues, sans sondage côté page."""
+    user_id = current_user.id
+    unread_count = current_user.unread_notifications or 0
+    db.session.remove()  # ne pas garder de connexion pendant la durée du flux
+    response = Response(notification_broker.stream(user_id, unread_count), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/politique-de-confidentialite')
 def politique_de_confidentialite():
@@ -555,17 +1955,11 @@ def dashboard():
 @login_required
 def nouveau_signalement():
     if request.method == 'POST':
-        image_url = None
+        image_file = None
         if 'image' in request.files:
             file = request.files['image']
             if file and allowed_file(file.filename):
-                # Upload to Cloudinary
-                uploaded_url = upload_to_cloudinary(file.stream, "signal_images")
-                if uploaded_url:
-                    image_url = uploaded_url
-                else:
-                    flash('Erreur lors de l\'upload de l\'image vers Cloudinary.', 'error')
-                    return redirect(request.url)
+                image_file = file # Uploaded to Cloudinary by the background worker
             elif file.filename != '':
                 flash('Type de fichier image non autorisé.', 'error')
                 return redirect(request.url)
@@ -590,24 +1984,19 @@ def nouveau_signalement():
             contact=request.form.get('contact', current_user.email),
             reward=request.form.get('reward'),
             user_id=current_user.id,
-            image_url=image_url, # Use the Cloudinary URL
             lat=lat,
             lng=lng
         )
         db.session.add(signalement)
-        db.session.commit() # Commit to get the signalement.id
-
-        # Generate shareable URL for the signalement
-        signalement_url = url_for('signalement_detail', id=signalement.id, _external=True)
-        print(f"DEBUG: Generated Signalement URL: {signalement_url}")
-
-        # Generate and upload the QR code to Cloudinary
-        qr_code_url = generate_qrcode_for_signalement(signalement.id, signalement_url)
-        print(f"DEBUG: Generated QR Code URL: {qr_code_url}")
-
-        if qr_code_url:
-            signalement.qr_code_url = qr_code_url
-            db.session.commit() # Commit the QR code URL update
+        db.session.flush() # Get the signalement.id
+
+        # Image and QR code are uploaded by the worker, committed with the signalement
+        if image_file:
+            enqueue_image_upload(signalement, image_file)
+        enqueue_qrcode(signalement)
+        enqueue_pdf_render(signalement, url_for('signalement_detail', id=signalement.id, _external=True))
+        enqueue_matching(signalement)
+        db.session.commit()
 
         flash('Signalement créé avec succès !', 'success')
         return redirect(url_for('signalement_detail', id=signalement.id))
@@ -625,17 +2014,11 @@ def edit_signalement(id):
         return redirect(url_for('signalement_detail', id=signalement.id))
 
     if request.method == 'POST':
-        image_url = signalement.image_url # Keep existing image if no new one uploaded
+        image_file = None # Keep existing image if no new one uploaded
         if 'image' in request.files:
             file = request.files['image']
             if file and allowed_file(file.filename):
-                # Upload to Cloudinary
-                uploaded_url = upload_to_cloudinary(file.stream, "signal_images")
-                if uploaded_url:
-                    image_url = uploaded_url
-                else:
-                    flash('Erreur lors de l\'upload de l\'image vers Cloudinary.', 'error')
-                    return redirect(request.url)
+                image_file = file # Uploaded to Cloudinary by the background worker
             elif file.filename != '':
                 flash('Type de fichier image non autorisé.', 'error')
                 return redirect(request.url)
@@ -649,7 +2032,6 @@ def edit_signalement(id):
         signalement.category = request.form.get('category')
         signalement.contact = request.form.get('contact', current_user.email)
         signalement.reward = request.form.get('reward')
-        signalement.image_url = image_url # Update image_url with Cloudinary URL
         
         # Update new fields (if present in form)
         signalement.lat = request.form.get('lat', type=float)
@@ -659,12 +2041,12 @@ def edit_signalement(id):
         signalement.phone = request.form.get('phone')
         signalement.email = request.form.get('email')
 
-        # Re-generate QR code if data that affects the URL has changed (optional, but good practice)
-        # For now, just re-generate it to ensure consistency if any detail changes.
-        signalement_url = url_for('signalement_detail', id=signalement.id, _external=True)
-        qr_code_url = generate_qrcode_for_signalement(signalement.id, signalement_url)
-        if qr_code_url:
-            signalement.qr_code_url = qr_code_url
+        if image_file:
+            enqueue_image_upload(signalement, image_file)
+        # No-op unless the encoded URL / poster content changed (idempotency keys)
+        enqueue_qrcode(signalement)
+        enqueue_pdf_render(signalement, url_for('signalement_detail', id=signalement.id, _external=True))
+        enqueue_matching(signalement)
         
         db.session.commit()
         flash('Signalement mis à jour avec succès !', 'success')
@@ -750,14 +2132,10 @@ def profile():
             if file.filename == '':
                 flash('Aucun fichier sélectionné pour l\'avatar.', 'warning')
             elif file and allowed_file(file.filename):
-                # Upload to Cloudinary
-                uploaded_url = upload_to_cloudinary(file.stream, "avatars", public_id=f"user_avatar_{current_user.id}")
-                if uploaded_url:
-                    current_user.avatar_url = uploaded_url
-                    db.session.commit()
-                    flash('Votre photo de profil a été mise à jour !', 'success')
-                else:
-                    flash('Erreur lors de l\'upload de l\'image de profil vers Cloudinary.', 'error')
+                # Recadrage et envoi vers Cloudinary par le worker
+                enqueue_avatar_upload(current_user, file)
+                db.session.commit()
+                flash('Votre photo de profil sera mise à jour dans quelques instants.', 'success')
             else:
                 flash('Type de fichier image non autorisé pour l\'avatar.', 'error')
         
@@ -766,7 +2144,8 @@ def profile():
     user_signalements = Signalement.query.filter_by(user_id=current_user.id)\
                                         .order_by(Signalement.created_at.desc())\
                                         .all()
-    user_comments = Comment.query.filter_by(user_id=current_user.id)\
+    user_comments = Comment.query.options(selectinload(Comment.signalement).load_only(Signalement.id, Signalement.title))\
+                                 .filter_by(user_id=current_user.id)\
                                  .order_by(Comment.timestamp.desc())\
                                  .all()
     
@@ -874,9 +2253,18 @@ def change_password():
 # API ROUTES
 
 @app.route('/api/signalements', methods=['GET'])
+@read_replica
+@cached_public_view()
 def api_get_signalements():
-    signalements = Signalement.query.filter_by(status='active').all()
-    return jsonify([{
+    """Signalements actifs, du plus récent au plus ancien, paginés par curseur opaque."""
+    limit = max(1, min(request.args.get('limit', 50, type=int), 100))
+    query = Signalement.query.options(*signalement_api_options()).filter_by(status='active')
+    try:
+        page = keyset_paginate(query, [Signalement.created_at, Signalement.id],
+                               request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Curseur invalide'}), 400
+    items = [{
         'id': s.id,
         'type': s.type,
         'title': s.title,
@@ -886,25 +2274,227 @@ def api_get_signalements():
         'category': s.category,
         'reward': s.reward,
         'image_url': s.image_url,
+        'image_renditions': s.renditions,
         'author': s.author.username if s.author else 'Anonyme'
-    } for s in signalements])
+    } for s in page.items]
+    return jsonify({
+        'items': items,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    })
+
+# EXPORTS EN FLUX
+
+SIGNALEMENT_EXPORT_FIELDS = ('id', 'type', 'status', 'title', 'description', 'location', 'date',
+                             'category', 'reward', 'lat', 'lng', 'image_url', 'created_at')
+ADMIN_EXPORTS = {
+    'users': (User, ('id', 'username', 'email', 'created_at', 'is_active')),
+    'signalements': (Signalement, SIGNALEMENT_EXPORT_FIELDS + ('user_id', 'contact', 'phone', 'email', 'views')),
+    'comments': (Comment, ('id', 'signalement_id', 'user_id', 'timestamp', 'content')),
+}
+
+def _parse_export_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def stream_export(model, fields, fmt, filename, criteria=()):
+    """
+    Réponse en flux d'un export : colonnes seules (pas d'objets ORM), lues par
+    lots de EXPORT_BATCH_SIZE via un curseur côté serveur.
+    """
+    columns = [getattr(model, field) for field in fields]
+    statement = db.select(*columns).where(*criteria).order_by(model.id)\
+                  .execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    def generate():
+        result = db.session.execute(statement)
+        try:
+            yield from EXPORT_WRITERS[fmt](result, fields)
+        finally:
+            result.close()
+
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/signalements/export.<fmt>')
+@read_replica
+@login_required
+def api_export_signalements(fmt):
+    """
+    Export NDJSON, CSV ou JSON des signalements, filtrable par type, statut et
+    date de création (since/until au format AAAA-MM-JJ, bornes incluses).
+    """
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format inconnu, attendu : {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        since, until = _parse_export_date('since'), _parse_export_date('until')
+    except ValueError:
+        return jsonify({'error': 'Date invalide (format attendu : AAAA-MM-JJ)'}), 400
+
+    criteria = [Signalement.status == request.args.get('status', 'active')]
+    if request.args.get('type'):
+        criteria.append(Signalement.type == request.args['type'])
+    if since:
+        criteria.append(Signalement.created_at >= since)
+    if until:
+        criteria.append(Signalement.created_at < until + timedelta(days=1))
+    return stream_export(Signalement, SIGNALEMENT_EXPORT_FIELDS, fmt, 'signalements', criteria)
+
+@app.route('/admin/export/<dataset>.<fmt>')
+@login_required
+def admin_export(dataset, fmt):
+    """Export complet d'une table pour l'administrateur (utilisateurs, signalements, commentaires)."""
+    if current_user.email != 'admin@signalalert.bj':
+        return "Accès non autorisé", 403
+    if dataset not in ADMIN_EXPORTS or fmt not in EXPORT_FORMATS:
+        return "Export inconnu", 404
+    model, fields = ADMIN_EXPORTS[dataset]
+    return stream_export(model, fields, fmt, dataset)
+
+LOCATIONS_MAX_POINTS = 1000
 
 @app.route('/api/signalements/locations')
+@read_replica
+@cached_public_view()
 def api_get_signalement_locations():
-    signalements_with_location = Signalement.query.filter(
-        Signalement.lat.isnot(None),
-        Signalement.lng.isnot(None)
+    """
+    Signalements localisés, les plus récents d'abord, au plus
+    LOCATIONS_MAX_POINTS : tous (contrat historique, conservé pour les
+    clients existants) ou ceux de la zone visible (bbox=ouest,sud,est,nord).
+    La carte passe par /api/signalements/clusters.
+    """
+    limit = min(max(request.args.get('limit', LOCATIONS_MAX_POINTS, type=int), 1), LOCATIONS_MAX_POINTS)
+    points = db.session.query(Signalement.id, Signalement.title, Signalement.type,
+                              Signalement.lat, Signalement.lng)
+    if 'bbox' in request.args:
+        bbox = parse_bbox(request.args['bbox'])
+        if bbox is None:
+            return jsonify({'error': 'Paramètre bbox invalide'}), 400
+        south, west, north, east = bbox
+        points = filter_bbox(points, Signalement, south, west, north, east)
+    else:
+        points = points.filter(Signalement.lat.isnot(None), Signalement.lng.isnot(None))
+    points = points.order_by(Signalement.created_at.desc(), Signalement.id.desc()).limit(limit).all()
+    return jsonify([{'id': p.id, 'title': p.title, 'type': p.type, 'lat': p.lat, 'lng': p.lng}
+                    for p in points])
+
+@app.route('/api/signalements/clusters')
+@read_replica
+def api_get_signalement_clusters():
+    """
+    Agrégats pré-calculés de la zone visible (bbox=ouest,sud,est,nord), ou
+    signalements individuels au-delà du zoom POINTS_MIN_ZOOM.
+    """
+    bbox = parse_bbox(request.args.get('bbox'))
+    zoom = request.args.get('zoom', type=int)
+    if bbox is None or zoom is None:
+        return jsonify({'error': 'Paramètres bbox et zoom requis'}), 400
+    south, west, north, east = bbox
+
+    if zoom >= POINTS_MIN_ZOOM:
+        points = db.session.query(Signalement.id, Signalement.title, Signalement.type,
+                                  Signalement.lat, Signalement.lng).filter(Signalement.status == 'active')
+        points = filter_bbox(points, Signalement, south, west, north, east).limit(1000).all()
+        return jsonify({
+            'zoom': zoom,
+            'clusters': [],
+            'points': [{'id': p.id, 'title': p.title, 'type': p.type, 'lat': p.lat, 'lng': p.lng}
+                       for p in points]
+        })
+
+    precision = precision_for_zoom(zoom)
+    # Marge d'une demi-cellule pour inclure les cellules partiellement visibles
+    dlat, dlng = geohash_cell_size(precision)
+    clusters = MapCluster.query.filter(
+        MapCluster.precision == precision,
+        MapCluster.center_lat.between(south - dlat / 2, north + dlat / 2),
+        MapCluster.center_lng.between(west - dlng / 2, east + dlng / 2)
     ).all()
-    
-    locations = [{
-        'id': s.id,
-        'title': s.title,
-        'type': s.type,
-        'lat': s.lat,
-        'lng': s.lng
-    } for s in signalements_with_location]
-    
-    return jsonify(locations)
+    return jsonify({
+        'zoom': zoom,
+        'clusters': [{'cell': c.cell, 'lat': c.lat_sum / c.total, 'lng': c.lng_sum / c.total, 'count': c.total}
+                     for c in clusters],
+        'points': []
+    })
+
+@app.route('/api/images/similar', methods=['POST'])
+@login_required
+def api_similar_images():
+    """Signalements dont la photo ressemble à l'image envoyée (avertissement de doublon)."""
+    file = request.files.get('image')
+    if not file or not allowed_file(file.filename):
+        return jsonify({'error': 'Image manquante ou non autorisée'}), 400
+    try:
+        image_hash = image_dhash(file.read())
+    except UnreadableImage:
+        return jsonify({'error': 'Image illisible'}), 400
+    exclude_id = request.form.get('exclude_id', type=int)
+    similar = find_similar_images(image_hash, DUPLICATE_DISTANCE, exclude_id=exclude_id)
+    return jsonify({
+        'items': [{
+            'id': s.id,
+            'title': s.title,
+            'type': s.type,
+            'url': url_for('signalement_detail', id=s.id),
+            'distance': distance,
+            'mine': s.user_id == current_user.id,
+        } for s, distance in similar[:10]]
+    })
+
+@app.route('/api/signalements/nearby')
+@read_replica
+def api_get_nearby_signalements():
+    """
+    Signalements actifs dans un rayon autour d'un point, triés par distance.
+    Pagination par curseur opaque sur (distance, id).
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radius_km = request.args.get('radius_km', 5.0, type=float)
+    type_filter = request.args.get('type', '')
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'Paramètres lat et lng requis'}), 400
+    if not 0 < radius_km <= 50:
+        return jsonify({'error': 'radius_km doit être compris entre 0 et 50'}), 400
+
+    cursor = decode_cursor(request.args.get('cursor'))
+    if request.args.get('cursor') and not (
+            cursor is not None and len(cursor) == 2 and isinstance(cursor[0], (int, float))
+            and isinstance(cursor[1], int) and not isinstance(cursor[0], bool)):
+        return jsonify({'error': 'Curseur invalide'}), 400
+
+    query = db.session.query(Signalement.id, Signalement.title, Signalement.type, Signalement.category,
+                             Signalement.location, Signalement.image_url, Signalement.lat, Signalement.lng)\
+                      .filter(Signalement.status == 'active')
+    if type_filter:
+        query = query.filter(Signalement.type == type_filter)
+    # Tri, curseur et limite en SQL : une page ne lit que limit + 1 lignes
+    rows = nearest(query, Signalement, lat, lng, radius_km, after=cursor, limit=limit + 1).all()
+
+    page = rows[:limit]
+    next_cursor = encode_cursor([page[-1].distance_km, page[-1].id]) if len(rows) > limit else None
+
+    return jsonify({
+        'items': [{
+            'id': row.id,
+            'title': row.title,
+            'type': row.type,
+            'category': row.category,
+            'location': row.location,
+            'image_url': row.image_url,
+            'lat': row.lat,
+            'lng': row.lng,
+            'distance_km': round(row.distance_km, 3)
+        } for row in page],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/api/signalements', methods=['POST'])
 @login_required
@@ -922,16 +2512,21 @@ def api_create_signalement():
         user_id=current_user.id
     )
     db.session.add(signalement)
+    db.session.flush() # Get the signalement.id
+    enqueue_matching(signalement)
     db.session.commit()
     return jsonify({'message': 'Signalement créé', 'id': signalement.id}), 201
 
 @app.route('/api/stats')
+@read_replica
+@cached_public_view()
 def api_stats():
+    stats = get_stats()
     return jsonify({
-        'total_signalements': Signalement.query.count(),
-        'active_signalements': Signalement.query.filter_by(status='active').count(),
-        'found_items': Signalement.query.filter_by(status='found').count(),
-        'total_users': User.query.count()
+        'total_signalements': stats['total_signalements'],
+        'active_signalements': stats['active_signalements'],
+        'found_items': stats['found_items'],
+        'total_users': stats['total_users']
     })
 
 @app.route('/api/signalements/<int:id>/found', methods=['PUT'])
@@ -948,21 +2543,290 @@ def api_mark_as_found(id):
 
 # ROUTES ADMIN
 
+@app.route('/admin/cache-stats')
+@login_required
+def admin_cache_stats():
+    """Fréquentation et latence des caches, pour la supervision."""
+    if current_user.email != 'admin@signalalert.bj':
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    return jsonify({
+        'responses': response_cache.snapshot(),
+        'fragments': fragment_cache.snapshot(),
+        'assets': dict(asset_fetcher.stats),
+        'users': dict(user_cache.stats),
+        'image_index': dict(image_index.stats),
+        'views': dict(view_counter.stats),
+    })
+
+@app.route('/admin/db-pool')
+@login_required
+def admin_db_pool():
+    """Pool de connexions SQL de ce worker : occupation, saturation et attente des checkouts."""
+    if current_user.email != 'admin@signalalert.bj':
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    status = pool_status(db.engine)
+    status['queries'] = bind_query_counts[db.engine]
+    if sqlite_writer is not None:
+        status['sqlite_writer'] = dict(sqlite_writer.stats)
+    if replica_router is not None:
+        lags = replica_router.status()
+        status['replicas'] = {name: dict(pool_status(engine), queries=bind_query_counts[engine], **lags[name])
+                              for name, engine in replica_router.engines.items()}
+    return jsonify(status)
+
 @app.route('/admin/donnees')
 @login_required
 def admin_donnees():
+    """Console d'administration : les tableaux sont chargés page par page depuis /admin/api/<table>."""
     if current_user.email != 'admin@signalalert.bj':
         return "Accès non autorisé", 403
-    
-    users = User.query.all()
-    signalements = Signalement.query.all()
-    all_comments = Comment.query.order_by(Comment.timestamp.desc()).all()
-    
-    return render_template('admin_donnees.html',
-                          users=users,
-                          signalements=signalements,
-                          all_comments=all_comments,
-                          current_user=current_user)
+    return render_template('admin_donnees.html', stats=get_stats(), current_user=current_user)
+
+# Console d'administration : listes paginées par clé et actions groupées
+
+ADMIN_PAGE_SIZE = 50
+ADMIN_BULK_MAX_IDS = 1000
+
+def _admin_author_criteria(column):
+    """Filtre `author` : identifiant ou email exact de l'auteur. None si l'auteur est inconnu."""
+    author = request.args.get('author', '').strip()
+    if not author:
+        return []
+    if author.isdigit():
+        return [column == int(author)]
+    user_id = db.session.scalar(db.select(User.id).where(User.email == author))
+    return None if user_id is None else [column == user_id]
+
+def _admin_date_criteria(column):
+    """Filtres since/until (AAAA-MM-JJ, bornes incluses). :raises ValueError: si une date est invalide."""
+    since, until = _parse_export_date('since'), _parse_export_date('until')
+    criteria = []
+    if since:
+        criteria.append(column >= since)
+    if until:
+        criteria.append(column < until + timedelta(days=1))
+    return criteria
+
+def _admin_page(query, columns, serialize):
+    limit = max(1, min(request.args.get('limit', ADMIN_PAGE_SIZE, type=int), 200))
+    try:
+        page = keyset_paginate(query, columns, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Curseur invalide'}), 400
+    return jsonify({
+        'items': [serialize(row) for row in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    })
+
+def _admin_filtered(query, *criteria_builders):
+    """Applique les filtres ; renvoie None si l'un d'eux ne peut correspondre à aucune ligne."""
+    for criteria in criteria_builders:
+        if criteria is None:
+            return None
+        query = query.filter(*criteria)
+    return query
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+@app.route('/admin/api/users')
+@login_required
+def admin_api_users():
+    """Utilisateurs, filtrables par email ou pseudo (q : email exact ou préfixe), statut et date d'inscription."""
+    if current_user.email != 'admin@signalalert.bj':
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    criteria = []
+    q = request.args.get('q', '').strip()
+    if q:
+        # Email exact ou préfixe : recherches servies par les index uniques
+        criteria.append(User.email == q if '@' in q else
+                        db.or_(User.email.startswith(q, autoescape=True),
+                               User.username.startswith(q, autoescape=True)))
+    status = request.args.get('status')
+    if status in ('active', 'inactive'):
+        criteria.append(User.is_active == (status == 'active'))
+    try:
+        dates = _admin_date_criteria(User.created_at)
+    except ValueError:
+        return jsonify({'error': 'Date invalide (format attendu : AAAA-MM-JJ)'}), 400
+
+    query = db.session.query(User.id, User.username, User.email, User.is_active, User.created_at)
+    query = _admin_filtered(query, criteria, dates)
+    return _admin_page(query, [User.created_at, User.id], lambda u: {
+        'id': u.id,
+        'username': u.username,
+        'email': u.email,
+        'is_active': bool(u.is_active),
+        'created_at': _isoformat(u.created_at),
+    })
+
+@app.route('/admin/api/signalements')
+@login_required
+def admin_api_signalements():
+    """Signalements, filtrables par statut, type, auteur et date de création."""
+    if current_user.email != 'admin@signalalert.bj':
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    criteria = []
+    if request.args.get('status'):
+        criteria.append(Signalement.status == request.args['status'])
+    if request.args.get('type'):
+        criteria.append(Signalement.type == request.args['type'])
+    try:
+        dates = _admin_date_criteria(Signalement.created_at)
+    except ValueError:
+        return jsonify({'error': 'Date invalide (format attendu : AAAA-MM-JJ)'}), 400
+
+    query = db.session.query(Signalement.id, Signalement.title, Signalement.type, Signalement.status,
+                             Signalement.created_at, Signalement.user_id, User.username.label('author'))\
+                      .join(User, Signalement.user_id == User.id)
+    query = _admin_filtered(query, criteria, dates, _admin_author_criteria(Signalement.user_id))
+    if query is None:
+        return jsonify({'items': [], 'next_cursor': None, 'prev_cursor': None})
+    return _admin_page(query, [Signalement.created_at, Signalement.id], lambda s: {
+        'id': s.id,
+        'title': s.title,
+        'type': s.type,
+        'status': s.status,
+        'created_at': _isoformat(s.created_at),
+        'author_id': s.user_id,
+        'author': s.author,
+        'url': url_for('signalement_detail', id=s.id),
+    })
+
+@app.route('/admin/api/comments')
+@login_required
+def admin_api_comments():
+    """Commentaires, filtrables par auteur, signalement et date."""
+    if current_user.email != 'admin@signalalert.bj':
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    criteria = []
+    signalement_id = request.args.get('signalement_id', type=int)
+    if signalement_id:
+        criteria.append(Comment.signalement_id == signalement_id)
+    try:
+        dates = _admin_date_criteria(Comment.timestamp)
+    except ValueError:
+        return jsonify({'error': 'Date invalide (format attendu : AAAA-MM-JJ)'}), 400
+
+    query = db.session.query(Comment.id, db.func.substr(Comment.content, 1, 120).label('content'),
+                             Comment.timestamp, Comment.user_id, Comment.signalement_id,
+                             User.username.label('author'), Signalement.title.label('signalement_title'))\
+                      .join(User, Comment.user_id == User.id)\
+                      .join(Signalement, Comment.signalement_id == Signalement.id)
+    query = _admin_filtered(query, criteria, dates, _admin_author_criteria(Comment.user_id))
+    if query is None:
+        return jsonify({'items': [], 'next_cursor': None, 'prev_cursor': None})
+    return _admin_page(query, [Comment.timestamp, Comment.id], lambda c: {
+        'id': c.id,
+        'content': c.content,
+        'timestamp': _isoformat(c.timestamp),
+        'author_id': c.user_id,
+        'author': c.author,
+        'signalement_id': c.signalement_id,
+        'signalement_title': c.signalement_title,
+        'url': url_for('signalement_detail', id=c.signalement_id),
+    })
+
+def bulk_delete_signalements(ids):
+    """
+    Supprime des signalements, leurs commentaires et leurs correspondances en
+    quelques requêtes ensemblistes. Celles-ci ne passent pas par les hooks
+    after_flush : agrégats de la carte, compteurs de statistiques, match_count
+    des signalements liés et version du contenu sont corrigés ici, dans la
+    même transaction.
+    :return: Le nombre de signalements supprimés.
+    """
+    rows = db.session.execute(
+        db.select(Signalement.id, Signalement.status, Signalement.type, Signalement.lat, Signalement.lng)
+          .where(Signalement.id.in_(ids))
+    ).all()
+    if not rows:
+        return 0
+    found = [row.id for row in rows]
+
+    counters = defaultdict(int)
+    clusters = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in rows:
+        for key in signalement_counter_keys(row.status, row.type):
+            counters[key] -= 1
+        if row.status == 'active' and row.lat is not None and row.lng is not None:
+            _add_cluster_delta(clusters, row.lat, row.lng, -1)
+
+    linked = db.or_(Match.signalement1_id.in_(found), Match.signalement2_id.in_(found))
+    partners = set()
+    for pair in db.session.execute(db.select(Match.signalement1_id, Match.signalement2_id).where(linked)):
+        partners.update(pair)
+    partners.difference_update(found)
+
+    db.session.execute(db.delete(Match).where(linked))
+    db.session.execute(db.delete(Comment).where(Comment.signalement_id.in_(found)))
+    db.session.execute(db.delete(Signalement).where(Signalement.id.in_(found)))
+    if partners:
+        db.session.execute(db.update(Signalement)
+                             .where(Signalement.id.in_(sorted(partners)))
+                             .values(match_count=match_count_subquery(), updated_at=Signalement.updated_at))
+
+    _apply_cluster_deltas(db.session.connection(), clusters)
+    _apply_stat_deltas(db.session, counters)
+    _mark_content_changed(db.session)
+    return len(found)
+
+def bulk_delete_comments(ids):
+    """Supprime des commentaires en une requête. :return: Le nombre de commentaires supprimés."""
+    deleted = db.session.execute(db.delete(Comment).where(Comment.id.in_(ids))).rowcount
+    if deleted:
+        _mark_content_changed(db.session)
+    return deleted
+
+def bulk_set_users_active(ids, active):
+    """
+    Active ou désactive des comptes en une requête (jamais le compte
+    administrateur principal). :return: Le nombre de comptes modifiés.
+    """
+    changed = db.session.scalars(
+        db.select(User.id).where(User.id.in_(ids), User.email != 'admin@signalalert.bj',
+                                 db.or_(User.is_active.is_(None), User.is_active != active))
+    ).all()
+    if not changed:
+        return 0
+    db.session.execute(db.update(User).where(User.id.in_(changed)).values(is_active=active))
+    _invalidate_cached_users(db.session, changed)
+    _mark_content_changed(db.session)
+    return len(changed)
+
+ADMIN_BULK_ACTIONS = {
+    ('signalements', 'delete'): bulk_delete_signalements,
+    ('comments', 'delete'): bulk_delete_comments,
+    ('users', 'deactivate'): lambda ids: bulk_set_users_active(ids, False),
+    ('users', 'activate'): lambda ids: bulk_set_users_active(ids, True),
+}
+
+@app.route('/admin/api/<dataset>/bulk', methods=['POST'])
+@login_required
+def admin_api_bulk(dataset):
+    """Action groupée : {"action": "delete" | "activate" | "deactivate", "ids": [...]}."""
+    if current_user.email != 'admin@signalalert.bj':
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    data = request.get_json(silent=True) or {}
+    action = ADMIN_BULK_ACTIONS.get((dataset, data.get('action')))
+    if action is None:
+        return jsonify({'error': 'Action inconnue'}), 400
+    try:
+        ids = sorted({int(i) for i in data.get('ids') or []})
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Identifiants invalides'}), 400
+    if not ids or len(ids) > ADMIN_BULK_MAX_IDS:
+        return jsonify({'error': f'Entre 1 et {ADMIN_BULK_MAX_IDS} identifiants attendus'}), 400
+
+    try:
+        affected = action(ids)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erreur lors de l'action groupée {data.get('action')} sur {dataset}: {e}")
+        return jsonify({'error': "L'action a échoué"}), 500
+    return jsonify({'affected': affected})
 
 @app.route('/admin/user/<int:user_id>/toggle_active', methods=['POST'])
 @login_required
@@ -1022,6 +2886,141 @@ def cleanup_tokens():
     
     return f"{len(expired_tokens)} tokens expirés nettoyés"
 
+# COMMANDES CLI
+
+@app.cli.command('backfill-image-hashes')
+@click.option('--workers', type=int, default=8, show_default=True, help='Téléchargements simultanés.')
+@click.option('--batch-size', type=int, default=200, show_default=True)
+def backfill_image_hashes_command(workers, batch_size):
+    """Calcule l'empreinte perceptuelle des images existantes (téléchargées en parallèle)."""
+    def compute(row):
+        data = asset_fetcher.fetch(pick_rendition(parse_renditions(row.image_renditions), 'jpeg', 320) or row.image_url)
+        if not data:
+            return row.id, None
+        try:
+            return row.id, image_dhash(data)
+        except UnreadableImage:
+            return row.id, None
+
+    done = failed = 0
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            rows = db.session.execute(
+                db.select(Signalement.id, Signalement.image_url, Signalement.image_renditions)
+                  .where(Signalement.id > last_id, Signalement.image_url.isnot(None),
+                         Signalement.image_hash.is_(None))
+                  .order_by(Signalement.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            updates = []
+            for signalement_id, image_hash in executor.map(compute, rows):
+                if image_hash:
+                    updates.append({'b_id': signalement_id, 'b_hash': image_hash})
+                else:
+                    failed += 1
+            if updates:
+                table = Signalement.__table__
+                db.session.execute(
+                    table.update().where(table.c.id == db.bindparam('b_id')).values(image_hash=db.bindparam('b_hash')),
+                    updates
+                )
+                db.session.commit()
+            done += len(updates)
+            click.echo(f"... {done} empreinte(s) calculée(s)")
+    image_index.invalidate()
+    click.echo(f"{done} empreinte(s) calculée(s), {failed} image(s) inaccessible(s) ou illisible(s).")
+
+@app.cli.command('rematch-all')
+@click.option('--workers', type=int, default=None, help='Nombre de processus (défaut : nombre de CPU).')
+def rematch_all_command(workers):
+    """Recalcule toutes les correspondances en masse."""
+    records = [to_record(s) for s in Signalement.query.filter_by(status='active').all()]
+    pairs = rematch_all(records, workers=workers)
+
+    # Les paires confirmées ou rejetées sont conservées telles quelles
+    Match.query.filter_by(status='pending').delete(synchronize_session=False)
+    decided = {(m.signalement1_id, m.signalement2_id) for m in Match.query.all()}
+    new_matches = []
+    for id1, id2, score in pairs:
+        key = (min(id1, id2), max(id1, id2))
+        if key not in decided:
+            decided.add(key)
+            new_matches.append({'signalement1_id': key[0], 'signalement2_id': key[1],
+                                'similarity_score': score, 'status': 'pending'})
+    if new_matches:
+        db.session.execute(db.insert(Match), new_matches)
+
+    db.session.execute(db.update(Signalement).values(match_count=match_count_subquery()))
+    db.session.commit()
+    click.echo(f"{len(new_matches)} correspondances calculées pour {len(records)} signalements.")
+
+@app.cli.command('run-worker')
+@click.option('--burst', is_flag=True, help="S'arrêter quand la file est vide.")
+@click.option('--poll-interval', type=float, default=1.0, help='Attente entre deux scrutations (secondes).')
+def run_worker_command(burst, poll_interval):
+    """Exécute les tâches d'arrière-plan (uploads, QR codes...)."""
+    click.echo(f"Worker démarré ({len(job_handlers)} types de tâches).")
+    detect_index_backends()
+    image_index.start()
+    if sqlite_writer is not None:
+        schedule_sqlite_maintenance(delay=0)
+        db.session.commit()
+    processed = run_job_worker(db, Job, job_handlers, poll_interval=poll_interval, burst=burst)
+    click.echo(f"{processed} tâche(s) traitée(s).")
+
+@app.cli.command('run-mailer')
+@click.option('--burst', is_flag=True, help="S'arrêter quand la file est vide.")
+@click.option('--poll-interval', type=float, default=2.0, help='Attente entre deux scrutations (secondes).')
+def run_mailer_command(burst, poll_interval):
+    """Envoie les emails en attente (réinitialisations, récapitulatifs de notifications)."""
+    sent = run_mailer(poll_interval=poll_interval, burst=burst)
+    click.echo(f"{sent} email(s) envoyé(s).")
+
+@app.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recalcule les compteurs de statistiques et signale les écarts."""
+    drift = reconcile_stat_counters()
+    for name, (stored, actual) in sorted(drift.items()):
+        click.echo(f"Écart sur '{name}' : {stored} enregistré, {actual} réel")
+    click.echo("Compteurs à jour." if not drift else f"{len(drift)} compteur(s) corrigé(s).")
+
+@app.cli.command('archive-notifications')
+@click.option('--days', default=NOTIFICATION_RETENTION_DAYS, show_default=True,
+              help="Ancienneté minimale (en jours) des notifications lues à archiver.")
+@click.option('--batch-size', default=1000, show_default=True)
+def archive_notifications_command(days, batch_size):
+    """Archive les anciennes notifications lues (à planifier, par exemple chaque nuit)."""
+    archived = archive_notifications(days, batch_size)
+    click.echo(f"{archived} notification(s) archivée(s).")
+
+@app.cli.command('sqlite-maintenance')
+@click.option('--vacuum/--no-vacuum', default=None, help="Forcer ou interdire VACUUM (par défaut : selon les pages libres).")
+def sqlite_maintenance_command(vacuum):
+    """Checkpoint du journal WAL, ANALYZE et VACUUM de la base SQLite (aussi planifié par run-worker)."""
+    if sqlite_path(db.engine) is None:
+        raise click.ClickException("La base configurée n'est pas un fichier SQLite.")
+    click.echo(json.dumps(sqlite_maintenance(db.engine, sqlite_writer, vacuum), indent=2))
+
+@app.cli.command('rebuild-map-clusters')
+def rebuild_map_clusters_command():
+    """Recalcule entièrement les agrégats de la carte."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    rows = db.session.query(Signalement.lat, Signalement.lng).filter(
+        Signalement.status == 'active',
+        Signalement.lat.isnot(None),
+        Signalement.lng.isnot(None)
+    ).yield_per(1000)
+    for lat, lng in rows:
+        _add_cluster_delta(deltas, lat, lng, 1)
+
+    MapCluster.query.delete()
+    _apply_cluster_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    click.echo(f"{len(deltas)} cellules de carte recalculées.")
+
 # ROUTES D'ERREUR
 
 @app.errorhandler(404)
@@ -1041,27 +3040,186 @@ def favicon():
 
 # INITIALISATION
 
-def init_db():
-    with app.app_context():
+def upgrade_db():
+    """
+    Crée les tables manquantes puis applique les migrations en attente. Une
+    base vide est créée d'un coup par create_all et marquée à jour.
+    :return: La liste des versions appliquées.
+    """
+    fresh = not has_table(db.engine, 'signalement')
+    db.create_all()
+    if fresh:
+        stamp(db.engine, MIGRATIONS)
+        return []
+    return migrate(db.engine, MIGRATIONS)
+
+def init_db(admin_password=None):
+    """Crée ou met à jour le schéma, les index de recherche et spatiaux, et le compte administrateur s'il manque."""
+    upgrade_db()
+    init_search_index(db)
+    init_spatial_index(db)
+
+    if not User.query.filter_by(email='admin@signalalert.bj').first():
+        admin = User(
+            username='admin',
+            email='admin@signalalert.bj',
+            is_active=True
+        )
+        admin.set_password(admin_password or 'admin123')
+        db.session.add(admin)
+        db.session.commit()
+        print("✅ Base de données initialisée avec l'utilisateur admin")
+
+@app.cli.command('init-db')
+@click.option('--admin-password', envvar='ADMIN_PASSWORD', default=None,
+              help="Mot de passe du compte admin s'il est créé (défaut : ADMIN_PASSWORD).")
+def init_db_command(admin_password):
+    """Crée les tables manquantes et le compte administrateur (au déploiement, pas au démarrage)."""
+    init_db(admin_password)
+    click.echo("Schéma et compte administrateur vérifiés.")
+
+@app.cli.command('db-upgrade')
+@click.option('--target', type=int, default=None, help="Version à atteindre (défaut : la dernière).")
+def db_upgrade_command(target):
+    """Applique les migrations de schéma en attente (index construits en ligne, backfills par lots)."""
+    if target is not None:
         db.create_all()
-        
-        if not User.query.filter_by(email='admin@signalalert.bj').first():
-            admin = User(
-                username='admin',
-                email='admin@signalalert.bj',
-                is_active=True
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-            db.session.commit()
-            print("✅ Base de données initialisée avec l'utilisateur admin")
+        applied = migrate(db.engine, MIGRATIONS, target=target)
+    else:
+        applied = upgrade_db()
+    click.echo(f"{len(applied)} migration(s) appliquée(s).")
+
+@app.cli.command('db-status')
+def db_status_command():
+    """Versions de schéma appliquées et en attente."""
+    done = applied_versions(db.engine)
+    for m in sorted(MIGRATIONS, key=lambda m: m.version):
+        click.echo(f"{'[x]' if m.version in done else '[ ]'} {m.version:3d}  {m.description}")
+
+def hot_queries():
+    """
+    Requêtes des routes les plus fréquentes et index acceptables pour chacune
+    (choisis d'après leurs plans EXPLAIN), vérifiés par hot_queries_test.py.
+    """
+    now = db.func.current_timestamp()
+
+    def newest(query, *columns):
+        return query.order_by(*[c.desc() for c in columns]).limit(13)
+
+    return [
+        ("Accueil et liste des signalements actifs",
+         newest(db.select(Signalement.id).where(Signalement.status == 'active'), Signalement.created_at, Signalement.id),
+         {'ix_signalement_status_created_id'}),
+        ("Liste filtrée par type",
+         newest(db.select(Signalement.id).where(Signalement.type == 'lost'), Signalement.created_at, Signalement.id),
+         {'ix_signalement_type_created_id', 'ix_signalement_type_status_created_id'}),
+        ("Liste filtrée par type et statut",
+         newest(db.select(Signalement.id).where(Signalement.type == 'lost', Signalement.status == 'active'),
+                Signalement.created_at, Signalement.id),
+         {'ix_signalement_type_status_created_id'}),
+        ("Liste filtrée par catégorie",
+         newest(db.select(Signalement.id).where(Signalement.category == 'phone'), Signalement.created_at, Signalement.id),
+         {'ix_signalement_category_created_id'}),
+        ("Tableau de bord (signalements d'un utilisateur)",
+         newest(db.select(Signalement.id).where(Signalement.user_id == 1), Signalement.created_at, Signalement.id),
+         {'ix_signalement_user_created_id'}),
+        ("Blocage du moteur de correspondances",
+         db.select(Signalement.id).where(Signalement.category == 'phone', Signalement.geohash.between('s1', 's2')),
+         {'ix_signalement_blocking'}),
+        ("Repli geohash de la recherche de proximité",
+         db.select(Signalement.id).where(Signalement.geohash.between('s1', 's2')),
+         {'ix_signalement_geohash', 'ix_signalement_blocking'}),
+        ("Doublons d'image",
+         db.select(Signalement.id).where(Signalement.image_hash == '0123456789abcdef'),
+         {'ix_signalement_image_hash'}),
+        ("Commentaires d'un signalement",
+         db.select(Comment.id).where(Comment.signalement_id == 1).order_by(Comment.timestamp),
+         {'ix_comment_signalement_timestamp_id'}),
+        ("Commentaires d'un auteur (administration)",
+         newest(db.select(Comment.id).where(Comment.user_id == 1), Comment.timestamp, Comment.id),
+         {'ix_comment_user_timestamp_id'}),
+        ("Boîte de réception",
+         newest(db.select(Notification.id).where(Notification.user_id == 1), Notification.timestamp, Notification.id),
+         {'ix_notification_user_timestamp_id'}),
+        ("Notifications non lues",
+         db.select(Notification.id).where(Notification.user_id == 1, Notification.is_read == False),
+         {'ix_notification_user_read_timestamp'}),
+        ("Archivage des notifications lues",
+         db.select(Notification.id).where(Notification.is_read == True, Notification.timestamp < now),
+         {'ix_notification_read_timestamp'}),
+        ("Purge des jetons expirés",
+         db.select(PasswordResetToken.id).where(PasswordResetToken.expires_at < now),
+         {'ix_password_reset_token_expires_at'}),
+        ("Réservation des tâches",
+         db.select(Job.id).where(Job.status == 'pending', Job.run_at <= now).order_by(Job.run_at).limit(10),
+         {'ix_job_status_run_at'}),
+        ("Réservation des emails",
+         db.select(OutboundEmail.id).where(OutboundEmail.status == 'pending', OutboundEmail.run_at <= now)
+           .order_by(OutboundEmail.run_at).limit(10),
+         {'ix_outbound_email_status_run_at'}),
+        ("Correspondances d'un signalement",
+         db.select(Match.id).where(Match.signalement2_id == 1),
+         {'ix_matches_signalement2_id'}),
+        ("Agrégats de la carte visibles",
+         db.select(MapCluster.cell).where(MapCluster.precision == 5, MapCluster.center_lat.between(6.0, 7.0),
+                                          MapCluster.center_lng.between(2.0, 3.0)),
+         {'ix_map_cluster_viewport', 'sqlite_autoindex_map_cluster_1', 'map_cluster_pkey'}),
+        ("Utilisateurs (administration)",
+         newest(db.select(User.id), User.created_at, User.id),
+         {'ix_user_created_id'}),
+    ]
+
+def create_app(config_name=None):
+    """
+    Configure l'application depuis les classes de config.py (`config_name`,
+    sinon FLASK_CONFIG, sinon 'production') et lui lie les extensions et les
+    caches. Aucun accès à la base ni import de WeasyPrint/Pillow/qrcode ici :
+    le schéma est créé par `flask init-db`. Les routes étant déclarées sur
+    l'objet `app` du module, un second appel renvoie l'application déjà configurée.
+    """
+    global user_cache, pdf_cache, asset_fetcher, sqlite_writer, replica_router
+    if 'sqlalchemy' in app.extensions:
+        return app
+
+    config_class = config_classes[config_name or os.environ.get('FLASK_CONFIG') or 'production']
+    app.config.from_object(config_class)
+    config_class.init_app(app)
+    for key, folder in (('PDF_CACHE_DIR', 'pdf_cache'), ('ASSET_CACHE_DIR', 'asset_cache'),
+                        ('USER_CACHE_DIR', 'user_cache')):
+        if app.config[key] is None:
+            app.config[key] = os.path.join(app.instance_path, folder)
+
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    # Flask-SQLAlchemy n'applique SQLALCHEMY_ENGINE_OPTIONS qu'à la base principale
+    app.config['SQLALCHEMY_BINDS'] = {
+        key: dict(engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI=url)), url=url)
+        if isinstance(url, str) else url
+        for key, url in app.config['SQLALCHEMY_BINDS'].items()
+    }
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            set_statement_timeout(engine, app.config['DB_STATEMENT_TIMEOUT_MS'])
+        replicas = {key: engine for key, engine in db.engines.items()
+                    if key and key.startswith(REPLICA_BIND_PREFIX)}
+        if replicas:
+            replica_router = ReplicaRouter(replicas, app.config['DB_REPLICA_MAX_LAG'],
+                                           app.config['DB_REPLICA_CHECK_INTERVAL'])
+        database_path = sqlite_path(db.engine)
+        if database_path and app.config['SQLITE_TUNING']:
+            set_sqlite_pragmas(db.engine, app.config)
+            sqlite_writer = SqliteWriterLock(database_path + '-writer.lock',
+                                             app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+    login_manager.init_app(app)
+    user_cache = UserIdentityCache(app.config['USER_CACHE_TTL'], invalidation_dir=app.config['USER_CACHE_DIR'] or None)
+    pdf_cache = PdfArtifactCache(app.config['PDF_CACHE_DIR'], app.config['PDF_CACHE_MAX_BYTES'])
+    asset_fetcher = AssetFetcher(app.config['ASSET_CACHE_DIR'], app.config['ASSET_CACHE_MAX_BYTES'],
+                                 max_asset_bytes=app.config['ASSET_MAX_BYTES'])
+
+    if not CLOUDINARY_URL:
+        print("CRITICAL: CLOUDINARY_URL environment variable is not set. Cloudinary uploads will fail.")
+    return app
 
 if __name__ == '__main__':
-    init_db()
-    
-    # # Commented out for production deployment with Gunicorn
-    # print("🚀 SignalAlert démarré sur http://localhost:5000")
-    # print("👤 Admin: admin@signalalert.bj / admin123")
-    # print("📁 Static folder:", app.static_folder)
-    # print("📁 Template folder:", app.template_folder)
-    # app.run(debug=True, host='0.0.0.0', port=5000)
+    with create_app().app_context():
+        init_db()
@@ -0,0 +1,175 @@
+"""
+Test d'AssetFetcher contre un serveur HTTP local : cache et revalidation
+(304), refus des ressources trop volumineuses (Content-Length annoncé ou flux
+sans longueur), éviction des blobs avec leurs fiches meta.
+
+    python asset_fetcher_test.py
+    python -m pytest asset_fetcher_test.py
+
+Code de sortie 1 si un des tests échoue.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from asset_utils import AssetFetcher
+
+MAX_ASSET_BYTES = 64 * 1024
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """/img/<n> : n octets avec ETag ; /declared-big : Content-Length hors limite ; /stream-big : flux sans longueur."""
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+
+    def do_GET(self):
+        StubHandler.requests_seen.append(self.path)
+        if self.path.startswith('/img/'):
+            size = int(self.path.rsplit('/', 1)[1])
+            etag = f'"{self.path}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = self.path.encode('ascii').ljust(size, b'.')
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/declared-big':
+            self.send_response(200)
+            self.send_header('Content-Length', str(MAX_ASSET_BYTES * 10))
+            self.end_headers()
+            # Le client doit abandonner sur l'en-tête : on n'envoie qu'un début
+            self.wfile.write(b'x' * 1024)
+            self.close_connection = True
+        elif self.path == '/stream-big':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            chunk = b'x' * 16 * 1024
+            try:
+                for _ in range(MAX_ASSET_BYTES * 10 // len(chunk)):
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # le client a coupé à la limite
+            self.close_connection = True
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    def __enter__(self):
+        StubHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_fetcher(directory, **kwargs):
+    kwargs.setdefault('max_asset_bytes', MAX_ASSET_BYTES)
+    return AssetFetcher(directory, kwargs.pop('max_bytes', 10 * 1024 * 1024), **kwargs)
+
+
+def test_cache_and_revalidation():
+    with tempfile.TemporaryDirectory() as directory, StubServer() as stub:
+        fetcher = make_fetcher(directory, revalidate_after=3600)
+        url = f"{stub.base_url}/img/1000"
+        first = fetcher.fetch(url)
+        assert first is not None and len(first) == 1000
+        assert fetcher.fetch(url) == first
+        assert fetcher.stats['misses'] == 1 and fetcher.stats['hits'] == 1
+        assert len(StubHandler.requests_seen) == 1
+
+        fetcher.revalidate_after = 0
+        assert fetcher.fetch(url) == first
+        assert fetcher.stats['revalidated'] == 1
+        assert len(StubHandler.requests_seen) == 2
+
+
+def test_declared_length_over_limit():
+    with tempfile.TemporaryDirectory() as directory, StubServer() as stub:
+        fetcher = make_fetcher(directory)
+        assert fetcher.fetch(f"{stub.base_url}/declared-big") is None
+        assert fetcher.stats['too_large'] == 1
+        assert not os.path.isdir(os.path.join(directory, 'blobs'))
+
+
+def test_streamed_body_over_limit():
+    with tempfile.TemporaryDirectory() as directory, StubServer() as stub:
+        fetcher = make_fetcher(directory)
+        assert fetcher.fetch(f"{stub.base_url}/stream-big") is None
+        assert fetcher.stats['too_large'] == 1
+        assert not os.path.isdir(os.path.join(directory, 'blobs'))
+
+
+def test_stale_copy_kept_when_resource_grows():
+    with tempfile.TemporaryDirectory() as directory, StubServer() as stub:
+        fetcher = make_fetcher(directory, revalidate_after=0)
+        url = f"{stub.base_url}/img/2000"
+        cached = fetcher.fetch(url)
+        fetcher.max_asset_bytes = 1000
+        fetcher.fetch(url)  # 304 : la copie reste valable
+        os.remove(fetcher._meta_path(url))
+        assert fetcher.fetch(url) is None  # plus de copie, ressource trop grosse
+        assert cached is not None and fetcher.stats['too_large'] == 1
+
+
+def test_eviction_removes_meta():
+    with tempfile.TemporaryDirectory() as directory, StubServer() as stub:
+        # Place pour deux blobs de 20 Ko seulement
+        fetcher = make_fetcher(directory, max_bytes=45 * 1024)
+        urls = [f"{stub.base_url}/img/{20 * 1024 + i}" for i in range(5)]
+        for i, url in enumerate(urls):
+            assert fetcher.fetch(url) is not None
+            # mtime distincts : l'ordre LRU ne dépend pas de la résolution du système de fichiers
+            blob = fetcher._blob_path(fetcher._read_meta(url)['sha256'])
+            os.utime(blob, (1000000 + i, 1000000 + i))
+
+        blobs = os.listdir(os.path.join(directory, 'blobs'))
+        metas = os.listdir(os.path.join(directory, 'meta'))
+        refs = os.listdir(os.path.join(directory, 'refs'))
+        assert len(blobs) == 2, blobs
+        assert len(metas) == 2, metas
+        assert sorted(refs) == sorted(blobs)
+        assert [url for url in urls if fetcher._read_meta(url)] == urls[-2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
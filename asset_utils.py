@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from disk_cache_utils import atomic_write, touch, evict_lru_files
+
+
+class AssetFetcher:
+    """
+    Récupération des images distantes (Cloudinary) pour les traitements serveur.
+
+    - une seule session HTTP avec pool de connexions keep-alive et re-essais ;
+    - nombre de téléchargements simultanés borné par un sémaphore ;
+    - cache disque adressé par contenu (blobs/<sha256>) avec éviction LRU,
+      l'URL ne pointant que vers une empreinte (meta/<sha1(url)>.json) ;
+    - revalidation conditionnelle (If-None-Match / If-Modified-Since) après
+      `revalidate_after` secondes ;
+    - taille d'une ressource bornée par `max_asset_bytes` (Content-Length
+      annoncé, puis octets réellement reçus en flux) ;
+    - les fiches meta d'un blob évincé sont supprimées avec lui (refs/<sha256>
+      liste les fiches qui y pointent).
+
+    La session (et la bibliothèque requests) n'est créée qu'au premier téléchargement.
+    """
+
+    def __init__(self, cache_dir, max_bytes, max_concurrency=8, timeout=(3.05, 10),
+                 revalidate_after=24 * 3600, max_asset_bytes=20 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_asset_bytes = max_asset_bytes
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.revalidate_after = revalidate_after
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._evict_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'errors': 0, 'too_large': 0}
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.util.retry import Retry
+
+                    session = requests.Session()
+                    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                                  allowed_methods=frozenset(['GET']))
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency, max_retries=retry)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _meta_path(self, url):
+        return os.path.join(self.cache_dir, 'meta', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.cache_dir, 'blobs', content_hash)
+
+    def _refs_path(self, content_hash):
+        return os.path.join(self.cache_dir, 'refs', content_hash)
+
+    def _read_meta(self, url):
+        try:
+            with open(self._meta_path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _read_blob(self, content_hash):
+        path = self._blob_path(content_hash)
+        if not touch(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _store(self, url, content, response):
+        content_hash = hashlib.sha256(content).hexdigest()
+        if not os.path.exists(self._blob_path(content_hash)):
+            atomic_write(self._blob_path(content_hash), content)
+        self._write_meta(url, {
+            'url': url,
+            'sha256': content_hash,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'checked_at': time.time(),
+        })
+        os.makedirs(os.path.dirname(self._refs_path(content_hash)), exist_ok=True)
+        # Ajout d'une ligne courte en O_APPEND : sûr entre workers
+        with open(self._refs_path(content_hash), 'a', encoding='utf-8') as f:
+            f.write(os.path.basename(self._meta_path(url)) + '\n')
+        with self._evict_lock:
+            evict_lru_files(os.path.join(self.cache_dir, 'blobs'), self.max_bytes,
+                            on_remove=self._forget_blob)
+
+    def _forget_blob(self, blob_path):
+        """Supprime les fiches meta qui pointent encore vers le blob évincé."""
+        content_hash = os.path.basename(blob_path)
+        try:
+            with open(self._refs_path(content_hash), 'r', encoding='utf-8') as f:
+                names = set(f.read().split())
+        except FileNotFoundError:
+            return
+        for name in names:
+            meta_path = os.path.join(self.cache_dir, 'meta', name)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    if json.load(f).get('sha256') != content_hash:
+                        continue  # l'URL pointe désormais vers un autre contenu
+                os.remove(meta_path)
+            except (FileNotFoundError, ValueError):
+                pass
+        try:
+            os.remove(self._refs_path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    def _write_meta(self, url, meta):
+        atomic_write(self._meta_path(url), json.dumps(meta).encode('utf-8'))
+
+    def _read_body(self, response):
+        """Corps de la réponse, ou None s'il dépasse `max_asset_bytes`."""
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > self.max_asset_bytes:
+            return None
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            received += len(chunk)
+            if received > self.max_asset_bytes:
+                return None
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def fetch(self, url):
+        """
+        Contenu de `url`, depuis le cache si possible.
+        :return: Les octets, ou None si la ressource est inaccessible.
+        """
+        meta = self._read_meta(url)
+        content = self._read_blob(meta['sha256']) if meta else None
+
+        if content is not None and time.time() - meta.get('checked_at', 0) < self.revalidate_after:
+            self.stats['hits'] += 1
+            return content
+
+        headers = {}
+        if content is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        session = self.session
+        from requests.exceptions import RequestException
+        try:
+            with self._semaphore, session.get(url, headers=headers, timeout=self.timeout,
+                                              stream=True) as response:
+                if response.status_code == 304 and content is not None:
+                    meta['checked_at'] = time.time()
+                    self._write_meta(url, meta)
+                    self.stats['revalidated'] += 1
+                    return content
+                response.raise_for_status()
+                body = self._read_body(response)
+        except RequestException as e:
+            self.stats['errors'] += 1
+            print(f"Warning: Could not fetch asset {url}: {e}")
+            # Mieux vaut une copie ancienne que rien
+            return content
+
+        if body is None:
+            self.stats['too_large'] += 1
+            print(f"Warning: Asset {url} exceeds {self.max_asset_bytes} bytes, ignored")
+            return content
+
+        self.stats['misses'] += 1
+        self._store(url, body, response)
+        return body
@@ -1,16 +1,57 @@
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
+from engine_utils import postgres_url
 
 load_dotenv()
 
+def database_url():
+    """PostgreSQL si DATABASE_URL est défini (Render), SQLite sinon."""
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return 'sqlite:///signalalert.db'
+    # Render fournit une URL postgres:// : pilote le plus rapide installé, sauf DB_DRIVER
+    return postgres_url(url, os.environ.get('DB_DRIVER'))
+
+def replica_binds():
+    """Réplicas en lecture (DATABASE_REPLICA_URLS, séparées par des virgules), binds 'replica_N'."""
+    urls = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    return {f'replica_{i}': postgres_url(url, os.environ.get('DB_DRIVER')) for i, url in enumerate(urls)}
+
+def _int_env(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
 class Config:
     # Clé secrète
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     
     # Base de données
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///signalalert.db'
+    SQLALCHEMY_DATABASE_URI = database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool par worker (PostgreSQL) : part de DB_MAX_CONNECTIONS, une connexion
+    # par thread ; DB_POOL_SIZE / DB_MAX_OVERFLOW forcent les valeurs calculées
+    WEB_CONCURRENCY = _int_env('WEB_CONCURRENCY', 1)  # workers gunicorn
+    WEB_THREADS = _int_env('WEB_THREADS', 1)  # threads (ou greenlets actifs) par worker
+    DB_MAX_CONNECTIONS = _int_env('DB_MAX_CONNECTIONS', 20)
+    DB_POOL_SIZE = _int_env('DB_POOL_SIZE', None)
+    DB_MAX_OVERFLOW = _int_env('DB_MAX_OVERFLOW', None)
+    DB_POOL_TIMEOUT = _int_env('DB_POOL_TIMEOUT', 10)  # secondes d'attente d'une connexion
+    DB_POOL_RECYCLE = _int_env('DB_POOL_RECYCLE', 1800)  # secondes
+    DB_STATEMENT_TIMEOUT_MS = _int_env('DB_STATEMENT_TIMEOUT_MS', 15000)  # 0 pour désactiver
+    # Réplicas : les vues en lecture seule y lisent, sauf retard excessif ou
+    # écriture récente du visiteur (il relit alors ses écritures sur le primaire)
+    SQLALCHEMY_BINDS = replica_binds()
+    DB_REPLICA_MAX_LAG = _int_env('DB_REPLICA_MAX_LAG', 5)  # secondes
+    DB_REPLICA_CHECK_INTERVAL = _int_env('DB_REPLICA_CHECK_INTERVAL', 2)  # secondes entre deux mesures du retard
+    DB_REPLICA_PIN_SECONDS = _int_env('DB_REPLICA_PIN_SECONDS', 10)  # lectures sur le primaire après une écriture
+    # SQLite (sans DATABASE_URL) : journal WAL, pragmas par connexion, écritures
+    # sérialisées entre workers et maintenance périodique par `flask run-worker`
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'true').lower() not in ('0', 'false', 'no')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = _int_env('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    SQLITE_MMAP_SIZE = _int_env('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    SQLITE_MAINTENANCE_INTERVAL = _int_env('SQLITE_MAINTENANCE_INTERVAL', 3600)  # secondes
     
     # Uploads
     UPLOAD_FOLDER = os.path.join('static', 'uploads')
@@ -21,13 +62,34 @@ class Config:
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
     # Email
+    MAIL_ENABLED = True
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
-    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS') or True
-    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
-    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
-    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
-    
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() not in ('0', 'false', 'no')
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME', '')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', '')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'support@signalalert.bj'
+    MAIL_BASE_URL = os.environ.get('MAIL_BASE_URL', 'http://localhost:5000')
+    MAIL_DIGEST_WINDOW = _int_env('MAIL_DIGEST_WINDOW', 600)  # secondes
+    MAIL_BATCH_SIZE = _int_env('MAIL_BATCH_SIZE', 200)
+    RESET_TOKEN_EXPIRATION = 3600
+
+    # Caches sur disque et en mémoire (dossiers : sous instance/ si None)
+    PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR')
+    PDF_CACHE_MAX_BYTES = _int_env('PDF_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+    ASSET_CACHE_DIR = os.environ.get('ASSET_CACHE_DIR')
+    ASSET_CACHE_MAX_BYTES = _int_env('ASSET_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+    ASSET_MAX_BYTES = _int_env('ASSET_MAX_BYTES', 20 * 1024 * 1024)  # taille maximale d'une image distante
+    USER_CACHE_TTL = _int_env('USER_CACHE_TTL', 60)
+    # Dossier partagé par les workers pour propager les invalidations ('' pour désactiver).
+    # Local à une machine : entre instances, USER_CACHE_TTL borne le retard du profil affiché
+    # (is_active et le mot de passe sont relus à chaque requête).
+    USER_CACHE_DIR = os.environ.get('USER_CACHE_DIR')
+
+    # Nombre maximal de requêtes SQL par requête HTTP (None = pas de contrôle).
+    # En mode TESTING, un dépassement fait échouer la requête.
+    SQL_QUERY_BUDGET = _int_env('SQL_QUERY_BUDGET', None)
+
     # Application
     APP_NAME = "SignalAlert"
     ITEMS_PER_PAGE = 12
@@ -44,8 +106,17 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
 
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_BINDS = {}
+    WTF_CSRF_ENABLED = False
+    MAIL_ENABLED = False
+    USER_CACHE_DIR = ''
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Compare les pilotes PostgreSQL (psycopg2, pg8000) sur la liste et le détail
+des signalements, contre une base PostgreSQL locale. Chaque pilote tourne
+dans un interpréteur neuf, caches de réponses désactivés : on mesure le
+rendu complet, requêtes SQL comprises.
+
+    python db_driver_benchmark.py --url postgresql://localhost/signalalert_bench --seed 2000
+    python db_driver_benchmark.py --url postgresql://localhost/signalalert_bench --requests 300
+    python db_driver_benchmark.py --url ... --drivers psycopg2
+
+--seed crée le schéma et des signalements fictifs si la base en compte moins.
+Ne pas viser une base de production.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_DRIVERS = ('psycopg2', 'pg8000')
+
+# Exécuté dans un interpréteur neuf avec DATABASE_URL et DB_DRIVER du pilote testé
+CHILD_SCRIPT = r'''
+import json, sys, time
+from datetime import date
+import app as module
+
+mode, count = sys.argv[1], int(sys.argv[2])
+application = module.create_app('production')
+application.config['SQL_QUERY_BUDGET'] = None
+module.response_cache.max_bytes = module.fragment_cache.max_bytes = 0
+db, Signalement = module.db, module.Signalement
+
+with application.app_context():
+    if mode == 'seed':
+        module.init_db('bench-admin-password')
+        user_id = db.session.execute(db.select(module.User.id).order_by(module.User.id)).scalars().first()
+        existing = db.session.execute(db.select(db.func.count(Signalement.id))).scalar()
+        for i in range(existing, count):
+            db.session.add(Signalement(type=('lost', 'found')[i % 2], title=f"Objet {i}",
+                                       description="Signalement de test " * 10, location="Cotonou",
+                                       date=date(2024, 1 + i % 12, 1 + i % 28), status='active',
+                                       category=('Téléphone', 'Portefeuille', 'Clés')[i % 3],
+                                       user_id=user_id, lat=6.37 + i % 50 / 1000, lng=2.39 + i % 70 / 1000))
+            if i % 500 == 499:
+                db.session.commit()
+        db.session.commit()
+        print(json.dumps({'signalements': max(existing, count)}))
+        sys.exit(0)
+    detail_id = db.session.execute(db.select(Signalement.id).order_by(Signalement.id.desc())).scalars().first()
+
+client = application.test_client()
+routes = {'listing': '/signalements?page=2', 'detail': f'/signalement/{detail_id}'}
+timings = {}
+for name, path in routes.items():
+    for _ in range(5):
+        client.get(path)  # préchauffage : pool, caches de compilation SQLAlchemy
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, (path, response.status_code)
+    timings[name] = samples
+with application.app_context():
+    driver = db.engine.dialect.driver
+print(json.dumps({'driver': driver, 'timings': timings}))
+'''
+
+
+def run_child(url, driver, mode, count):
+    env = dict(os.environ, DATABASE_URL=url, DB_DRIVER=driver)
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, mode, str(count)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"{driver} : échec\n{result.stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'median_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'req_per_s': round(1000 / statistics.mean(ordered), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', required=True, help='URL PostgreSQL (sans pilote : postgresql://...)')
+    parser.add_argument('--drivers', nargs='+', default=DEFAULT_DRIVERS)
+    parser.add_argument('--requests', type=int, default=200, help='requêtes mesurées par route')
+    parser.add_argument('--seed', type=int, help='nombre minimal de signalements à créer')
+    args = parser.parse_args()
+
+    if args.seed:
+        print(json.dumps(run_child(args.url, args.drivers[0], 'seed', args.seed)))
+
+    results = {}
+    for driver in args.drivers:
+        measured = run_child(args.url, driver, 'measure', args.requests)
+        results[driver] = {route: summarize(samples) for route, samples in measured['timings'].items()}
+    print(json.dumps(results, indent=2))
+
+    if len(results) > 1:
+        reference, *others = args.drivers
+        for other in others:
+            for route in results[reference]:
+                ratio = results[other][route]['median_ms'] / results[reference][route]['median_ms']
+                print(f"{route} : {other} {ratio:.2f}x le temps médian de {reference}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
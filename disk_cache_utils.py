@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+
+def atomic_write(path, data):
+    """Écrit `data` dans `path` via un fichier temporaire renommé (jamais de fichier partiel)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def touch(path):
+    """Marque un fichier comme récemment utilisé ; False s'il n'existe pas."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def evict_lru_files(directory, max_bytes, suffix='', on_remove=None):
+    """
+    Supprime les fichiers les moins récemment utilisés (mtime le plus ancien)
+    jusqu'à ce que la taille totale repasse sous `max_bytes`. `on_remove(path)`
+    est appelé pour chaque fichier supprimé (nettoyage des fichiers associés).
+    :return: Le nombre de fichiers supprimés.
+    """
+    entries = []
+    total = 0
+    try:
+        scan = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in scan:
+        if entry.is_file() and entry.name.endswith(suffix) and not entry.name.endswith('.tmp'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    entries.sort()
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        else:
+            if on_remove is not None:
+                on_remove(path)
+        total -= size
+        removed += 1
+    return removed
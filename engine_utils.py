@@ -0,0 +1,183 @@
+import importlib.util
+import sys
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+# Profil du moteur PostgreSQL : choix du pilote, taille du pool par worker,
+# connexions vérifiées (pre-ping) et recyclées, délai maximal par requête SQL.
+# SQLite garde la configuration par défaut de SQLAlchemy.
+
+# Pilotes par ordre de préférence : psycopg2 (libpq, en C) est nettement plus
+# rapide que pg8000 (pur Python), qui reste un repli.
+POSTGRES_DRIVERS = ('psycopg2', 'pg8000')
+SLOW_CHECKOUT_MS = 50  # attente de connexion signalée dans les logs au-delà
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def _gevent_patched():
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def preferred_driver(requested=None):
+    """
+    Pilote PostgreSQL : `requested` s'il est donné, sinon le plus rapide des
+    pilotes installés. Sous gevent, psycopg2 bloquerait la boucle d'événements
+    pendant chaque requête SQL : psycogreen le rend coopératif s'il est
+    installé, sinon pg8000 (dont les sockets sont patchées) passe devant.
+    """
+    if requested:
+        return requested
+    installed = [driver for driver in POSTGRES_DRIVERS if _installed(driver)]
+    if not installed:
+        return POSTGRES_DRIVERS[0]  # erreur explicite à la première connexion
+    if installed[0] == 'psycopg2' and _gevent_patched():
+        if _installed('psycogreen'):
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        elif 'pg8000' in installed:
+            return 'pg8000'
+    return installed[0]
+
+
+def postgres_url(url, driver=None):
+    """Ajoute le pilote aux URL postgres:// (Render) et postgresql:// qui n'en précisent pas."""
+    for scheme in ('postgres://', 'postgresql://'):
+        if url.startswith(scheme):
+            return f"postgresql+{preferred_driver(driver)}://" + url[len(scheme):]
+    return url
+
+
+def pool_limits(workers, threads, max_connections):
+    """
+    Taille du pool d'un worker : une connexion par thread (ou greenlet servant
+    des requêtes), sans dépasser sa part des `max_connections` accordées à
+    l'application entière ; le reste de cette part sert de débordement.
+    :return: (pool_size, max_overflow)
+    """
+    share = max(1, max_connections // max(1, workers))
+    pool_size = max(1, min(threads, share))
+    return pool_size, share - pool_size
+
+
+class PoolStats:
+    """Attente des checkouts (temps pour obtenir une connexion du pool), thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.slow = 0
+        self.timeouts = 0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.slow += waited * 1000 >= SLOW_CHECKOUT_MS
+            self.timeouts += timed_out
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else None,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+                'slow_checkouts': self.slow,
+                'timeouts': self.timeouts,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool qui mesure l'attente de chaque checkout (voir pool_status)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.stats.record(waited, timed_out)
+            if waited * 1000 >= SLOW_CHECKOUT_MS:
+                print(f"WARNING: attente de {waited * 1000:.0f} ms pour une connexion SQL "
+                      f"({self.checkedout()} en cours sur {self.size() + self._max_overflow})")
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS déduites de la configuration (DB_* et
+    WEB_CONCURRENCY/WEB_THREADS, comptés comme les lance gunicorn).
+    """
+    if not config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        return {}
+    pool_size, max_overflow = pool_limits(config['WEB_CONCURRENCY'], config['WEB_THREADS'],
+                                          config['DB_MAX_CONNECTIONS'])
+    if config['DB_POOL_SIZE']:
+        pool_size = config['DB_POOL_SIZE']
+    if config['DB_MAX_OVERFLOW'] is not None:
+        max_overflow = config['DB_MAX_OVERFLOW']
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        # Connexion testée avant usage : un redémarrage du serveur ou une
+        # coupure réseau ne fait pas échouer la requête suivante
+        'pool_pre_ping': True,
+        # Fermée avant les coupures des connexions inactives côté hébergeur
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+
+
+def set_statement_timeout(engine, timeout_ms):
+    """
+    Annule côté serveur toute requête SQL plus longue que `timeout_ms` : une
+    requête lente libère son worker au lieu de l'occuper indéfiniment.
+    Réglé à l'ouverture de chaque connexion, quel que soit le pilote.
+    """
+    if engine.dialect.name != 'postgresql' or not timeout_ms:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply(dbapi_connection, connection_record):
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        cursor.close()
+        dbapi_connection.autocommit = autocommit
+
+
+def pool_status(engine):
+    """Occupation du pool et attente des checkouts pour la supervision."""
+    pool = engine.pool
+    status = {'driver': engine.dialect.driver, 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        status.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'saturation': round(pool.checkedout() / capacity, 3) if capacity else None,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.snapshot())
+    return status
@@ -0,0 +1,150 @@
+"""
+Contrôle mémoire des exports en flux : génère une base SQLite de plusieurs
+centaines de milliers de signalements, télécharge l'export administrateur
+dans chaque format sans garder le corps, et vérifie que la mémoire
+privée du processus (RssAnon) ne croît pas avec le volume exporté.
+Les pages du fichier projetées par SQLite (mmap, SQLITE_MMAP_SIZE) comptent
+dans le RSS total mais restent partagées et récupérables par le noyau : elles
+sont affichées (rss_file_mb) sans être soumises aux seuils.
+
+    python export_memory_test.py
+    python export_memory_test.py --rows 500000 --formats csv
+    python export_memory_test.py --max-growth-mb 30 --max-rss-mb 250
+
+Chaque format tourne dans un interpréteur neuf. Code de sortie 1 si la
+croissance de la mémoire privée pendant l'export dépasse --max-growth-mb,
+si elle dépasse --max-rss-mb ou si l'export n'a pas toutes les lignes.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+FORMATS = ('ndjson', 'csv', 'json')
+
+# Exécuté dans un interpréteur neuf ; DATABASE_URL vient du parent
+CHILD_SCRIPT = r'''
+import json, sys, time
+from datetime import datetime
+
+def memory_mb():
+    """(mémoire privée, pages de fichiers projetés) résidentes, en Mo."""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key = line.split(':', 1)[0]
+            if key in ('RssAnon', 'RssFile'):
+                values[key] = int(line.split()[1]) / 1024
+    return values['RssAnon'], values['RssFile']
+
+import app as module
+role = sys.argv[1]
+application = module.create_app('production')
+application.config['SQL_QUERY_BUDGET'] = None
+db = module.db
+
+if role == 'seed':
+    rows = int(sys.argv[2])
+    with application.app_context():
+        module.init_db('export-test-password')
+        user_id = module.User.query.first().id
+        table = module.Signalement.__table__
+        now = datetime.utcnow()
+        description = "Signalement de test pour l'export en flux, texte de longueur réaliste. " * 6
+        for start in range(0, rows, 5000):
+            db.session.execute(table.insert(), [{
+                'type': ('lost', 'found')[i % 2], 'title': f"Objet {i}", 'description': description,
+                'location': 'Cotonou', 'date': now, 'category': 'Téléphone', 'status': 'active',
+                'user_id': user_id, 'lat': 6.37, 'lng': 2.39, 'created_at': now, 'updated_at': now,
+                'contact': f"contact{i}@example.bj", 'views': i % 100,
+            } for i in range(start, min(rows, start + 5000))])
+            db.session.commit()
+    print(json.dumps({'role': role, 'rows': rows}))
+    sys.exit(0)
+
+fmt = sys.argv[2]
+with application.app_context():
+    admin_id = module.User.query.filter_by(email='admin@signalalert.bj').one().id
+client = application.test_client()
+with client.session_transaction() as session:
+    session['_user_id'] = str(admin_id)
+    session['_fresh'] = True
+
+def download(path):
+    response = client.get(path, buffered=False)
+    assert response.status_code == 200, response.status_code
+    size = lines = chunks = 0
+    samples = [memory_mb()]
+    for chunk in response.response:
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+        chunks += 1
+        if chunks % 50 == 0:
+            samples.append(memory_mb())
+    response.close()
+    samples.append(memory_mb())
+    return size, lines, max(anon for anon, _ in samples), max(mapped for _, mapped in samples)
+
+# Préchauffage : imports paresseux, caches de compilation SQLAlchemy, pool
+download(f'/admin/export/users.{fmt}')
+baseline = memory_mb()[0]
+started = time.perf_counter()
+size, lines, peak, mapped = download(f'/admin/export/signalements.{fmt}')
+print(json.dumps({'format': fmt, 'bytes': size, 'lines': lines, 'seconds': round(time.perf_counter() - started, 2),
+                  'rss_baseline_mb': round(baseline, 1), 'rss_peak_mb': round(peak, 1),
+                  'rss_file_mb': round(mapped, 1)}))
+'''
+
+
+def run_child(env, *args):
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, *map(str, args)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"{args[0]} : échec\n{result.stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def expected_lines(fmt, rows):
+    # NDJSON : une ligne par objet ; CSV : en-tête en plus ; tableau JSON : aucun saut de ligne
+    return {'ndjson': rows, 'csv': rows + 1, 'json': 0}[fmt]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300000, help='signalements à exporter')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--max-growth-mb', type=float, default=40.0,
+                        help="croissance tolérée de la mémoire privée pendant l'export")
+    parser.add_argument('--max-rss-mb', type=float, help='mémoire privée maximale absolue')
+    args = parser.parse_args()
+
+    failures = []
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'export.db')}",
+                   USER_CACHE_DIR='', SQL_QUERY_BUDGET='')
+        run_child(env, 'seed', args.rows)
+        for fmt in args.formats:
+            result = run_child(env, 'export', fmt)
+            result['rss_growth_mb'] = round(result['rss_peak_mb'] - result['rss_baseline_mb'], 1)
+            results[fmt] = result
+            if result['rss_growth_mb'] > args.max_growth_mb:
+                failures.append(f"{fmt} : la mémoire privée a augmenté de {result['rss_growth_mb']} Mo "
+                                f"> {args.max_growth_mb}")
+            if args.max_rss_mb is not None and result['rss_peak_mb'] > args.max_rss_mb:
+                failures.append(f"{fmt} : mémoire privée de {result['rss_peak_mb']} Mo > {args.max_rss_mb}")
+            if result['lines'] != expected_lines(fmt, args.rows):
+                failures.append(f"{fmt} : {result['lines']} lignes, {expected_lines(fmt, args.rows)} attendues")
+
+    print(json.dumps(results, indent=2))
+    for failure in failures:
+        print(f"ÉCHEC : {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
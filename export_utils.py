@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+
+# Exports en flux : les lignes sont lues par lots (curseur côté serveur) et
+# écrites au fil de l'eau, la mémoire reste constante quel que soit le volume.
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'json': 'application/json',
+}
+EXPORT_BATCH_SIZE = 1000   # lignes lues par aller-retour avec la base
+EXPORT_CHUNK_ROWS = 200    # lignes regroupées par morceau envoyé au client
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _chunks(rows, fields, size):
+    chunk = []
+    for row in rows:
+        chunk.append({field: _plain(value) for field, value in zip(fields, row)})
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ndjson_stream(rows, fields, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Un objet JSON par ligne."""
+    for chunk in _chunks(rows, fields, chunk_rows):
+        yield ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in chunk)
+
+
+def csv_stream(rows, fields, chunk_rows=EXPORT_CHUNK_ROWS):
+    """CSV avec en-tête ; BOM UTF-8 pour l'ouverture directe dans un tableur."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield '\ufeff' + buffer.getvalue()
+    for chunk in _chunks(rows, fields, chunk_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([item[field] for field in fields] for item in chunk)
+        yield buffer.getvalue()
+
+
+def json_array_stream(rows, fields, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Tableau JSON valide, envoyé morceau par morceau."""
+    yield '['
+    first = True
+    for chunk in _chunks(rows, fields, chunk_rows):
+        body = ','.join(json.dumps(item, ensure_ascii=False) for item in chunk)
+        yield body if first else ',' + body
+        first = False
+    yield ']'
+
+
+EXPORT_WRITERS = {
+    'ndjson': ndjson_stream,
+    'csv': csv_stream,
+    'json': json_array_stream,
+}
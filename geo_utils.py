@@ -0,0 +1,156 @@
+import math
+
+
+GEOHASH_PRECISION = 9
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Encode une position en geohash de `precision` caractères."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """Renvoie (hauteur, largeur) en degrés d'une cellule geohash."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def geohash_neighbors(lat, lng, precision):
+    """Cellule contenant la position et ses 8 voisines (sans doublons)."""
+    dlat, dlng = geohash_cell_size(precision)
+    cells = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            cell_lat = min(max(lat + i * dlat, -90.0), 90.0)
+            cell_lng = ((lng + j * dlng + 180.0) % 360.0) - 180.0
+            cell = geohash_encode(cell_lat, cell_lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance orthodromique en kilomètres."""
+    r = 6371.0
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+def geohash_bounds(cell):
+    """Renvoie (sud, ouest, nord, est) de la cellule geohash."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (bits >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_center(cell):
+    south, west, north, east = geohash_bounds(cell)
+    return (south + north) / 2, (west + east) / 2
+
+
+# Agrégats de la carte : précision geohash selon le zoom Leaflet. À partir de
+# POINTS_MIN_ZOOM, la carte reçoit les signalements individuels.
+CLUSTER_PRECISIONS = (1, 2, 3, 4, 5, 6)
+POINTS_MIN_ZOOM = 14
+_ZOOM_PRECISION = ((2, 1), (4, 2), (6, 3), (8, 4), (10, 5), (13, 6))
+
+
+def precision_for_zoom(zoom):
+    for max_zoom, precision in _ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return CLUSTER_PRECISIONS[-1]
+
+
+def parse_bbox(value):
+    """
+    Parse un paramètre bbox 'ouest,sud,est,nord'.
+    :return: (sud, ouest, nord, est) ou None si invalide.
+    """
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    # Leaflet peut renvoyer des longitudes hors [-180, 180] quand la carte boucle
+    south, north = max(south, -90.0), min(north, 90.0)
+    west, east = max(west, -180.0), min(east, 180.0)
+    if south > north or west > east:
+        return None
+    return south, west, north, east
+
+
+def bbox_for_radius(lat, lng, radius_km):
+    """Rectangle (sud, ouest, nord, est) englobant le cercle de rayon `radius_km`."""
+    dlat = math.degrees(radius_km / 6371.0)
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 180.0 if cos_lat < 1e-6 else min(math.degrees(radius_km / (6371.0 * cos_lat)), 180.0)
+    return max(lat - dlat, -90.0), max(lng - dlng, -180.0), min(lat + dlat, 90.0), min(lng + dlng, 180.0)
+
+
+def geohash_cover(south, west, north, east, max_cells=16):
+    """
+    Cellules geohash couvrant le rectangle, à la précision la plus fine qui
+    reste sous `max_cells` cellules.
+    """
+    cells = []
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        dlat, dlng = geohash_cell_size(precision)
+        rows = int((north - south) / dlat) + 2
+        cols = int((east - west) / dlng) + 2
+        if rows * cols > max_cells and cells:
+            break
+        candidate = []
+        for i in range(rows):
+            for j in range(cols):
+                cell = geohash_encode(min(south + i * dlat, north), min(west + j * dlng, east), precision)
+                if cell not in candidate:
+                    candidate.append(cell)
+        cells = candidate
+    return cells
@@ -0,0 +1,139 @@
+"""
+Test des migrations de schéma : chaque requête chaude de hot_queries()
+utilise un de ses index attendus (plan EXPLAIN), sur une base créée d'un
+coup comme sur une base ancienne mise à jour par les migrations, et la
+migration 12 recalcule les agrégats de la carte des signalements existants.
+
+    python hot_queries_test.py
+    python -m pytest hot_queries_test.py
+
+Base SQLite en mémoire (configuration 'testing'). Code de sortie 1 si un
+des tests échoue.
+"""
+import argparse
+import sys
+import traceback
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+import app as module
+from migration_utils import SCHEMA_VERSION_TABLE, applied_versions, explain_index_names, migrate
+from migrations import MIGRATIONS
+
+db = module.db
+
+# Tables de la première version du schéma ; les suivantes (matches, job,
+# outbound_email, map_cluster...) sont créées avec leurs index par create_all
+LEGACY_TABLES = ('user', 'password_reset_token', 'signalement', 'comment', 'notification')
+
+_application = None
+
+
+def application():
+    global _application
+    if _application is None:
+        _application = module.create_app('testing')
+    return _application
+
+
+def reset():
+    """Base vide créée d'un coup par create_all, toutes migrations marquées."""
+    db.session.remove()
+    db.drop_all()
+    with db.engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {SCHEMA_VERSION_TABLE}"))
+    module.upgrade_db()
+
+
+def unindexed_queries():
+    failures = []
+    for label, statement, expected in module.hot_queries():
+        used = explain_index_names(db.engine, statement)
+        if not used & expected:
+            failures.append(f"{label} : {', '.join(sorted(used)) or 'aucun index'}")
+    return failures
+
+
+def test_hot_queries_use_indexes():
+    with application().app_context():
+        reset()
+        assert unindexed_queries() == []
+
+
+def test_hot_queries_use_indexes_after_migrations():
+    with application().app_context():
+        reset()
+        # Base ancienne : aucun index secondaire sur les tables d'origine, aucune version enregistrée
+        inspector = inspect(db.engine)
+        with db.engine.begin() as connection:
+            for table in LEGACY_TABLES:
+                for index in inspector.get_indexes(table):
+                    connection.execute(text(f'DROP INDEX "{index["name"]}"'))
+            connection.execute(text(f"DELETE FROM {SCHEMA_VERSION_TABLE}"))
+        assert unindexed_queries() != []
+
+        migrate(db.engine, MIGRATIONS, log=lambda message: None)
+        assert applied_versions(db.engine) == {m.version for m in MIGRATIONS}
+        assert unindexed_queries() == []
+
+
+def test_map_clusters_backfilled_for_existing_signalements():
+    with application().app_context():
+        reset()
+        user = module.User(username='carte', email='carte@example.bj', password_hash='!')
+        db.session.add(user)
+        db.session.commit()
+        # Insertion directe : comme avant les agrégats, la table map_cluster reste vide
+        now = datetime.utcnow()
+        points = [(6.36 + i * 0.001, 2.42 + i * 0.002) for i in range(30)] + [(9.30, 2.63)] * 5
+        db.session.execute(module.Signalement.__table__.insert(), [{
+            'type': 'lost', 'title': f"Objet {i}", 'description': 'Test', 'location': 'Cotonou', 'date': now,
+            'category': 'Téléphone', 'status': 'resolved' if i % 7 == 0 else 'active', 'user_id': user.id,
+            'lat': lat, 'lng': lng, 'created_at': now,
+        } for i, (lat, lng) in enumerate(points)] + [{
+            'type': 'found', 'title': 'Sans position', 'description': 'Test', 'location': 'Parakou', 'date': now,
+            'category': 'Sac', 'status': 'active', 'user_id': user.id, 'lat': None, 'lng': None, 'created_at': now,
+        }])
+        db.session.commit()
+        assert db.session.query(module.MapCluster).count() == 0
+
+        with db.engine.begin() as connection:
+            connection.execute(text(f"DELETE FROM {SCHEMA_VERSION_TABLE} WHERE version = 12"))
+        migrate(db.engine, MIGRATIONS, log=lambda message: None)
+        db.session.expire_all()
+
+        def clusters():
+            return {(c.precision, c.cell): (c.total, round(c.lat_sum, 6), round(c.lng_sum, 6))
+                    for c in db.session.query(module.MapCluster)}
+
+        backfilled = clusters()
+        active = [point for i, point in enumerate(points) if i % 7 != 0]
+        for precision in module.CLUSTER_PRECISIONS:
+            assert sum(total for (p, _), (total, _, _) in backfilled.items() if p == precision) == len(active)
+
+        # Même résultat que le recalcul complet
+        result = application().test_cli_runner().invoke(args=['rebuild-map-clusters'])
+        assert result.exit_code == 0, result.output
+        db.session.expire_all()
+        assert clusters() == backfilled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Cache des réponses publiques et des fragments rendus. Les clés incluent la
+# version du contenu (compteur 'content:version' de stat_counter, incrémenté à
+# chaque écriture) : une écriture rend caduques toutes les entrées existantes,
+# qui sortent ensuite du LRU.
+
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FRAGMENT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def make_etag(*parts):
+    """ETag fort dérivé des éléments de clé (route, arguments, version du contenu)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8') + b'\0')
+    return digest.hexdigest()[:32]
+
+
+class LRUCache:
+    """
+    LRU borné en octets, thread-safe, avec statistiques de fréquentation :
+    succès, échecs, revalidations (304) et temps moyen de réponse de chacun.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # clé -> (taille, valeur)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {kind: [0, 0.0] for kind in ('hit', 'miss', 'not_modified')}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[0]
+            self._data[key] = (size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (evicted_size, _) = self._data.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def record(self, kind, elapsed):
+        """Comptabilise une réponse servie ('hit', 'miss' ou 'not_modified') et sa durée."""
+        with self._lock:
+            self._stats[kind][0] += 1
+            self._stats[kind][1] += elapsed
+
+    def snapshot(self):
+        with self._lock:
+            counts = {kind: count for kind, (count, _) in self._stats.items()}
+            latency = {kind: round(total / count * 1000, 2) if count else None
+                       for kind, (count, total) in self._stats.items()}
+            entries, size = len(self._data), self._size
+        served = sum(counts.values())
+        return {
+            'entries': entries,
+            'bytes': size,
+            'requests': counts,
+            'hit_ratio': round((counts['hit'] + counts['not_modified']) / served, 4) if served else None,
+            'avg_latency_ms': latency,
+        }
@@ -0,0 +1,181 @@
+import threading
+import time
+from datetime import timedelta
+
+
+# Recherche d'images proches par distance de Hamming entre empreintes dHash,
+# à l'aide d'un BK-tree : seules les branches compatibles avec l'inégalité
+# triangulaire sont parcourues, au lieu de comparer toutes les images.
+
+DUPLICATE_DISTANCE = 6      # doublon probable (même photo recadrée ou recompressée)
+IMAGE_MATCH_DISTANCE = 10   # même objet probable, pour les correspondances perdu/trouvé
+IMAGE_INDEX_REFRESH = 30    # secondes entre deux lectures des empreintes modifiées
+IMAGE_INDEX_REBUILD = 3600  # secondes avant reconstruction complète (purge des empreintes remplacées)
+IMAGE_INDEX_OVERLAP = 60    # secondes relues à chaque mise à jour (transactions validées en retard)
+IMAGE_INDEX_READY_TIMEOUT = 10  # attente maximale du premier chargement par une recherche
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def image_similarity(distance, bits=64):
+    """Similarité entre 0 et 1 déduite de la distance de Hamming."""
+    return max(0.0, 1.0 - distance / bits)
+
+
+class BKTree:
+    """BK-tree d'entiers sous la distance de Hamming ; chaque nœud garde les ids de même empreinte."""
+
+    def __init__(self):
+        self._root = None  # [empreinte, ids, {distance: enfant}]
+        self.size = 0
+
+    def add(self, value, item_id):
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [item_id], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item_id], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """:return: Liste de (id, distance) à au plus `max_distance`, triée par distance."""
+        results = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                results.extend((item_id, distance) for item_id in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for d, child in node[2].items() if low <= d <= high)
+        results.sort(key=lambda item: item[1])
+        return results
+
+
+class ImageHashIndex:
+    """
+    Index en mémoire (par processus) des empreintes des signalements, tenu à
+    jour par un thread d'arrière-plan lancé par `start()` (au démarrage du
+    worker et à la première requête web) : les recherches ne construisent
+    jamais l'arbre elles-mêmes.
+
+    `loader(since)` renvoie les triplets (id, empreinte hexadécimale,
+    updated_at) modifiés depuis `since` (tous si None). Toutes les `refresh`
+    secondes, seules les lignes modifiées sont ajoutées à l'arbre ; une
+    reconstruction complète toutes les `rebuild` secondes retire les
+    empreintes remplacées. `add()` insère aussitôt les empreintes calculées
+    par le processus.
+    """
+
+    def __init__(self, loader, refresh=IMAGE_INDEX_REFRESH, rebuild=IMAGE_INDEX_REBUILD,
+                 overlap=IMAGE_INDEX_OVERLAP):
+        self.loader = loader
+        self.refresh = refresh
+        self.rebuild = rebuild
+        self.overlap = timedelta(seconds=overlap)
+        self._tree = None
+        self._hashes = {}  # id -> empreinte indexée (évite les doublons lors des relectures)
+        self._added_during_build = None  # add() reçus pendant un chargement complet
+        self._watermark = None  # plus grand updated_at lu
+        self._built_at = 0.0
+        self._rebuild_requested = False
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self.stats = {'builds': 0, 'refreshes': 0, 'added': 0}
+
+    def start(self):
+        """Lance le thread de mise à jour s'il ne tourne pas déjà dans ce processus."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='image-index', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.update()
+            except Exception as e:
+                print(f"Warning: Image index update failed: {e}")
+            time.sleep(self.refresh)
+
+    def update(self):
+        """Reconstruction complète si elle est due, sinon ajout des empreintes modifiées."""
+        with self._lock:
+            full = (self._tree is None or self._rebuild_requested
+                    or time.monotonic() - self._built_at >= self.rebuild)
+            since = None if full or self._watermark is None else self._watermark - self.overlap
+            if full:
+                self._rebuild_requested = False
+                self._added_during_build = {}
+        rows = self.loader(since)
+        if full:
+            tree, hashes, watermark = BKTree(), {}, None
+            for item_id, hex_hash, updated_at in rows:
+                tree.add(int(hex_hash, 16), item_id)
+                hashes[item_id] = hex_hash
+                if updated_at is not None and (watermark is None or updated_at > watermark):
+                    watermark = updated_at
+            with self._lock:
+                # Empreintes ajoutées par add() pendant le chargement : conservées
+                for item_id, hex_hash in self._added_during_build.items():
+                    if hashes.get(item_id) != hex_hash:
+                        tree.add(int(hex_hash, 16), item_id)
+                        hashes[item_id] = hex_hash
+                self._added_during_build = None
+                self._tree, self._hashes, self._watermark = tree, hashes, watermark
+                self._built_at = time.monotonic()
+                self.stats['builds'] += 1
+            self._ready.set()
+            return
+        with self._lock:
+            for item_id, hex_hash, updated_at in rows:
+                self._insert(item_id, hex_hash)
+                if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                    self._watermark = updated_at
+            self.stats['refreshes'] += 1
+
+    def _insert(self, item_id, hex_hash):
+        # Appelé verrou pris. Une empreinte remplacée reste dans l'arbre jusqu'à
+        # la reconstruction : find_similar_images recalcule les distances.
+        if self._tree is None or self._hashes.get(item_id) == hex_hash:
+            return
+        self._tree.add(int(hex_hash, 16), item_id)
+        self._hashes[item_id] = hex_hash
+        self.stats['added'] += 1
+
+    def add(self, item_id, hex_hash):
+        with self._lock:
+            if self._added_during_build is not None:
+                self._added_during_build[item_id] = hex_hash
+            self._insert(item_id, hex_hash)
+
+    def search(self, hex_hash, max_distance):
+        """
+        :return: Liste de (id, distance), les plus proches d'abord (peut contenir
+        des ids périmés) ; vide si le premier chargement n'est pas terminé à temps.
+        """
+        if not self._ready.wait(IMAGE_INDEX_READY_TIMEOUT):
+            return []
+        with self._lock:
+            return self._tree.search(int(hex_hash, 16), max_distance)
+
+    def invalidate(self):
+        """Demande une reconstruction complète à la prochaine mise à jour."""
+        with self._lock:
+            self._rebuild_requested = True
@@ -0,0 +1,98 @@
+"""
+Test de l'index des empreintes d'images (image_index) : l'empreinte d'une
+image téléversée n'y entre qu'au commit du signalement ; une transaction
+annulée ne laisse aucun doublon fantôme dans l'arbre BK.
+
+    python image_index_test.py
+    python -m pytest image_index_test.py
+
+Base SQLite en mémoire (configuration 'testing'). Code de sortie 1 si un
+des tests échoue.
+"""
+import argparse
+import io
+import sys
+import traceback
+from datetime import date
+
+from PIL import Image
+
+import app as module
+
+db = module.db
+
+_application = None
+
+
+def application():
+    global _application
+    if _application is None:
+        _application = module.create_app('testing')
+        with _application.app_context():
+            db.create_all()
+            module.init_db('image-index-password')
+    return _application
+
+
+def image_file(color):
+    buffer = io.BytesIO()
+    image = Image.new('RGB', (64, 64), 'white')
+    image.paste(color, (0, 0, 32, 64))
+    image.save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def new_signalement(color):
+    """Signalement avec image en attente d'upload, dans la transaction courante."""
+    signalement = module.Signalement(type='lost', title='Sac', description='Sac noir', location='Cotonou',
+                                     date=date(2024, 5, 1), status='active',
+                                     user_id=module.User.query.first().id)
+    db.session.add(signalement)
+    db.session.flush()
+    module.enqueue_image_upload(signalement, image_file(color))
+    return signalement.id, signalement.image_hash
+
+
+def indexed(signalement_id, image_hash):
+    return signalement_id in {item_id for item_id, _ in module.image_index.search(image_hash, 0)}
+
+
+def test_rolled_back_hash_not_indexed():
+    with application().test_request_context():
+        module.image_index.update()
+        signalement_id, image_hash = new_signalement('black')
+        assert image_hash and not indexed(signalement_id, image_hash)
+        db.session.rollback()
+        assert not indexed(signalement_id, image_hash)
+        db.session.commit()
+        assert not indexed(signalement_id, image_hash)
+
+
+def test_committed_hash_indexed():
+    with application().test_request_context():
+        module.image_index.update()
+        signalement_id, image_hash = new_signalement('red')
+        assert not indexed(signalement_id, image_hash)
+        db.session.commit()
+        assert indexed(signalement_id, image_hash)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Test des déclinaisons d'images (make_renditions) et de leur usage dans les
+pages : chaque déclinaison pèse une fraction de la photo d'origine (poids de
+page et volume envoyé à Cloudinary par le worker), et la liste, l'accueil et
+la page détail servent les URL des déclinaisons (srcset WebP/JPEG), jamais
+l'original.
+
+    python image_renditions_test.py
+    python -m pytest image_renditions_test.py
+
+Photo de 12 Mpx générée (formes à plusieurs échelles et grain, JPEG qualité 95), base SQLite
+en mémoire (configuration 'testing'). Code de sortie 1 si un des tests échoue.
+"""
+import argparse
+import io
+import json
+import random
+import re
+import sys
+import traceback
+from datetime import date
+
+from PIL import Image, ImageDraw, ImageFilter
+
+import app as module
+from image_utils import make_renditions, srcset, RENDITION_WIDTHS
+
+db = module.db
+
+# Déclinaison retenue par le navigateur pour une carte (360 px CSS) ou la page détail (400 px) en écran 2x
+DISPLAYED_WIDTH = 960
+# Part maximale du poids de l'original
+MAX_DISPLAYED_RATIO = 0.10
+MAX_RENDITION_RATIO = 0.15
+CDN = 'https://res.cloudinary.com/demo/image/upload/signal_images'
+
+_application = None
+_source = None
+
+
+def application():
+    global _application
+    if _application is None:
+        _application = module.create_app('testing')
+        with _application.app_context():
+            db.create_all()
+            module.init_db('renditions-password')
+    return _application
+
+
+def source_photo():
+    """Photo d'appareil typique : 4000 x 3000, détails à plusieurs échelles et grain, JPEG qualité 95."""
+    global _source
+    if _source is None:
+        rng = random.Random(7)
+        image = Image.linear_gradient('L').resize((4000, 3000)).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        for size in (600, 150, 40, 10):
+            for _ in range(3_000_000 // (4 * size ** 2) + 50):
+                x, y = rng.randrange(4000), rng.randrange(3000)
+                draw.ellipse((x, y, x + rng.randint(size // 2, size), y + rng.randint(size // 2, size)),
+                             fill=tuple(rng.randrange(256) for _ in range(3)))
+        grain = Image.merge('RGB', [Image.effect_noise((4000, 3000), 20)] * 3)
+        image = Image.blend(image.filter(ImageFilter.GaussianBlur(1)), grain, 0.15)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=95)
+        _source = buffer.getvalue()
+    return _source
+
+
+def rendition_urls(name):
+    return {fmt: {str(width): f"{CDN}/{name}_{width}_{fmt}.{fmt}" for width in RENDITION_WIDTHS}
+            for fmt in ('webp', 'jpeg')}
+
+
+def test_renditions_much_smaller_than_source():
+    source = source_photo()
+    renditions = make_renditions(source)
+    assert {width for _, width in renditions} == set(RENDITION_WIDTHS)
+    for (fmt, width), content in renditions.items():
+        assert len(content) <= MAX_RENDITION_RATIO * len(source), (fmt, width, len(content), len(source))
+        assert Image.open(io.BytesIO(content)).width == width
+    for fmt in ('webp', 'jpeg'):
+        displayed = len(renditions[(fmt, DISPLAYED_WIDTH)])
+        assert displayed <= MAX_DISPLAYED_RATIO * len(source), (fmt, displayed, len(source))
+    # Le WebP, proposé en premier par <picture>, est plus léger que le JPEG de même largeur
+    assert all(len(renditions[('webp', w)]) < len(renditions[('jpeg', w)]) for w in RENDITION_WIDTHS)
+
+
+def test_pages_serve_rendition_urls():
+    with application().app_context():
+        renditions = rendition_urls('sac_noir')
+        signalement = module.Signalement(
+            type='lost', title='Sac à dos noir', description='Perdu au marché', location='Cotonou',
+            date=date(2024, 6, 1), status='active', user_id=module.User.query.first().id,
+            image_renditions=json.dumps(renditions), image_url=renditions['jpeg']['1280'])
+        db.session.add(signalement)
+        db.session.commit()
+        signalement_id = signalement.id
+
+    served = {url for urls in renditions.values() for url in urls.values()}
+    client = application().test_client()
+    for path in ('/', '/signalements', f'/signalement/{signalement_id}'):
+        html = client.get(path).get_data(as_text=True)
+        pictures = re.findall(r'<picture.*?</picture>', html, re.S)
+        picture = next((p for p in pictures if 'sac_noir' in p), None)
+        assert picture, f"{path} : pas d'élément <picture> pour le signalement"
+        assert 'type="image/webp"' in picture and 'sizes="' in picture, path
+        for fmt in ('webp', 'jpeg'):
+            assert srcset(renditions, fmt) in picture, (path, fmt)
+        urls = set(re.findall(rf'{re.escape(CDN)}/[^\s"]+', picture))
+        assert urls <= served, (path, urls - served)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import io
+import json
+
+
+# Préparation des images téléversées : décodage, orientation selon l'EXIF,
+# suppression des métadonnées (GPS compris) et déclinaisons WebP/JPEG à
+# plusieurs largeurs pour les cartes, la page détail et l'affiche PDF.
+# Pillow n'est importé qu'au premier traitement d'image, pas au démarrage.
+
+RENDITION_WIDTHS = (320, 640, 960, 1280)
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 78, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+AVATAR_SIZE = 256
+MAX_SOURCE_PIXELS = 40_000_000  # refuse les « bombes de décompression »
+
+# Attributs `sizes` par usage
+CARD_SIZES = "(max-width: 600px) 100vw, (max-width: 1024px) 50vw, 360px"
+DETAIL_SIZES = "(max-width: 900px) 100vw, 400px"
+
+
+class UnreadableImage(ValueError):
+    """Fichier corrompu, format non reconnu ou « bombe de décompression »."""
+
+
+def _pil():
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = MAX_SOURCE_PIXELS
+    return Image, ImageOps
+
+
+def _open(data):
+    Image, _ = _pil()
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise UnreadableImage(f"Image illisible : {e}") from e
+    return image
+
+
+def load_image(data):
+    """
+    Décode l'image, applique l'orientation EXIF et la convertit en RGB sans métadonnées.
+    :raises UnreadableImage: si l'image ne peut pas être décodée.
+    """
+    Image, ImageOps = _pil()
+    image = ImageOps.exif_transpose(_open(data))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    # Une nouvelle image ne garde ni l'EXIF ni les profils de l'original
+    return image.convert('RGB')
+
+
+def encode(image, fmt):
+    """Encode l'image au format donné ('webp' ou 'jpeg'), sans métadonnées."""
+    buffer = io.BytesIO()
+    try:
+        image.save(buffer, **RENDITION_FORMATS[fmt])
+    except OSError as e:
+        raise UnreadableImage(f"Encodage {fmt} impossible : {e}") from e
+    return buffer.getvalue()
+
+
+def make_renditions(data, widths=RENDITION_WIDTHS, formats=tuple(RENDITION_FORMATS)):
+    """
+    Déclinaisons de l'image, sans agrandissement : les largeurs supérieures à
+    l'original sont remplacées par la largeur d'origine.
+    :return: {(format, largeur): octets}
+    """
+    Image, _ = _pil()
+    image = load_image(data)
+    targets = sorted({min(width, image.width) for width in widths})
+    renditions = {}
+    for width in targets:
+        if width == image.width:
+            resized = image
+        else:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            renditions[(fmt, width)] = encode(resized, fmt)
+    return renditions
+
+
+def make_avatar(data, size=AVATAR_SIZE):
+    """Avatar carré recadré au centre, en JPEG."""
+    Image, ImageOps = _pil()
+    image = ImageOps.fit(load_image(data), (size, size), Image.LANCZOS)
+    return encode(image, 'jpeg')
+
+
+def parse_renditions(value):
+    """Lit la colonne image_renditions : {format: {largeur (str): url}}."""
+    if not value:
+        return {}
+    try:
+        return json.loads(value)
+    except ValueError:
+        return {}
+
+
+def srcset(renditions, fmt):
+    """Attribut srcset pour un format, ou None si aucune déclinaison n'existe."""
+    urls = renditions.get(fmt) or {}
+    if not urls:
+        return None
+    return ", ".join(f"{url} {width}w" for width, url in sorted(urls.items(), key=lambda item: int(item[0])))
+
+
+def pick_rendition(renditions, fmt, max_width):
+    """URL de la plus grande déclinaison ne dépassant pas `max_width` (la plus petite sinon)."""
+    urls = {int(width): url for width, url in (renditions.get(fmt) or {}).items()}
+    if not urls:
+        return None
+    fitting = [width for width in urls if width <= max_width]
+    return urls[max(fitting)] if fitting else urls[min(urls)]
+
+
+def image_dhash(data, hash_size=8):
+    """
+    Empreinte perceptuelle (dHash, 64 bits en hexadécimal) : insensible au
+    redimensionnement et à la recompression, proche pour deux photos du même objet.
+    """
+    Image, ImageOps = _pil()
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft('L', (hash_size * 16, hash_size * 16))  # décodage JPEG réduit, bien plus rapide
+        image = ImageOps.exif_transpose(image).convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise UnreadableImage(f"Image illisible : {e}") from e
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return f"{value:0{hash_size * hash_size // 4}x}"
@@ -0,0 +1,92 @@
+"""
+Test des nouveaux essais de la file de tâches (jobs_utils.run_job) : une
+erreur passagère replanifie la tâche avec backoff, une erreur permanente
+(PermanentJobError, par exemple Cloudinary non configuré pour le QR code)
+la fait échouer dès la première tentative.
+
+    python job_retry_test.py
+    python -m pytest job_retry_test.py
+
+Base SQLite en mémoire (configuration 'testing'). Code de sortie 1 si un
+des tests échoue.
+"""
+import argparse
+import sys
+import traceback
+from datetime import date, datetime
+
+import app as module
+from jobs_utils import run_job
+
+db = module.db
+
+_application = None
+
+
+def application():
+    global _application
+    if _application is None:
+        _application = module.create_app('testing')
+        with _application.app_context():
+            db.create_all()
+            module.init_db('job-retry-password')
+    return _application
+
+
+def new_signalement():
+    signalement = module.Signalement(type='found', title='Clés', description='Trousseau de clés',
+                                     location='Porto-Novo', date=date(2024, 2, 1), status='active',
+                                     user_id=module.User.query.first().id)
+    db.session.add(signalement)
+    db.session.flush()
+    return signalement
+
+
+def run(kind, params, handlers=None):
+    job = module.enqueue_job(kind, params)
+    db.session.commit()
+    run_job(db, job, handlers or module.job_handlers)
+    return job
+
+
+def test_qrcode_without_cloudinary_fails_once():
+    with application().test_request_context():
+        saved, module.CLOUDINARY_URL = module.CLOUDINARY_URL, None
+        try:
+            signalement = new_signalement()
+            job = run('generate_qrcode', {'signalement_id': signalement.id, 'url': 'http://localhost/signalement/1'})
+        finally:
+            module.CLOUDINARY_URL = saved
+        assert job.status == 'failed' and job.attempts == 1, (job.status, job.attempts)
+        assert 'CLOUDINARY_URL' in job.last_error
+        assert db.session.get(module.Signalement, signalement.id).qr_code_url is None
+
+
+def test_transient_error_retried_with_backoff():
+    def flaky(job):
+        raise RuntimeError("Service momentanément indisponible")
+
+    with application().app_context():
+        job = run('flaky', {}, {'flaky': flaky})
+        assert job.status == 'pending' and job.attempts == 1, (job.status, job.attempts)
+        assert job.run_at > datetime.utcnow()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
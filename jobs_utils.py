@@ -0,0 +1,106 @@
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+
+# File de tâches persistée en base (table job) : la requête HTTP enregistre la
+# tâche dans sa propre transaction, un processus worker l'exécute ensuite.
+
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+STALE_LOCK_SECONDS = 600  # une tâche 'running' plus ancienne est considérée abandonnée
+
+
+class PermanentJobError(Exception):
+    """Échec qu'un nouvel essai ne corrigerait pas (configuration absente...) : la tâche échoue aussitôt."""
+
+
+def backoff_delay(attempts):
+    """Délai avant la prochaine tentative : exponentiel, plafonné, avec gigue."""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_job(db, Job, worker, kinds=None):
+    """
+    Réserve la prochaine tâche exécutable. La réservation est un UPDATE
+    conditionnel sur le statut : si deux workers visent la même ligne, un seul
+    l'obtient (rowcount == 1), sans verrou explicite.
+    :return: La tâche réservée ou None.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=STALE_LOCK_SECONDS)
+    runnable = db.or_(
+        db.and_(Job.status == 'pending', Job.run_at <= now),
+        db.and_(Job.status == 'running', Job.locked_at < stale)
+    )
+    query = db.select(Job.id, Job.status).where(runnable).order_by(Job.run_at, Job.id).limit(10)
+    if kinds:
+        query = query.where(Job.kind.in_(kinds))
+
+    for job_id, status in db.session.execute(query).all():
+        result = db.session.execute(
+            db.update(Job)
+              .where(Job.id == job_id, Job.status == status)
+              .values(status='running', locked_at=now, locked_by=worker)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(Job, job_id)
+    return None
+
+
+def run_job(db, job, handlers):
+    """Exécute une tâche réservée et enregistre son issue (succès, nouvel essai ou échec définitif)."""
+    handler = handlers.get(job.kind)
+    attempts = (job.attempts or 0) + 1
+    try:
+        if handler is None:
+            raise LookupError(f"Aucun gestionnaire pour le type de tâche '{job.kind}'")
+        handler(job)
+        job.status = 'done'
+        job.last_error = None
+        job.data = None  # libérer la charge binaire une fois traitée
+    except Exception as e:
+        # Annuler les écritures partielles du gestionnaire, pas la comptabilité de la tâche
+        db.session.rollback()
+        job.last_error = ''.join(traceback.format_exception_only(type(e), e)).strip()[:2000]
+        if attempts >= job.max_attempts or isinstance(e, PermanentJobError):
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.run_at = datetime.utcnow() + timedelta(seconds=backoff_delay(attempts))
+        print(f"Tâche {job.id} ({job.kind}) en échec, tentative {attempts}/{job.max_attempts}: {e}")
+    job.attempts = attempts
+    job.locked_at = None
+    job.locked_by = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job.status
+
+
+def work(db, Job, handlers, poll_interval=1.0, burst=False, kinds=None):
+    """
+    Boucle du worker : exécute les tâches disponibles, puis attend `poll_interval`.
+    En mode `burst`, s'arrête dès que la file est vide.
+    :return: Le nombre de tâches traitées.
+    """
+    worker = worker_id()
+    processed = 0
+    while True:
+        job = claim_next_job(db, Job, worker, kinds)
+        if job is None:
+            db.session.remove()
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        run_job(db, job, handlers)
+        processed += 1
@@ -0,0 +1,263 @@
+"""
+Test d'envoi des emails (run_mailer / deliver_outbound_emails) contre un
+serveur SMTP local qui enregistre les messages : envoi par lots sur une
+seule connexion, reconnexion après le quota de messages ou une coupure du
+serveur, regroupement des notifications en récapitulatif, nouvelles
+tentatives puis email_dead_letter.
+
+    python mailer_delivery_test.py
+    python -m pytest mailer_delivery_test.py
+
+Base SQLite en mémoire (configuration 'testing'). Code de sortie 1 si un
+des tests échoue.
+"""
+import argparse
+import socketserver
+import sys
+import threading
+import traceback
+from datetime import datetime
+from email import message_from_bytes, policy
+
+import app as module
+from mailer_utils import SmtpConnection
+
+db = module.db
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """
+    Serveur SMTP minimal. `reject` : adresses refusées (550 au RCPT) ;
+    `defer` : adresses dont le DATA échoue temporairement (451) ;
+    `drop_after` : la connexion est coupée après ce nombre de messages.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, reject=(), defer=(), drop_after=None):
+        super().__init__(('127.0.0.1', 0), SmtpSinkHandler)
+        self.reject = set(reject)
+        self.defer = set(defer)
+        self.drop_after = drop_after
+        self.messages = []     # (numéro de connexion, message)
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+            connection = sink.connections
+        received = 0
+        recipients = []
+        self.reply('220 sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 sink')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[1].strip().strip('<>')
+                if address in sink.reject:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b'.\r\n', b''):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b'..') else chunk)
+                if sink.defer & set(recipients):
+                    self.reply('451 Try again later')
+                    continue
+                with sink.lock:
+                    sink.messages.append((connection, message_from_bytes(b''.join(data), policy=policy.default)))
+                received += 1
+                self.reply('250 Queued')
+                if sink.drop_after and received >= sink.drop_after:
+                    return  # coupure brutale, sans 221
+            elif verb == 'RSET':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+_application = None
+
+
+def application():
+    global _application
+    if _application is None:
+        _application = module.create_app('testing')
+        _application.config.update(MAIL_ENABLED=True, MAIL_SERVER='127.0.0.1', MAIL_USE_TLS=False,
+                                   MAIL_USERNAME='', MAIL_DIGEST_WINDOW=0)
+        with _application.app_context():
+            db.create_all()
+    return _application
+
+
+def reset(sink, batch_size=200):
+    config = application().config
+    config.update(MAIL_PORT=sink.port, MAIL_BATCH_SIZE=batch_size)
+    for model in (module.OutboundEmail, module.EmailDeadLetter, module.Notification, module.User):
+        db.session.execute(db.delete(model))
+    db.session.commit()
+
+
+def make_user(name):
+    user = module.User(username=name, email=f"{name}@example.bj", password_hash='!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_batches_share_one_connection():
+    with SmtpSink() as sink, application().app_context():
+        reset(sink, batch_size=10)
+        for i in range(35):
+            module.enqueue_email(f"dest{i}@example.bj", f"Sujet {i}", f"Corps {i}")
+        db.session.commit()
+
+        assert module.run_mailer(burst=True) == 35
+        assert len(sink.messages) == 35
+        assert sink.connections == 1, sink.connections
+        assert sorted(msg['To'] for _, msg in sink.messages) == sorted(f"dest{i}@example.bj" for i in range(35))
+        assert db.session.query(module.OutboundEmail).count() == 0
+
+
+def test_reconnects_after_quota_and_disconnect():
+    with SmtpSink(drop_after=7) as sink, application().app_context():
+        reset(sink)
+        for i in range(20):
+            module.enqueue_email(f"dest{i}@example.bj", f"Sujet {i}", f"Corps {i}")
+        db.session.commit()
+
+        smtp = SmtpConnection('127.0.0.1', sink.port, use_tls=False, max_messages=5)
+        try:
+            processed, sent = module.deliver_outbound_emails(smtp, 'test-worker', 200)
+        finally:
+            smtp.close()
+        assert (processed, sent) == (20, 20)
+        # Quota de 5 messages par connexion (la coupure à 7 n'est jamais atteinte)
+        assert sink.connections == 4, sink.connections
+        assert [connection for connection, _ in sink.messages] == [1 + i // 5 for i in range(20)]
+
+    with SmtpSink(drop_after=3) as sink, application().app_context():
+        reset(sink)
+        for i in range(7):
+            module.enqueue_email(f"dest{i}@example.bj", f"Sujet {i}", f"Corps {i}")
+        db.session.commit()
+        # Le serveur coupe tous les 3 messages : chaque email part quand même, une seule fois
+        assert module.run_mailer(burst=True) == 7
+        assert len(sink.messages) == 7 and sink.connections == 3
+
+
+def test_notifications_grouped_into_digests():
+    with SmtpSink() as sink, application().app_context():
+        reset(sink)
+        alice, bob = make_user('alice'), make_user('bob')
+        for i in range(3):
+            db.session.add(module.Notification(name=f"Correspondance {i}", user_id=alice.id, link=f"/signalement/{i}"))
+        db.session.add(module.Notification(name="Nouveau commentaire", user_id=bob.id, link="/signalement/9"))
+        db.session.commit()
+        assert db.session.query(module.OutboundEmail).count() == 4
+
+        assert module.run_mailer(burst=True) == 2
+        messages = {msg['To']: msg for _, msg in sink.messages}
+        assert set(messages) == {'alice@example.bj', 'bob@example.bj'}
+        assert messages['alice@example.bj']['Subject'] == "3 nouvelles notifications - SignalAlert"
+        body = messages['alice@example.bj'].get_body(('plain',)).get_content()
+        assert all(f"Correspondance {i}" in body and f"/signalement/{i}" in body for i in range(3))
+        assert messages['bob@example.bj']['Subject'] == "Nouveau commentaire - SignalAlert"
+        assert sink.connections == 1
+
+
+def test_dead_letter_after_max_retries():
+    with SmtpSink(defer={'flaky@example.bj'}) as sink, application().app_context():
+        reset(sink)
+        email = module.enqueue_email('flaky@example.bj', 'Réinitialisation', 'Votre lien')
+        db.session.commit()
+        email_id, max_attempts = email.id, email.max_attempts
+
+        for attempt in range(1, max_attempts + 1):
+            assert module.run_mailer(burst=True) == 0
+            row = db.session.get(module.OutboundEmail, email_id)
+            if attempt < max_attempts:
+                assert row is not None and row.attempts == attempt and row.status == 'pending'
+                assert row.run_at > datetime.utcnow()  # backoff
+                row.run_at = datetime.utcnow()  # on n'attend pas le backoff
+                db.session.commit()
+        assert db.session.get(module.OutboundEmail, email_id) is None
+        dead = db.session.query(module.EmailDeadLetter).one()
+        assert dead.to_address == 'flaky@example.bj' and dead.attempts == max_attempts
+        assert '451' in dead.last_error
+        assert sink.messages == []
+
+
+def test_refused_recipient_dead_lettered_at_once():
+    with SmtpSink(reject={'gone@example.bj'}) as sink, application().app_context():
+        reset(sink)
+        module.enqueue_email('gone@example.bj', 'Bienvenue', 'Bonjour')
+        module.enqueue_email('ok@example.bj', 'Bienvenue', 'Bonjour')
+        db.session.commit()
+
+        assert module.run_mailer(burst=True) == 1
+        assert [msg['To'] for _, msg in sink.messages] == ['ok@example.bj']
+        dead = db.session.query(module.EmailDeadLetter).one()
+        assert dead.to_address == 'gone@example.bj' and dead.attempts == 1
+        assert db.session.query(module.OutboundEmail).count() == 0
+        # La connexion survit au refus d'un destinataire
+        assert sink.connections == 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
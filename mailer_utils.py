@@ -0,0 +1,94 @@
+import smtplib
+import time
+from email.message import EmailMessage
+
+
+# Envoi des emails sortants par le processus `flask run-mailer` : connexion
+# SMTP authentifiée gardée ouverte entre les lots, regroupement des
+# notifications d'un même destinataire en un seul email récapitulatif.
+
+SMTP_TIMEOUT = 30
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100  # certains serveurs coupent au-delà
+SMTP_IDLE_SECONDS = 60                  # au-delà, la connexion est vérifiée par NOOP
+
+
+def build_message(sender, recipient, subject, text_body, html_body=None):
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg.set_content(text_body)
+    if html_body:
+        msg.add_alternative(html_body, subtype='html')
+    return msg
+
+
+def group_digests(rows):
+    """
+    Regroupe les lignes réservées : une liste par clé de récapitulatif, une
+    liste à un élément pour chaque email individuel. L'ordre d'arrivée est conservé.
+    """
+    groups = {}
+    for row in rows:
+        key = ('digest', row.digest_key) if row.digest_key else ('single', row.id)
+        groups.setdefault(key, []).append(row)
+    return list(groups.values())
+
+
+class SmtpConnection:
+    """Connexion SMTP persistante, rouverte à la demande (déconnexion, quota, inactivité)."""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, timeout=SMTP_TIMEOUT,
+                 max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION, idle_seconds=SMTP_IDLE_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self._server = None
+        self._sent = 0
+        self._last_used = 0.0
+
+    def _connect(self):
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self._server = server
+        self._sent = 0
+
+    def _ensure_connected(self):
+        if self._server is None or self._sent >= self.max_messages:
+            self._connect()
+        elif time.monotonic() - self._last_used > self.idle_seconds:
+            try:
+                if self._server.noop()[0] != 250:
+                    self._connect()
+            except smtplib.SMTPException:
+                self._connect()
+
+    def send(self, msg):
+        """Envoie un message, avec une reconnexion si le serveur a fermé la session."""
+        self._ensure_connected()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._server.send_message(msg)
+        self._sent += 1
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._server = None
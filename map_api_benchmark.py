@@ -0,0 +1,147 @@
+"""
+Compare l'API de la carte par agrégats (/api/signalements/clusters) à
+/api/signalements/locations, sur une base SQLite neuve de plusieurs
+centaines de milliers de signalements géolocalisés répartis sur le Bénin :
+temps de réponse et taille du JSON renvoyé, caches de réponses désactivés.
+L'ancienne version de /locations (tous les points, sans bbox ni limite) est
+mesurée à part, requête et sérialisation comprises.
+
+    python map_api_benchmark.py
+    python map_api_benchmark.py --rows 100000 --requests 100
+    python map_api_benchmark.py --legacy-requests 0
+
+Base dans un dossier temporaire, agrégats construits par
+`flask rebuild-map-clusters`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Exécuté dans un interpréteur neuf ; DATABASE_URL vient du parent
+CHILD_SCRIPT = r'''
+import json, random, sys, time
+from datetime import datetime, timedelta
+import app as module
+
+role = sys.argv[1]
+application = module.create_app('production')
+application.config['SQL_QUERY_BUDGET'] = None
+module.response_cache.max_bytes = module.fragment_cache.max_bytes = 0
+db, Signalement = module.db, module.Signalement
+
+if role == 'seed':
+    rows = int(sys.argv[2])
+    rng = random.Random(3)
+    with application.app_context():
+        module.init_db('bench-admin-password')
+        user_id = module.User.query.first().id
+        table = Signalement.__table__
+        now = datetime.utcnow()
+        # Moitié autour de Cotonou, le reste sur tout le pays
+        for start in range(0, rows, 5000):
+            batch = []
+            for i in range(start, min(rows, start + 5000)):
+                if i % 2:
+                    lat, lng = rng.gauss(6.37, 0.05), rng.gauss(2.42, 0.07)
+                else:
+                    lat, lng = rng.uniform(6.2, 12.4), rng.uniform(0.8, 3.8)
+                created = now - timedelta(minutes=rows - i)
+                batch.append({'type': ('lost', 'found')[i % 2], 'title': f"Objet {i}", 'description': 'Test',
+                              'location': 'Bénin', 'date': created, 'category': 'Téléphone',
+                              'status': 'resolved' if i % 10 == 0 else 'active', 'user_id': user_id,
+                              'lat': lat, 'lng': lng, 'geohash': module.geohash_encode(lat, lng),
+                              'created_at': created, 'updated_at': created})
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+    result = application.test_cli_runner().invoke(args=['rebuild-map-clusters'])
+    assert result.exit_code == 0, (result.output, result.exception)
+    print(json.dumps({'role': role, 'rows': rows, 'clusters': result.output.strip()}))
+    sys.exit(0)
+
+count, legacy_count = int(sys.argv[2]), int(sys.argv[3])
+client = application.test_client()
+country, city = '0.7,6.1,3.9,12.5', '2.35,6.33,2.48,6.41'
+routes = {
+    'clusters pays (zoom 7)': f'/api/signalements/clusters?bbox={country}&zoom=7',
+    'clusters ville (zoom 12)': f'/api/signalements/clusters?bbox={city}&zoom=12',
+    'clusters rue (zoom 15, points)': '/api/signalements/clusters?bbox=2.415,6.365,2.425,6.375&zoom=15',
+    'locations ville (bbox)': f'/api/signalements/locations?bbox={city}',
+    'locations sans bbox (limite)': '/api/signalements/locations',
+}
+
+def measure(call, n):
+    for _ in range(min(3, n)):
+        call()  # préchauffage : pool, caches de compilation SQLAlchemy
+    samples, size = [], 0
+    for _ in range(n):
+        started = time.perf_counter()
+        size = call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'samples': samples, 'bytes': size}
+
+def get(path):
+    def call():
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        return len(response.get_data())
+    return call
+
+def legacy_locations():
+    # Ancienne implémentation : tous les signalements localisés, sérialisés en un tableau
+    with application.test_request_context():
+        rows = Signalement.query.filter(Signalement.lat.isnot(None), Signalement.lng.isnot(None)).all()
+        body = module.jsonify([{'id': s.id, 'title': s.title, 'type': s.type, 'lat': s.lat, 'lng': s.lng}
+                               for s in rows]).get_data()
+        db.session.remove()
+        return len(body)
+
+timings = {name: measure(get(path), count) for name, path in routes.items()}
+if legacy_count:
+    timings['locations historique (tout, sans limite)'] = measure(legacy_locations, legacy_count)
+print(json.dumps({'timings': timings}))
+'''
+
+
+def run_child(env, *args):
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, *map(str, args)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"{args[0]} : échec\n{result.stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'median_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000, help='signalements géolocalisés')
+    parser.add_argument('--requests', type=int, default=50, help='requêtes mesurées par route')
+    parser.add_argument('--legacy-requests', type=int, default=3,
+                        help="mesures de l'ancienne version de /locations (0 pour l'ignorer)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'map.db')}",
+                   USER_CACHE_DIR='', SQL_QUERY_BUDGET='')
+        print(json.dumps(run_child(env, 'seed', args.rows)))
+        measured = run_child(env, 'measure', args.requests, args.legacy_requests)['timings']
+
+    results = {name: dict(summarize(m['samples']), bytes=m['bytes']) for name, m in measured.items()}
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
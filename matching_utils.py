@@ -0,0 +1,204 @@
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from geo_utils import geohash_encode, geohash_neighbors, haversine_km
+
+
+# Types complémentaires : un objet trouvé peut correspondre à un objet perdu, volé
+# ou à une personne disparue, et inversement.
+COMPLEMENTARY_TYPES = {
+    'found': ('lost', 'stolen', 'missing'),
+    'lost': ('found',),
+    'stolen': ('found',),
+    'missing': ('found',),
+}
+
+MATCH_THRESHOLD = 0.55
+DATE_WINDOW_DAYS = 30
+MAX_DISTANCE_KM = 25.0
+BLOCK_GEOHASH_PRECISION = 4  # cellules d'environ 39 km x 20 km
+
+WEIGHTS = {
+    'text': 0.5,
+    'category': 0.15,
+    'date': 0.15,
+    'geo': 0.2,
+}
+
+
+def _normalize(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', value).strip()
+
+
+def char_ngrams(value, n=3):
+    """N-grammes de caractères par mot, bornés par des espaces."""
+    grams = Counter()
+    for word in _normalize(value).split():
+        padded = f' {word} '
+        for i in range(max(len(padded) - n + 1, 1)):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+def build_idf(documents):
+    """IDF lissé à partir d'une liste de Counter de n-grammes."""
+    df = Counter()
+    for grams in documents:
+        df.update(grams.keys())
+    n = len(documents)
+    return {gram: math.log((1 + n) / (1 + count)) + 1 for gram, count in df.items()}
+
+
+def tfidf_vector(grams, idf):
+    """Vecteur TF-IDF creux (dict) normalisé L2."""
+    default_idf = max(idf.values()) if idf else 1.0
+    vector = {gram: count * idf.get(gram, default_idf) for gram, count in grams.items()}
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    if not norm:
+        return {}
+    return {gram: w / norm for gram, w in vector.items()}
+
+
+def cosine(v1, v2):
+    if len(v1) > len(v2):
+        v1, v2 = v2, v1
+    return sum(w * v2.get(gram, 0.0) for gram, w in v1.items())
+
+
+def to_record(signalement):
+    """Extrait d'un Signalement les seuls champs utiles au scoring (picklable)."""
+    return {
+        'id': signalement.id,
+        'user_id': signalement.user_id,
+        'type': signalement.type,
+        'category': signalement.category,
+        'text': f"{signalement.title} {signalement.title} {signalement.description}",
+        'date': signalement.date,
+        'lat': signalement.lat,
+        'lng': signalement.lng,
+    }
+
+
+def score_pair(r1, r2, v1, v2):
+    """Score de similarité entre 0 et 1 de deux signalements déjà vectorisés."""
+    text_score = cosine(v1, v2)
+
+    category_score = 1.0 if r1['category'] and r1['category'] == r2['category'] else 0.0
+
+    days = abs((r1['date'] - r2['date']).days) if r1['date'] and r2['date'] else DATE_WINDOW_DAYS
+    date_score = max(0.0, 1.0 - days / DATE_WINDOW_DAYS)
+
+    if None in (r1['lat'], r1['lng'], r2['lat'], r2['lng']):
+        geo_score = 0.5  # position inconnue : ni bonus ni pénalité
+    else:
+        distance = haversine_km(r1['lat'], r1['lng'], r2['lat'], r2['lng'])
+        geo_score = max(0.0, 1.0 - distance / MAX_DISTANCE_KM)
+
+    return (WEIGHTS['text'] * text_score + WEIGHTS['category'] * category_score +
+            WEIGHTS['date'] * date_score + WEIGHTS['geo'] * geo_score)
+
+
+def score_candidates(record, candidates, threshold=MATCH_THRESHOLD):
+    """
+    Score un signalement contre ses candidats (mode incrémental).
+    L'IDF est calculé localement sur le bloc candidat.
+    :return: Liste de (candidate_id, score) au-dessus du seuil.
+    """
+    grams = [char_ngrams(r['text']) for r in [record] + candidates]
+    idf = build_idf(grams)
+    vectors = [tfidf_vector(g, idf) for g in grams]
+    results = []
+    for candidate, vector in zip(candidates, vectors[1:]):
+        if candidate['user_id'] == record['user_id']:
+            continue
+        score = score_pair(record, candidate, vectors[0], vector)
+        if score >= threshold:
+            results.append((candidate['id'], round(score * 100, 1)))
+    return results
+
+
+# Mode "rematch" en masse : blocs (catégorie, cellule geohash, tranche de dates)
+# répartis sur un pool de processus.
+
+def _block_keys(record):
+    if record['lat'] is not None and record['lng'] is not None:
+        cells = geohash_neighbors(record['lat'], record['lng'], BLOCK_GEOHASH_PRECISION)
+    else:
+        cells = [None]
+    bucket = record['date'].toordinal() // DATE_WINDOW_DAYS if record['date'] else None
+    buckets = [None] if bucket is None else [bucket - 1, bucket, bucket + 1]
+    return [(record['category'], cell, b) for cell in cells for b in buckets]
+
+
+def _home_key(record):
+    cell = None
+    if record['lat'] is not None and record['lng'] is not None:
+        cell = geohash_encode(record['lat'], record['lng'], BLOCK_GEOHASH_PRECISION)
+    bucket = record['date'].toordinal() // DATE_WINDOW_DAYS if record['date'] else None
+    return (record['category'], cell, bucket)
+
+
+_worker_state = {}
+
+
+def _init_worker(index, idf, threshold):
+    _worker_state['index'] = index
+    _worker_state['idf'] = idf
+    _worker_state['threshold'] = threshold
+
+
+def _match_chunk(records):
+    index = _worker_state['index']
+    idf = _worker_state['idf']
+    threshold = _worker_state['threshold']
+    pairs = []
+    vector_cache = {}
+
+    def vector(r):
+        if r['id'] not in vector_cache:
+            vector_cache[r['id']] = tfidf_vector(char_ngrams(r['text']), idf)
+        return vector_cache[r['id']]
+
+    for record in records:
+        seen = set()
+        for key in _block_keys(record):
+            for candidate in index.get(key, ()):
+                if candidate['id'] in seen or candidate['user_id'] == record['user_id']:
+                    continue
+                if candidate['type'] not in COMPLEMENTARY_TYPES.get(record['type'], ()):
+                    continue
+                seen.add(candidate['id'])
+                score = score_pair(record, candidate, vector(record), vector(candidate))
+                if score >= threshold:
+                    pairs.append((record['id'], candidate['id'], round(score * 100, 1)))
+    return pairs
+
+
+def rematch_all(records, threshold=MATCH_THRESHOLD, workers=None, chunk_size=500):
+    """
+    Recalcule toutes les correspondances à partir d'une liste de records.
+    Seuls les signalements 'found' interrogent l'index, ce qui évite de produire
+    chaque paire deux fois.
+    :return: Liste de (found_id, other_id, score).
+    """
+    index = defaultdict(list)
+    queries = []
+    for record in records:
+        if record['type'] == 'found':
+            queries.append(record)
+        else:
+            index[_home_key(record)].append(record)
+
+    idf = build_idf([char_ngrams(r['text']) for r in records])
+    chunks = [queries[i:i + chunk_size] for i in range(0, len(queries), chunk_size)]
+    pairs = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(dict(index), idf, threshold)) as executor:
+        for chunk_pairs in executor.map(_match_chunk, chunks):
+            pairs.extend(chunk_pairs)
+    return pairs
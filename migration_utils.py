@@ -0,0 +1,218 @@
+import json
+import time
+
+from sqlalchemy import inspect, text
+
+
+# Migrations de schéma versionnées (voir migrations.py) : la table
+# schema_version garde les versions appliquées. Les étapes sont idempotentes
+# (IF NOT EXISTS, colonnes vérifiées) et ne tiennent jamais de verrou long :
+# index construits en ligne (CREATE INDEX CONCURRENTLY sous PostgreSQL) et
+# backfills par tranches, une transaction courte par tranche.
+
+SCHEMA_VERSION_TABLE = 'schema_version'
+BACKFILL_BATCH_SIZE = 1000
+MIGRATION_LOCK_ID = 727_001  # verrou consultatif PostgreSQL : un seul migrateur à la fois
+
+
+class Migration:
+    """Étape de migration : `upgrade(engine)` doit pouvoir être rejouée sans effet."""
+
+    def __init__(self, version, description, upgrade):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+    def __repr__(self):
+        return f"<Migration {self.version}: {self.description}>"
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def ensure_version_table(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(255) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        ))
+
+
+def applied_versions(engine):
+    ensure_version_table(engine)
+    with engine.connect() as connection:
+        return set(connection.execute(text(f"SELECT version FROM {SCHEMA_VERSION_TABLE}")).scalars())
+
+
+def _record(engine, migration):
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description, applied_at) "
+            "VALUES (:version, :description, CURRENT_TIMESTAMP)"
+        ), {'version': migration.version, 'description': migration.description[:255]})
+
+
+def pending_migrations(engine, migrations, target=None):
+    done = applied_versions(engine)
+    return [m for m in sorted(migrations, key=lambda m: m.version)
+            if m.version not in done and (target is None or m.version <= target)]
+
+
+def migrate(engine, migrations, target=None, log=print):
+    """
+    Applique dans l'ordre les migrations manquantes (jusqu'à `target` inclus).
+    Chaque version est enregistrée dès qu'elle a réussi : une migration
+    interrompue reprend à l'étape en échec.
+    :return: La liste des versions appliquées.
+    """
+    lock = None
+    if engine.dialect.name == 'postgresql':
+        lock = engine.connect()
+        lock.execute(text("SELECT pg_advisory_lock(:id)"), {'id': MIGRATION_LOCK_ID})
+    try:
+        applied = []
+        for migration in pending_migrations(engine, migrations, target):
+            log(f"Migration {migration.version} : {migration.description}...")
+            started = time.perf_counter()
+            migration.upgrade(engine)
+            _record(engine, migration)
+            applied.append(migration.version)
+            log(f"Migration {migration.version} appliquée en {time.perf_counter() - started:.1f} s.")
+        return applied
+    finally:
+        if lock is not None:
+            lock.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': MIGRATION_LOCK_ID})
+            lock.close()
+
+
+def stamp(engine, migrations):
+    """Marque toutes les migrations comme appliquées (base créée d'un coup par create_all)."""
+    for migration in pending_migrations(engine, migrations):
+        _record(engine, migration)
+
+
+# Étapes élémentaires
+
+def has_table(engine, table):
+    return inspect(engine).has_table(table)
+
+
+def add_column(engine, table, column, ddl):
+    """
+    ALTER TABLE ... ADD COLUMN si la colonne manque. Sans valeur par défaut
+    volatile, l'ajout ne réécrit pas la table (PostgreSQL 11+, SQLite).
+    :return: True si la colonne a été ajoutée.
+    """
+    if column in {c['name'] for c in inspect(engine).get_columns(table)}:
+        return False
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {_quote(engine, table)} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def create_index(engine, name, table, columns, unique=False):
+    """
+    Crée l'index s'il manque. Sous PostgreSQL, construction CONCURRENTLY (hors
+    transaction) : lectures et écritures continuent pendant la construction.
+    Un index laissé invalide par une construction interrompue est reconstruit.
+    """
+    definition = f"{'UNIQUE ' if unique else ''}INDEX"
+    target = f"{_quote(engine, table)} ({', '.join(columns)})"
+    if engine.dialect.name != 'postgresql':
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE {definition} IF NOT EXISTS {name} ON {target}"))
+        return
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        # Pas de délai maximal (DB_STATEMENT_TIMEOUT_MS) le temps de la construction ;
+        # la connexion retourne ensuite au pool avec son réglage d'origine
+        timeout = connection.execute(text("SHOW statement_timeout")).scalar()
+        connection.execute(text("SET statement_timeout = 0"))
+        try:
+            valid = connection.execute(text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ), {'name': name}).scalar()
+            if valid is False:
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            connection.execute(text(f"CREATE {definition} CONCURRENTLY IF NOT EXISTS {name} ON {target}"))
+        finally:
+            connection.execute(text("SELECT set_config('statement_timeout', :value, false)"), {'value': timeout})
+
+def backfill(engine, table, set_sql, where_sql='1 = 1', params=None, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    UPDATE par tranches d'identifiants consécutifs ; chaque tranche est
+    validée séparément pour ne verrouiller que `batch_size` lignes à la fois.
+    :return: Le nombre de lignes modifiées.
+    """
+    quoted = _quote(engine, table)
+    with engine.connect() as connection:
+        low, high = connection.execute(text(f"SELECT MIN(id), MAX(id) FROM {quoted}")).one()
+    if low is None:
+        return 0
+    updated = 0
+    for start in range(low, high + 1, batch_size):
+        with engine.begin() as connection:
+            updated += connection.execute(text(
+                f"UPDATE {quoted} SET {set_sql} WHERE id >= :_start AND id < :_end AND ({where_sql})"
+            ), dict(params or {}, _start=start, _end=start + batch_size)).rowcount
+    return updated
+
+
+def backfill_rows(engine, select_sql, update_sql, transform, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Backfill calculé en Python. `select_sql` filtre sur `id > :last_id`, trie
+    par id et se limite à `:limit` lignes ; `transform(row)` renvoie les
+    paramètres de `update_sql` (ou None pour ignorer la ligne).
+    :return: Le nombre de lignes modifiées.
+    """
+    last_id, updated = 0, 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(text(select_sql), {'last_id': last_id, 'limit': batch_size}).all()
+            if not rows:
+                return updated
+            values = [params for params in map(transform, rows) if params is not None]
+            if values:
+                connection.execute(text(update_sql), values)
+            updated += len(values)
+            last_id = rows[-1].id
+
+
+# Vérification des plans d'exécution
+
+def explain_index_names(engine, statement):
+    """
+    Index utilisés par le plan d'une requête SQLAlchemy (valeurs littérales,
+    hors dates : préférer func.current_timestamp()). Sous PostgreSQL, les
+    parcours séquentiels sont désactivés le temps de l'EXPLAIN : sur une petite
+    table, le planificateur les préférerait à un index pourtant utilisable.
+    """
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            connection.rollback()
+        names = set()
+
+        def walk(node):
+            if 'Index Name' in node:
+                names.add(node['Index Name'])
+            for child in node.get('Plans', []):
+                walk(child)
+
+        walk((json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan'])
+        return names
+
+    names = set()
+    with engine.connect() as connection:
+        for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+            # « SEARCH t USING [COVERING] INDEX nom (...) »
+            words = row[-1].split()
+            if 'INDEX' in words and words.index('INDEX') + 1 < len(words):
+                names.add(words[words.index('INDEX') + 1])
+    return names
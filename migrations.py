@@ -0,0 +1,165 @@
+from collections import defaultdict
+
+from sqlalchemy import text
+
+from migration_utils import (BACKFILL_BATCH_SIZE, Migration, add_column, backfill, backfill_rows, create_index,
+                             has_table)
+from geo_utils import CLUSTER_PRECISIONS, geohash_center, geohash_encode
+
+
+# Historique du schéma. Seul chemin de mise à jour d'une base existante :
+#
+#     flask --app 'app:create_app()' db-upgrade
+#
+# (`flask init-db` l'applique aussi au déploiement). Les versions 1 et 2
+# reprennent les anciens scripts update.py et update_2.py ; une base déjà
+# mise à jour à la main les rejoue sans effet. Une nouvelle table est
+# créée par db.create_all() avant les migrations : seules les colonnes et
+# les index ajoutés à des tables existantes ont besoin d'une étape ici.
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(upgrade):
+        MIGRATIONS.append(Migration(version, description, upgrade))
+        return upgrade
+    return register
+
+
+@migration(1, "QR code des signalements et avatar des utilisateurs")
+def _qr_code_and_avatar(engine):
+    add_column(engine, 'signalement', 'qr_code_url', "VARCHAR(500) NULL")
+    add_column(engine, 'user', 'avatar_url', "VARCHAR(500) NULL")
+
+
+@migration(2, "Détails avancés des signalements")
+def _signalement_details(engine):
+    for column, ddl in (('lat', "FLOAT NULL"), ('lng', "FLOAT NULL"), ('views', "INTEGER DEFAULT 0"),
+                        ('identification', "VARCHAR(255) NULL"), ('additional_info', "TEXT NULL"),
+                        ('phone', "VARCHAR(50) NULL"), ('email', "VARCHAR(120) NULL")):
+        add_column(engine, 'signalement', column, ddl)
+
+
+@migration(3, "Geohash et moteur de correspondances")
+def _geohash_and_matching(engine):
+    add_column(engine, 'signalement', 'geohash', "VARCHAR(12) NULL")
+    add_column(engine, 'signalement', 'match_count', "INTEGER DEFAULT 0")
+    create_index(engine, 'ix_signalement_geohash', 'signalement', ['geohash'])
+    create_index(engine, 'ix_signalement_blocking', 'signalement', ['category', 'geohash', 'date'])
+    backfill_rows(
+        engine,
+        "SELECT id, lat, lng FROM signalement WHERE id > :last_id AND lat IS NOT NULL AND lng IS NOT NULL "
+        "AND geohash IS NULL ORDER BY id LIMIT :limit",
+        "UPDATE signalement SET geohash = :geohash WHERE id = :id",
+        lambda row: {'id': row.id, 'geohash': geohash_encode(row.lat, row.lng)},
+    )
+
+
+@migration(4, "Pagination par clé des signalements")
+def _signalement_keyset_indexes(engine):
+    create_index(engine, 'ix_signalement_created_id', 'signalement', ['created_at', 'id'])
+    create_index(engine, 'ix_signalement_status_created_id', 'signalement', ['status', 'created_at', 'id'])
+
+
+@migration(5, "Compteur de notifications non lues")
+def _unread_notifications(engine):
+    add_column(engine, 'user', 'unread_notifications', "INTEGER NOT NULL DEFAULT 0")
+    backfill(engine, 'user',
+             'unread_notifications = (SELECT COUNT(*) FROM notification '
+             'WHERE notification.user_id = "user".id AND notification.is_read = :false)',
+             params={'false': False})
+
+
+@migration(6, "Boîte de réception des notifications")
+def _notification_inbox_indexes(engine):
+    create_index(engine, 'ix_notification_user_read_timestamp', 'notification', ['user_id', 'is_read', 'timestamp'])
+    create_index(engine, 'ix_notification_user_timestamp_id', 'notification', ['user_id', 'timestamp', 'id'])
+
+
+@migration(7, "Déclinaisons des images")
+def _image_renditions(engine):
+    add_column(engine, 'signalement', 'image_renditions', "TEXT NULL")
+
+
+@migration(8, "Empreintes perceptuelles des images")
+def _image_hash(engine):
+    add_column(engine, 'signalement', 'image_hash', "VARCHAR(16) NULL")
+    create_index(engine, 'ix_signalement_image_hash', 'signalement', ['image_hash'])
+
+
+@migration(9, "Date de modification des signalements")
+def _signalement_updated_at(engine):
+    add_column(engine, 'signalement', 'updated_at', "TIMESTAMP NULL")
+    backfill(engine, 'signalement', "updated_at = created_at", "updated_at IS NULL")
+
+
+@migration(10, "Console d'administration")
+def _admin_console_indexes(engine):
+    create_index(engine, 'ix_user_created_id', 'user', ['created_at', 'id'])
+    create_index(engine, 'ix_user_active_created_id', 'user', ['is_active', 'created_at', 'id'])
+    create_index(engine, 'ix_signalement_user_created_id', 'signalement', ['user_id', 'created_at', 'id'])
+    create_index(engine, 'ix_signalement_type_status_created_id', 'signalement',
+                 ['type', 'status', 'created_at', 'id'])
+    create_index(engine, 'ix_comment_timestamp_id', 'comment', ['timestamp', 'id'])
+    create_index(engine, 'ix_comment_user_timestamp_id', 'comment', ['user_id', 'timestamp', 'id'])
+    create_index(engine, 'ix_comment_signalement_timestamp_id', 'comment', ['signalement_id', 'timestamp', 'id'])
+
+
+@migration(11, "Index des requêtes chaudes (filtres, purge des jetons, archivage)")
+def _hot_query_indexes(engine):
+    # Liste filtrée par type seul ou par catégorie, triée par date de création
+    create_index(engine, 'ix_signalement_type_created_id', 'signalement', ['type', 'created_at', 'id'])
+    create_index(engine, 'ix_signalement_category_created_id', 'signalement', ['category', 'created_at', 'id'])
+    # Purge des jetons expirés et jetons d'un utilisateur
+    if has_table(engine, 'password_reset_token'):
+        create_index(engine, 'ix_password_reset_token_expires_at', 'password_reset_token', ['expires_at'])
+        create_index(engine, 'ix_password_reset_token_user_id', 'password_reset_token', ['user_id'])
+    # Archivage des notifications lues anciennes, toutes boîtes confondues
+    create_index(engine, 'ix_notification_read_timestamp', 'notification', ['is_read', 'timestamp'])
+
+
+@migration(12, "Agrégats de la carte des signalements existants")
+def _map_cluster_backfill(engine):
+    # La table map_cluster, créée vide par create_all, n'est tenue à jour qu'à
+    # l'écriture des signalements : on la recalcule depuis les signalements
+    # actifs géolocalisés. Lecture et remplacement se font dans une seule
+    # transaction qui verrouille d'abord map_cluster en écriture : un
+    # signalement créé ou clos pendant le recalcul attend la fin de la
+    # migration pour appliquer son delta, au lieu d'être effacé par le DELETE.
+    # Les agrégats tiennent en mémoire (une ligne par cellule et par précision).
+    if not has_table(engine, 'map_cluster'):
+        return
+    with engine.begin() as connection:
+        if engine.dialect.name == 'postgresql':
+            connection.execute(text("LOCK TABLE map_cluster IN EXCLUSIVE MODE"))
+        # Sous SQLite, le DELETE prend le verrou d'écriture de la base
+        connection.execute(text("DELETE FROM map_cluster"))
+
+        deltas = defaultdict(lambda: [0, 0.0, 0.0])
+        last_id = 0
+        while True:
+            rows = connection.execute(text(
+                "SELECT id, lat, lng FROM signalement WHERE id > :last_id AND status = 'active' "
+                "AND lat IS NOT NULL AND lng IS NOT NULL ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': BACKFILL_BATCH_SIZE}).all()
+            if not rows:
+                break
+            for row in rows:
+                for precision in CLUSTER_PRECISIONS:
+                    delta = deltas[(precision, geohash_encode(row.lat, row.lng, precision))]
+                    delta[0] += 1
+                    delta[1] += row.lat
+                    delta[2] += row.lng
+            last_id = rows[-1].id
+
+        values = []
+        for (precision, cell), (total, lat_sum, lng_sum) in deltas.items():
+            center_lat, center_lng = geohash_center(cell)
+            values.append({'precision': precision, 'cell': cell, 'center_lat': center_lat,
+                           'center_lng': center_lng, 'total': total, 'lat_sum': lat_sum, 'lng_sum': lng_sum})
+        for start in range(0, len(values), BACKFILL_BATCH_SIZE):
+            connection.execute(text(
+                "INSERT INTO map_cluster (precision, cell, center_lat, center_lng, total, lat_sum, lng_sum) "
+                "VALUES (:precision, :cell, :center_lat, :center_lng, :total, :lat_sum, :lng_sum)"
+            ), values[start:start + BACKFILL_BATCH_SIZE])
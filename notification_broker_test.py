@@ -0,0 +1,137 @@
+"""
+Test du broker SSE des notifications (NotificationBroker et
+_poll_notifications) : une notification validée après une plus récente
+(id inférieur, transaction lente sous PostgreSQL) est quand même diffusée,
+une seule fois, et rien d'antérieur au démarrage du broker n'est rediffusé.
+
+    python notification_broker_test.py
+    python -m pytest notification_broker_test.py
+
+Base SQLite en mémoire (configuration 'testing'). Code de sortie 1 si un
+des tests échoue.
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+import app as module
+from notify_utils import NotificationBroker
+
+db = module.db
+
+_application = None
+
+
+def application():
+    global _application
+    if _application is None:
+        _application = module.create_app('testing')
+        with _application.app_context():
+            db.create_all()
+    return _application
+
+
+def reset():
+    for model in (module.Notification, module.User):
+        db.session.execute(db.delete(model))
+    db.session.commit()
+    user = module.User(username='sse', email='sse@example.bj', password_hash='!')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def insert_notification(notification_id, user_id, name, timestamp=None):
+    # Insertion directe avec un id imposé : simule l'ordre de validation des transactions
+    db.session.execute(module.Notification.__table__.insert().values(
+        id=notification_id, user_id=user_id, name=name, timestamp=timestamp or datetime.utcnow()))
+    db.session.commit()
+
+
+def manual_broker(**kwargs):
+    broker = NotificationBroker(module._poll_notifications, **kwargs)
+    # Thread déclaré vivant : pas de sondage en arrière-plan, le test pilote poll_once()
+    broker._thread = threading.current_thread()
+    return broker
+
+
+def received(q):
+    names = []
+    while True:
+        try:
+            message = q.get_nowait()
+        except queue.Empty:
+            return names
+        event, data = message.strip().split('\n')
+        if event == 'event: notification':
+            names.append(json.loads(data[len('data: '):])['name'])
+
+
+def test_late_commit_delivered_once():
+    with application().app_context():
+        user_id = reset()
+        insert_notification(100, user_id, 'ancienne')
+        broker = manual_broker()
+        q = broker.subscribe(user_id, 0)
+        broker.poll_once([user_id])
+        assert broker.last_id == 100
+
+        # B (id 102) est validée avant A (id 101)
+        insert_notification(102, user_id, 'B')
+        broker.poll_once([user_id])
+        assert broker.last_id == 102
+        insert_notification(101, user_id, 'A')
+        broker.poll_once([user_id])
+        broker.poll_once([user_id])
+        assert received(q) == ['B', 'A']
+
+
+def test_nothing_rediffused_from_before_start():
+    with application().app_context():
+        user_id = reset()
+        # Récente mais validée avant le démarrage du broker : pas une nouveauté
+        insert_notification(150, user_id, 'avant démarrage')
+        broker = manual_broker()
+        q = broker.subscribe(user_id, 0)
+        broker.poll_once([user_id])
+        insert_notification(200, user_id, 'après')
+        # Transaction longue : horodatée avant la fenêtre mais d'id supérieur au dernier vu
+        insert_notification(201, user_id, 'lente', datetime.utcnow() - timedelta(minutes=5))
+        broker.poll_once([user_id])
+        broker.poll_once([user_id])
+        assert received(q) == ['après', 'lente']
+
+
+def test_delivered_ids_pruned():
+    with application().app_context():
+        user_id = reset()
+        broker = manual_broker(lookback=0)
+        broker.poll_once([user_id])
+        insert_notification(1, user_id, 'x')
+        broker.poll_once([user_id])
+        broker.poll_once([user_id])
+        assert broker._delivered == {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+# Diffusion des notifications en Server-Sent Events. Chaque processus web
+# interroge la base une seule fois par intervalle, quel que soit le nombre de
+# connexions ouvertes, puis répartit les événements dans les files des abonnés.
+# Compatible avec les workers gevent (threading et queue sont alors patchés).
+
+SSE_POLL_INTERVAL = 2          # secondes entre deux interrogations de la base
+SSE_HEARTBEAT_SECONDS = 20     # commentaire envoyé pour garder la connexion ouverte
+SSE_MAX_STREAM_SECONDS = 1800  # au-delà, le navigateur se reconnecte de lui-même
+SSE_QUEUE_SIZE = 50
+# Les identifiants sont attribués à l'insertion, pas à la validation : une
+# notification d'une transaction lente peut être validée après une plus
+# récente. Chaque interrogation relit donc cette fenêtre sous le dernier id vu.
+SSE_LOOKBACK_SECONDS = 60
+
+
+def sse_event(event, data):
+    """Formate un message SSE."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class NotificationBroker:
+    """
+    Abonnements par utilisateur. `poll_callback(last_id, user_ids, since)`
+    renvoie (dernier id vu, notifications [(user_id, payload)], {user_id: non_lues}) :
+    celles d'id supérieur à last_id et celles horodatées depuis `since` (datetime
+    UTC), déjà diffusées ou non ; avec last_id None, seul le dernier id est à
+    renvoyer. Le broker ne diffuse qu'une fois chaque id (payload['id']).
+    """
+
+    def __init__(self, poll_callback, interval=SSE_POLL_INTERVAL, lookback=SSE_LOOKBACK_SECONDS):
+        self.poll_callback = poll_callback
+        self.interval = interval
+        self.lookback = lookback
+        self.last_id = None
+        self.started_at = None
+        self._delivered = {}     # id -> instant de diffusion (time.monotonic)
+        self._subscribers = {}   # user_id -> set de files
+        self._counts = {}        # user_id -> dernier compteur diffusé
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, user_id, unread_count):
+        q = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+            self._counts[user_id] = unread_count
+        self.start()
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(q)
+                if not queues:
+                    del self._subscribers[user_id]
+                    self._counts.pop(user_id, None)
+
+    def publish(self, user_id, message):
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+        for q in queues:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass  # client trop lent : il se resynchronisera à la reconnexion
+
+    def start(self):
+        # Sous gevent, Thread.start() cède la main en attendant le démarrage :
+        # sans verrou, chaque connexion ouverte entre-temps lancerait son propre thread
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='notification-broker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                user_ids = list(self._subscribers)
+            try:
+                self.poll_once(user_ids)
+            except Exception as e:
+                print(f"Warning: Notification broker poll failed: {e}")
+            time.sleep(self.interval)
+
+    def poll_once(self, user_ids):
+        now = datetime.utcnow()
+        if self.started_at is None:
+            self.started_at = now  # rien d'antérieur au démarrage n'est rediffusé
+        since = max(self.started_at, now - timedelta(seconds=self.lookback))
+        self.last_id, notifications, counts = self.poll_callback(self.last_id, user_ids, since)
+        delivered_at = time.monotonic()
+        for user_id, payload in notifications:
+            if payload['id'] in self._delivered:
+                continue
+            self._delivered[payload['id']] = delivered_at
+            self.publish(user_id, sse_event('notification', payload))
+        # Un id sorti de la fenêtre relue ne peut plus revenir
+        expired = delivered_at - 2 * self.lookback
+        for notification_id in [i for i, at in self._delivered.items() if at < expired]:
+            del self._delivered[notification_id]
+        for user_id, count in counts.items():
+            with self._lock:
+                changed = user_id in self._counts and self._counts[user_id] != count
+                if changed:
+                    self._counts[user_id] = count
+            if changed:
+                self.publish(user_id, sse_event('unread', {'count': count}))
+
+    def stream(self, user_id, unread_count):
+        """Générateur de la réponse SSE d'un utilisateur."""
+        q = self.subscribe(user_id, unread_count)
+        started = time.monotonic()
+        try:
+            yield f"retry: 5000\n{sse_event('unread', {'count': unread_count})}"
+            while time.monotonic() - started < SSE_MAX_STREAM_SECONDS:
+                try:
+                    yield q.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": ping\n\n"
+        finally:
+            self.unsubscribe(user_id, q)
@@ -0,0 +1,105 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """Encode une clé de pagination (liste de valeurs JSON) en jeton opaque."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Décode un jeton produit par encode_cursor ; None s'il est absent ou invalide."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+    """Page obtenue par pagination par clé (keyset), sans OFFSET ni COUNT."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def _dump(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _load(column, value):
+    """Valeur de clé lue dans un curseur, vérifiée contre le type de la colonne (ValueError sinon)."""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        if not isinstance(value, str):
+            raise ValueError('Curseur invalide')
+        return datetime.fromisoformat(value)
+    if python_type is int and (not isinstance(value, int) or isinstance(value, bool)):
+        raise ValueError('Curseur invalide')
+    if python_type is str and not isinstance(value, str):
+        raise ValueError('Curseur invalide')
+    return value
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=12, total=None):
+    """
+    Pagine `query` en ordre décroissant sur `columns` (la dernière colonne doit
+    être unique, typiquement l'id). Le curseur mémorise le sens et la clé de la
+    dernière ligne vue, si bien que la page 10 000 coûte autant que la page 1.
+    :raises ValueError: si le curseur est invalide.
+    """
+    direction, key = 'after', None
+    if cursor:
+        values = decode_cursor(cursor)
+        if not values or len(values) != 2 or values[0] not in ('after', 'before') \
+                or not isinstance(values[1], list) or len(values[1]) != len(columns):
+            raise ValueError('Curseur invalide')
+        direction = values[0]
+        key = [_load(column, value) for column, value in zip(columns, values[1])]
+
+    row_key = tuple_(*columns)
+    if direction == 'after':
+        if key is not None:
+            query = query.filter(row_key < tuple_(*key))
+        query = query.order_by(*[column.desc() for column in columns])
+    else:
+        query = query.filter(row_key > tuple_(*key)).order_by(*[column.asc() for column in columns])
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'before':
+        rows.reverse()
+
+    def cursor_for(direction, row):
+        return encode_cursor([direction, [_dump(getattr(row, column.key)) for column in columns]])
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if direction == 'after':
+            next_cursor = cursor_for('after', rows[-1]) if has_more else None
+            prev_cursor = cursor_for('before', rows[0]) if key is not None else None
+        else:
+            next_cursor = cursor_for('after', rows[-1])
+            prev_cursor = cursor_for('before', rows[0]) if has_more else None
+    return KeysetPage(rows, next_cursor, prev_cursor, total)
@@ -0,0 +1,149 @@
+"""
+Compare la génération de l'affiche PDF d'un signalement
+(/signalement/<id>/generer_pdf) à froid (rendu WeasyPrint puis écriture dans
+PdfArtifactCache) et depuis le cache disque, et vérifie l'invalidation : une
+modification d'un champ affiché change l'empreinte du contenu (ETag), donc
+provoque un nouveau rendu, tandis qu'une requête conditionnelle sur
+l'empreinte courante reçoit un 304 sans rendu.
+
+    python pdf_cache_benchmark.py
+    python pdf_cache_benchmark.py --cold-requests 20 --warm-requests 200
+
+Base SQLite et dossier du cache PDF temporaires, caches de réponses
+désactivés. Nécessite WeasyPrint et ses bibliothèques système (Pango).
+Code de sortie 1 si une vérification d'invalidation échoue.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Exécuté dans un interpréteur neuf ; DATABASE_URL et PDF_CACHE_DIR viennent du parent
+CHILD_SCRIPT = r'''
+import json, os, sys, time
+from datetime import date
+import app as module
+
+cold_count, warm_count = int(sys.argv[1]), int(sys.argv[2])
+application = module.create_app('production')
+application.config['SQL_QUERY_BUDGET'] = None
+module.response_cache.max_bytes = module.fragment_cache.max_bytes = 0
+db, Signalement = module.db, module.Signalement
+cache_dir = application.config['PDF_CACHE_DIR']
+
+with application.app_context():
+    module.init_db('bench-admin-password')
+    user_id = module.User.query.first().id
+    signalement = Signalement(type='lost', title='Téléphone Samsung noir', location='Cotonou',
+                              description="Perdu près du marché Dantokpa, étui rouge. Récompense.",
+                              date=date(2024, 3, 14), category='Téléphone', contact='+229 97 00 00 00',
+                              reward='10 000 FCFA', status='active', user_id=user_id)
+    db.session.add(signalement)
+    db.session.commit()
+    signalement_id = signalement.id
+
+client = application.test_client()
+with client.session_transaction() as session:
+    session['_user_id'] = str(user_id)
+    session['_fresh'] = True
+path = f'/signalement/{signalement_id}/generer_pdf'
+
+def cached_files():
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith('.pdf')) if os.path.isdir(cache_dir) else []
+
+def clear_cache():
+    for name in cached_files():
+        os.remove(os.path.join(cache_dir, name))
+
+def download(headers=None):
+    started = time.perf_counter()
+    response = client.get(path, headers=headers or {})
+    elapsed = (time.perf_counter() - started) * 1000
+    assert response.status_code in (200, 304), response.status_code
+    return response, elapsed
+
+# Préchauffage : imports différés de WeasyPrint et qrcode, polices, compilation des gabarits
+download()
+cold, warm = [], []
+for _ in range(cold_count):
+    clear_cache()
+    response, elapsed = download()
+    cold.append(elapsed)
+size = len(response.get_data())
+for _ in range(warm_count):
+    response, elapsed = download()
+    warm.append(elapsed)
+
+failures = []
+first_etag, first_files = response.get_etag()[0], cached_files()
+if first_files != [f"{first_etag}.pdf"]:
+    failures.append(f"cache après rendu : {first_files}, attendu l'empreinte {first_etag}")
+response, _ = download({'If-None-Match': f'"{first_etag}"'})
+if response.status_code != 304:
+    failures.append(f"requête conditionnelle sur l'empreinte courante : {response.status_code} au lieu de 304")
+
+# Modification d'un champ affiché : nouvelle empreinte, nouveau rendu
+with application.app_context():
+    db.session.get(Signalement, signalement_id).title = 'Téléphone Samsung noir (écran fissuré)'
+    db.session.commit()
+response, changed = download({'If-None-Match': f'"{first_etag}"'})
+second_etag = response.get_etag()[0]
+if response.status_code != 200 or second_etag == first_etag:
+    failures.append(f"après modification : {response.status_code}, empreinte {second_etag} (avant {first_etag})")
+if f"{second_etag}.pdf" not in cached_files():
+    failures.append(f"après modification : {cached_files()} sans {second_etag}.pdf")
+response, _ = download()
+if response.get_etag()[0] != second_etag:
+    failures.append("la nouvelle affiche n'est pas servie depuis le cache")
+
+print(json.dumps({'cold': cold, 'warm': warm, 'bytes': size, 'changed_ms': changed, 'failures': failures}))
+'''
+
+
+def run_child(env, *args):
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, *map(str, args)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"échec\n{result.stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'median_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cold-requests', type=int, default=10, help='rendus mesurés, cache vidé avant chacun')
+    parser.add_argument('--warm-requests', type=int, default=100, help='téléchargements mesurés depuis le cache')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'pdf.db')}",
+                   PDF_CACHE_DIR=os.path.join(directory, 'pdf_cache'), USER_CACHE_DIR='', SQL_QUERY_BUDGET='')
+        measured = run_child(env, max(1, args.cold_requests), max(1, args.warm_requests))
+
+    cold, warm = summarize(measured['cold']), summarize(measured['warm'])
+    print(json.dumps({
+        'froid (rendu)': cold,
+        'cache': warm,
+        'après modification': round(measured['changed_ms'], 2),
+        'accélération médiane': round(cold['median_ms'] / warm['median_ms'], 1),
+        'taille_pdf': measured['bytes'],
+    }, indent=2))
+    for failure in measured['failures']:
+        print(f"ÉCHEC : {failure}")
+    return 1 if measured['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
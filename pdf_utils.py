@@ -0,0 +1,57 @@
+import hashlib
+import os
+import threading
+
+from disk_cache_utils import atomic_write, touch, evict_lru_files
+
+
+# Cache disque des affiches PDF, indexé par l'empreinte du contenu rendu.
+
+PDF_CACHE_FIELDS = ('id', 'type', 'title', 'description', 'location', 'date',
+                    'category', 'contact', 'reward', 'image_url')
+
+
+def pdf_content_key(signalement, signalement_url, template_source):
+    """
+    Empreinte SHA-256 de tout ce qui influence l'affiche : champs affichés,
+    URL encodée dans le QR code et source du gabarit.
+    """
+    digest = hashlib.sha256()
+    for field in PDF_CACHE_FIELDS:
+        value = getattr(signalement, field)
+        digest.update(f"{field}={value.isoformat() if hasattr(value, 'isoformat') else value}\0".encode('utf-8'))
+    digest.update(signalement_url.encode('utf-8') + b'\0')
+    digest.update(template_source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PdfArtifactCache:
+    """
+    Fichiers PDF nommés par leur empreinte. L'horodatage de modification sert
+    d'ordre LRU : il est rafraîchi à chaque lecture et les plus anciens sont
+    supprimés dès que la taille totale dépasse `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """Chemin du PDF en cache (et le marque comme récemment utilisé), ou None."""
+        path = self._path(key)
+        return path if touch(path) else None
+
+    def store(self, key, pdf_bytes):
+        """Écrit le PDF de façon atomique puis applique le budget de taille."""
+        atomic_write(self._path(key), pdf_bytes)
+        self.evict()
+        return self._path(key)
+
+    def evict(self):
+        """Supprime les PDF les moins récemment utilisés au-delà du budget."""
+        with self._lock:
+            return evict_lru_files(self.directory, self.max_bytes, suffix='.pdf')
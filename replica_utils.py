@@ -0,0 +1,96 @@
+import itertools
+import threading
+import time
+
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import text
+
+
+# Répartition lectures/écritures : les vues en lecture seule lisent sur un
+# réplica (SQLALCHEMY_BINDS 'replica_N'), tout le reste va au primaire. Un
+# réplica trop en retard ou injoignable est écarté jusqu'à la vérification
+# suivante ; sans réplica disponible, tout va au primaire.
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Retard de rejeu d'un réplica PostgreSQL (0 s'il a tout rejoué, NULL sur un primaire)
+POSTGRES_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def replica_lag(engine):
+    """
+    Retard du réplica en secondes. Les autres bases (copies SQLite de test)
+    n'exposent pas de réplication : leur retard est considéré nul.
+    """
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as connection:
+        lag = connection.execute(text(POSTGRES_LAG_SQL)).scalar()
+    return float(lag or 0.0)
+
+
+class ReplicaRouter:
+    """
+    Choisit à tour de rôle un réplica dont le retard est sous `max_lag`.
+    Le retard de chaque réplica est mesuré au plus une fois toutes les
+    `check_interval` secondes et par processus.
+    """
+
+    def __init__(self, engines, max_lag, check_interval):
+        self.engines = engines  # nom du bind -> moteur
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._cycle = itertools.cycle(sorted(engines))
+        self._lock = threading.Lock()
+        self._lags = {}  # nom -> (retard ou None si injoignable, date de mesure)
+
+    def lag(self, name):
+        with self._lock:
+            cached = self._lags.get(name)
+        if cached is not None and time.monotonic() - cached[1] < self.check_interval:
+            return cached[0]
+        try:
+            lag = replica_lag(self.engines[name])
+        except Exception as e:
+            print(f"WARNING: réplica {name} injoignable : {e}")
+            lag = None
+        with self._lock:
+            self._lags[name] = (lag, time.monotonic())
+        return lag
+
+    def choose(self):
+        """:return: (nom, moteur) d'un réplica à jour, ou None pour lire sur le primaire."""
+        for _ in range(len(self.engines)):
+            with self._lock:
+                name = next(self._cycle)
+            lag = self.lag(name)
+            if lag is not None and lag <= self.max_lag:
+                return name, self.engines[name]
+        return None
+
+    def status(self):
+        with self._lock:
+            lags = dict(self._lags)
+        return {name: {'lag_seconds': lags[name][0] if name in lags else None,
+                       'available': name in lags and lags[name][0] is not None
+                                    and lags[name][0] <= self.max_lag}
+                for name in sorted(self.engines)}
+
+
+class RoutingSession(FlaskSession):
+    """
+    Session qui envoie les SELECT au réplica posé dans `info['replica']` (par
+    la vue) tant qu'elle n'a rien écrit. Écritures, flush, SELECT ... FOR
+    UPDATE et requêtes textuelles vont au primaire ; après la première
+    écriture, toute la session y reste (elle relit ses propres écritures).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if (replica is not None and bind is None and not self._flushing
+                and getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,143 @@
+"""
+Compare la recherche des signalements par LIKE (repli sans index plein
+texte) et par FTS5 (search_utils.apply_search), sur des bases SQLite neuves
+de 100 000 et 1 000 000 de signalements au vocabulaire réaliste : p50 et
+p99 de la requête de la première page de /signalements?search=...
+(per_page + 1 lignes, tri par pertinence ou par date).
+
+    python search_benchmark.py
+    python search_benchmark.py --sizes 100000 --requests 200
+    python search_benchmark.py --backends fts --terms "téléphone noir" "cles"
+
+Chaque taille est générée dans un dossier temporaire (génération déterministe),
+chaque moteur mesuré dans un interpréteur neuf.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKENDS = ('like', 'fts')
+DEFAULT_TERMS = ('téléphone', 'portefeuille cuir', 'clés', 'cles', 'samsung noir', 'passeport', 'ordinat')
+
+# Exécuté dans un interpréteur neuf ; DATABASE_URL vient du parent
+CHILD_SCRIPT = r'''
+import json, random, sys, time
+from datetime import datetime, timedelta
+import app as module
+import search_utils
+
+role = sys.argv[1]
+application = module.create_app('production')
+application.config['SQL_QUERY_BUDGET'] = None
+db, Signalement = module.db, module.Signalement
+
+if role == 'seed':
+    rows = int(sys.argv[2])
+    rng = random.Random(1)
+    objects = ['téléphone', 'portefeuille', 'clés', 'sac à dos', 'passeport', 'ordinateur portable',
+               "carte d'identité", 'montre', 'lunettes', 'vélo', 'moto', 'chien', 'chat', 'enfant']
+    details = ['noir', 'rouge', 'bleu', 'cuir', 'samsung', 'iphone', 'tecno', 'itel', 'neuf', 'ancien',
+               'avec étui', 'rayé', 'marron', 'gris', 'doré', 'argenté']
+    places = ['Cotonou', 'Porto-Novo', 'Parakou', 'Abomey-Calavi', 'Bohicon', 'Ouidah', 'Natitingou',
+              'marché Dantokpa', 'gare routière', 'université', 'zémidjan', 'église', 'stade']
+    filler = ("perdu près de", "retrouvé devant", "oublié dans", "volé au", "aperçu vers", "déposé à",
+              "contactez-moi", "récompense", "merci de", "appeler", "le soir", "le matin", "hier")
+    with application.app_context():
+        module.init_db('bench-admin-password')
+        user_id = module.User.query.first().id
+        table = Signalement.__table__
+        now = datetime.utcnow()
+        for start in range(0, rows, 10000):
+            batch = []
+            for i in range(start, min(rows, start + 10000)):
+                thing, detail, place = rng.choice(objects), rng.choice(details), rng.choice(places)
+                words = [rng.choice(filler) for _ in range(rng.randint(8, 30))]
+                created = now - timedelta(minutes=rows - i)
+                batch.append({'type': ('lost', 'found')[i % 2], 'title': f"{thing.capitalize()} {detail}",
+                              'description': f"{thing} {detail} {' '.join(words)} {place}",
+                              'location': place, 'date': created, 'category': 'Divers', 'status': 'active',
+                              'user_id': user_id, 'created_at': created, 'updated_at': created})
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+    print(json.dumps({'role': role, 'rows': rows}))
+    sys.exit(0)
+
+backend, count, terms = sys.argv[2], int(sys.argv[3]), json.loads(sys.argv[4])
+per_page = application.config.get('ITEMS_PER_PAGE', 12)
+with application.app_context():
+    search_utils.detect_search_index(db.engine)
+    if backend == 'like':
+        search_utils._fts_backend = None
+    assert (search_utils._fts_backend is None) == (backend == 'like'), search_utils._fts_backend
+    results = {}
+    for term in terms:
+        def run():
+            query = db.session.query(Signalement.id)
+            return search_utils.apply_search(query, Signalement, term).limit(per_page + 1).all()
+        for _ in range(3):
+            run()  # préchauffage : cache de pages SQLite, compilation SQLAlchemy
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            found = run()
+            samples.append((time.perf_counter() - started) * 1000)
+        results[term] = {'samples': samples, 'first_page': len(found)}
+print(json.dumps({'backend': backend, 'results': results}))
+'''
+
+
+def run_child(env, *args):
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, *map(str, args)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"{args[0]} : échec\n{result.stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {'p50_ms': round(statistics.median(ordered), 2), 'p99_ms': round(percentile(ordered, 0.99), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000], help='signalements par base')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--terms', nargs='+', default=list(DEFAULT_TERMS), help='recherches mesurées')
+    parser.add_argument('--requests', type=int, default=100, help='mesures par recherche et par moteur')
+    args = parser.parse_args()
+
+    report = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'search.db')}",
+                       USER_CACHE_DIR='', SQL_QUERY_BUDGET='')
+            run_child(env, 'seed', size)
+            for backend in args.backends:
+                measured = run_child(env, 'measure', backend, args.requests, json.dumps(args.terms))['results']
+                report.setdefault(str(size), {})[backend] = {
+                    term: dict(summarize(m['samples']), first_page=m['first_page']) for term, m in measured.items()
+                }
+        print(json.dumps({size: report[str(size)]}, indent=2))
+
+    if set(args.backends) == set(BACKENDS):
+        for size, backends in report.items():
+            for term in args.terms:
+                like, fts = backends['like'][term], backends['fts'][term]
+                print(f"{size} lignes, « {term} » : FTS p50 {fts['p50_ms']} ms contre {like['p50_ms']} ms (LIKE), "
+                      f"p99 {fts['p99_ms']} contre {like['p99_ms']} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
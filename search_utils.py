@@ -0,0 +1,150 @@
+import re
+
+from sqlalchemy import text, Integer, Float
+
+
+# Index plein texte : colonne tsvector + GIN sur PostgreSQL, table FTS5 sur SQLite
+_fts_backend = None
+
+_PG_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() n'est pas IMMUTABLE : on l'enveloppe pour pouvoir l'utiliser
+    # dans une colonne générée et dans l'index.
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    """,
+    """
+    ALTER TABLE signalement ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', f_unaccent(coalesce(title, ''))), 'A') ||
+        setweight(to_tsvector('french', f_unaccent(coalesce(description, ''))), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_signalement_search_vector ON signalement USING GIN (search_vector)",
+]
+
+_SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS signalement_fts USING fts5(
+        title, description,
+        content='signalement', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS signalement_fts_ai AFTER INSERT ON signalement BEGIN
+        INSERT INTO signalement_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS signalement_fts_ad AFTER DELETE ON signalement BEGIN
+        INSERT INTO signalement_fts(signalement_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS signalement_fts_au AFTER UPDATE OF title, description ON signalement BEGIN
+        INSERT INTO signalement_fts(signalement_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO signalement_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+
+def init_search_index(db):
+    """
+    Crée (si nécessaire) l'index plein texte des signalements.
+    Sur PostgreSQL la colonne générée se tient à jour toute seule ; sur SQLite
+    des triggers synchronisent la table FTS5 à l'insertion, l'édition et la suppression.
+    :return: Le nom du moteur activé ('postgresql', 'sqlite') ou None (repli sur LIKE).
+    """
+    global _fts_backend
+    dialect = db.engine.dialect.name
+    try:
+        with db.engine.begin() as connection:
+            if dialect == 'postgresql':
+                for statement in _PG_SETUP:
+                    connection.execute(text(statement))
+            elif dialect == 'sqlite':
+                existed = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'signalement_fts'"
+                )).first()
+                for statement in _SQLITE_SETUP:
+                    connection.execute(text(statement))
+                if not existed:
+                    # Indexer les signalements déjà présents
+                    connection.execute(text("INSERT INTO signalement_fts(signalement_fts) VALUES ('rebuild')"))
+            else:
+                return None
+        _fts_backend = dialect
+    except Exception as e:
+        print(f"⚠️  Index plein texte indisponible, repli sur LIKE : {e}")
+        _fts_backend = None
+    return _fts_backend
+
+
+def detect_search_index(engine):
+    """
+    Retrouve, sans rien créer, l'index plein texte mis en place par
+    init_search_index (`flask init-db`) : appelé une fois par worker.
+    """
+    global _fts_backend
+    with engine.connect() as connection:
+        if engine.dialect.name == 'postgresql':
+            found = connection.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'signalement' AND column_name = 'search_vector'"
+            )).first()
+        elif engine.dialect.name == 'sqlite':
+            found = connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'signalement_fts'"
+            )).first()
+        else:
+            found = None
+    _fts_backend = engine.dialect.name if found else None
+    return _fts_backend
+
+
+def _fts5_query(search):
+    """Transforme la saisie utilisateur en requête FTS5 sûre (préfixes, ET implicite)."""
+    terms = re.findall(r'\w+', search, flags=re.UNICODE)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def apply_search(query, model, search):
+    """
+    Filtre une requête de signalements sur `search` et la trie par pertinence.
+    Les autres filtres déjà appliqués à `query` sont conservés. Le tri se
+    termine toujours par (created_at, id) décroissants : pages stables.
+    """
+    if _fts_backend == 'postgresql':
+        return query.filter(
+            text("signalement.search_vector @@ websearch_to_tsquery('french', f_unaccent(:search))")
+            .bindparams(search=search)
+        ).order_by(
+            text("ts_rank_cd(signalement.search_vector, "
+                 "websearch_to_tsquery('french', f_unaccent(:rank_search))) DESC")
+            .bindparams(rank_search=search),
+            model.created_at.desc(), model.id.desc()
+        )
+
+    if _fts_backend == 'sqlite':
+        match = _fts5_query(search)
+        if not match:
+            # Saisie sans aucun mot (ponctuation seule) : pas de filtre, ordre par défaut
+            return query.order_by(model.created_at.desc(), model.id.desc())
+        ranked = text(
+            "SELECT rowid AS id, bm25(signalement_fts, 10.0, 1.0) AS rank "
+            "FROM signalement_fts WHERE signalement_fts MATCH :match"
+        ).bindparams(match=match).columns(id=Integer, rank=Float).subquery('fts')
+        # bm25() renvoie un score négatif : plus petit = plus pertinent
+        return query.join(ranked, ranked.c.id == model.id)\
+                    .order_by(ranked.c.rank, model.created_at.desc(), model.id.desc())
+
+    return query.filter(model.title.contains(search) | model.description.contains(search))\
+                .order_by(model.created_at.desc(), model.id.desc())
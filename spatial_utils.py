@@ -0,0 +1,163 @@
+import math
+
+from sqlalchemy import text, or_, and_, func, literal_column
+
+from geo_utils import bbox_for_radius, geohash_cover
+
+
+# Index spatial : PostGIS (GiST) ou R*Tree SQLite quand ils sont disponibles,
+# sinon intervalles de préfixes sur la colonne geohash (B-tree).
+_spatial_backend = None
+
+_POINT_SQL = "geography(ST_SetSRID(ST_MakePoint(signalement.lng, signalement.lat), 4326))"
+
+_POSTGIS_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    f"CREATE INDEX IF NOT EXISTS ix_signalement_geography ON signalement USING GIST (({_POINT_SQL}))",
+]
+
+_RTREE_SETUP = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS signalement_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    """
+    CREATE TRIGGER IF NOT EXISTS signalement_rtree_ai AFTER INSERT ON signalement
+    WHEN new.lat IS NOT NULL AND new.lng IS NOT NULL BEGIN
+        INSERT INTO signalement_rtree VALUES (new.id, new.lat, new.lat, new.lng, new.lng);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS signalement_rtree_au AFTER UPDATE OF lat, lng ON signalement BEGIN
+        DELETE FROM signalement_rtree WHERE id = old.id;
+        INSERT INTO signalement_rtree
+        SELECT new.id, new.lat, new.lat, new.lng, new.lng
+        WHERE new.lat IS NOT NULL AND new.lng IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS signalement_rtree_ad AFTER DELETE ON signalement BEGIN
+        DELETE FROM signalement_rtree WHERE id = old.id;
+    END
+    """,
+]
+
+
+def init_spatial_index(db):
+    """
+    Active l'index spatial le plus performant disponible.
+    :return: 'postgis', 'rtree' ou 'geohash'.
+    """
+    global _spatial_backend
+    dialect = db.engine.dialect.name
+    _spatial_backend = 'geohash'
+    try:
+        with db.engine.begin() as connection:
+            if dialect == 'postgresql':
+                for statement in _POSTGIS_SETUP:
+                    connection.execute(text(statement))
+                _spatial_backend = 'postgis'
+            elif dialect == 'sqlite':
+                existed = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'signalement_rtree'"
+                )).first()
+                for statement in _RTREE_SETUP:
+                    connection.execute(text(statement))
+                if not existed:
+                    connection.execute(text(
+                        "INSERT INTO signalement_rtree "
+                        "SELECT id, lat, lat, lng, lng FROM signalement WHERE lat IS NOT NULL AND lng IS NOT NULL"
+                    ))
+                _spatial_backend = 'rtree'
+    except Exception as e:
+        print(f"⚠️  Index spatial natif indisponible, repli sur le geohash : {e}")
+        _spatial_backend = 'geohash'
+    return _spatial_backend
+
+
+def filter_bbox(query, model, south, west, north, east):
+    """Restreint une requête de signalements à un rectangle via l'index spatial."""
+    if _spatial_backend == 'rtree':
+        query = query.filter(model.id.in_(
+            text(
+                "SELECT id FROM signalement_rtree "
+                "WHERE max_lat >= :south AND min_lat <= :north AND max_lng >= :west AND min_lng <= :east"
+            ).bindparams(south=south, north=north, west=west, east=east).columns(id=model.id.type)
+        ))
+    elif _spatial_backend == 'postgis':
+        query = query.filter(text(
+            f"{_POINT_SQL} && ST_MakeEnvelope(:west, :south, :east, :north, 4326)::geography"
+        ).bindparams(south=south, north=north, west=west, east=east))
+    else:
+        # Préfixes geohash exprimés en intervalles pour profiter de l'index B-tree
+        query = query.filter(or_(*[
+            and_(model.geohash >= cell, model.geohash < cell + '~')
+            for cell in geohash_cover(south, west, north, east)
+        ]))
+    # Filtre exact (les cellules et les R*Tree en float32 débordent du rectangle)
+    return query.filter(model.lat.between(south, north), model.lng.between(west, east))
+
+
+def detect_spatial_index(engine):
+    """
+    Retrouve, sans rien créer, l'index spatial mis en place par
+    init_spatial_index (`flask init-db`) : appelé une fois par worker.
+    """
+    global _spatial_backend
+    with engine.connect() as connection:
+        if engine.dialect.name == 'postgresql':
+            found = connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first()
+            _spatial_backend = 'postgis' if found else 'geohash'
+        elif engine.dialect.name == 'sqlite':
+            found = connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'signalement_rtree'"
+            )).first()
+            _spatial_backend = 'rtree' if found else 'geohash'
+        else:
+            _spatial_backend = 'geohash'
+    return _spatial_backend
+
+
+def filter_radius(query, model, lat, lng, radius_km):
+    """
+    Restreint une requête aux signalements à moins de `radius_km` (pré-filtre :
+    la distance exacte reste à affiner avec haversine_km).
+    """
+    if _spatial_backend == 'postgis':
+        return query.filter(text(
+            f"ST_DWithin({_POINT_SQL}, geography(ST_SetSRID(ST_MakePoint(:center_lng, :center_lat), 4326)), :radius_m)"
+        ).bindparams(center_lng=lng, center_lat=lat, radius_m=radius_km * 1000.0))
+    return filter_bbox(query, model, *bbox_for_radius(lat, lng, radius_km))
+
+
+def distance_km(model, lat, lng):
+    """
+    Expression SQL de la distance (km) au point : opérateur KNN `<->` de
+    PostGIS (sphère), formule de haversine ailleurs (fonctions mathématiques
+    de SQLite 3.35+ ou de PostgreSQL).
+    :return: (distance, clé de tri) ; sous PostGIS la clé est l'expression `<->` nue, servie par l'index GiST.
+    """
+    if _spatial_backend == 'postgis':
+        knn = literal_column(
+            f"{_POINT_SQL} <-> geography(ST_SetSRID(ST_MakePoint({float(lng)!r}, {float(lat)!r}), 4326))"
+        )
+        return knn / 1000.0, knn
+    half_dlat = func.radians(model.lat - lat) / 2
+    half_dlng = func.radians(model.lng - lng) / 2
+    a = func.power(func.sin(half_dlat), 2) + \
+        math.cos(math.radians(lat)) * func.cos(func.radians(model.lat)) * func.power(func.sin(half_dlng), 2)
+    distance = 2 * 6371.0 * func.asin(func.sqrt(a))
+    return distance, distance
+
+
+def nearest(query, model, lat, lng, radius_km, after=None, limit=20):
+    """
+    Page des signalements à moins de `radius_km`, triés par (distance, id)
+    en SQL, strictement après la clé `after` = (distance, id) : chaque page
+    ne lit que `limit` lignes, quelle que soit la taille du disque. Les lignes
+    portent une colonne `distance_km`.
+    """
+    distance, order_key = distance_km(model, lat, lng)
+    query = filter_radius(query, model, lat, lng, radius_km)\
+        .add_columns(distance.label('distance_km'))\
+        .filter(distance <= radius_km)
+    if after is not None:
+        query = query.filter(or_(distance > after[0], and_(distance == after[0], model.id > after[1])))
+    return query.order_by(order_key, model.id).limit(limit)
@@ -0,0 +1,151 @@
+"""
+Test de charge multi-processus de la base SQLite : des processus écrivent
+des commentaires pendant que d'autres lisent la liste des signalements.
+Compare le mode SQLite par défaut (SQLITE_TUNING=0 : journal classique,
+sans file d'écriture) au mode réglé (WAL, pragmas, file d'écriture), chacun
+sur une base neuve dans un dossier temporaire.
+
+    python sqlite_load_test.py
+    python sqlite_load_test.py --writers 6 --readers 4 --duration 15
+    python sqlite_load_test.py --modes tuned --max-error-rate 0
+
+Code de sortie 1 si le taux d'erreurs d'écriture du mode réglé dépasse
+--max-error-rate.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {'default': '0', 'tuned': '1'}
+
+# Exécuté dans un interpréteur neuf ; DATABASE_URL et SQLITE_TUNING viennent du parent
+CHILD_SCRIPT = r'''
+import json, sys, time
+from datetime import date
+from sqlalchemy.exc import OperationalError
+import app as module
+
+role, start_at, duration = sys.argv[1], float(sys.argv[2]), float(sys.argv[3])
+application = module.create_app('production')
+application.config['SQL_QUERY_BUDGET'] = None
+module.response_cache.max_bytes = module.fragment_cache.max_bytes = 0
+db = module.db
+
+if role == 'seed':
+    with application.app_context():
+        module.init_db('load-test-password')
+        user = module.User.query.first()
+        for i in range(50):
+            db.session.add(module.Signalement(type=('lost', 'found')[i % 2], title=f"Objet {i}",
+                                              description="Signalement de test", location="Cotonou",
+                                              date=date(2024, 1 + i % 12, 1 + i % 28), status='active',
+                                              user_id=user.id))
+        db.session.commit()
+    print(json.dumps({'role': role}))
+    sys.exit(0)
+
+with application.app_context():
+    user_id = module.User.query.first().id
+    signalement_ids = [s.id for s in module.Signalement.query.all()]
+client = application.test_client()
+ok, errors, latencies = 0, 0, []
+time.sleep(max(0.0, start_at - time.time()))
+deadline = start_at + duration
+i = 0
+while time.time() < deadline:
+    i += 1
+    started = time.perf_counter()
+    if role == 'writer':
+        with application.app_context():
+            try:
+                db.session.add(module.Comment(content=f"Commentaire {i}", user_id=user_id,
+                                              signalement_id=signalement_ids[i % len(signalement_ids)]))
+                db.session.commit()
+                ok += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    else:
+        response = client.get(f'/signalements?page={1 + i % 4}')
+        if response.status_code == 200:
+            ok += 1
+        else:
+            errors += 1
+    latencies.append((time.perf_counter() - started) * 1000)
+print(json.dumps({'role': role, 'ok': ok, 'errors': errors, 'latencies': latencies}))
+'''
+
+
+def spawn(role, env, start_at, duration):
+    return subprocess.Popen([sys.executable, '-c', CHILD_SCRIPT, role, str(start_at), str(duration)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def collect(process):
+    stdout, stderr = process.communicate()
+    if process.returncode:
+        raise SystemExit(f"processus en échec\n{stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def run_mode(mode, writers, readers, duration):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'load.db')}",
+                   SQLITE_TUNING=MODES[mode], USER_CACHE_DIR='')
+        collect(spawn('seed', env, 0, 0))
+        # Départ commun, une fois tous les interpréteurs démarrés
+        start_at = time.time() + 3
+        processes = ([spawn('writer', env, start_at, duration) for _ in range(writers)]
+                     + [spawn('reader', env, start_at, duration) for _ in range(readers)])
+        results = [collect(process) for process in processes]
+
+    written = [r for r in results if r['role'] == 'writer']
+    read = [r for r in results if r['role'] == 'reader']
+    attempts = sum(r['ok'] + r['errors'] for r in written)
+    write_latencies = [ms for r in written for ms in r['latencies']]
+    read_latencies = [ms for r in read for ms in r['latencies']]
+    return {
+        'writes': sum(r['ok'] for r in written),
+        'write_errors': sum(r['errors'] for r in written),
+        'write_error_rate': round(sum(r['errors'] for r in written) / attempts, 4) if attempts else None,
+        'write_p95_ms': round(percentile(write_latencies, 0.95), 1) if write_latencies else None,
+        'reads': sum(r['ok'] for r in read),
+        'read_median_ms': round(statistics.median(read_latencies), 1) if read_latencies else None,
+        'read_p95_ms': round(percentile(read_latencies, 0.95), 1) if read_latencies else None,
+        'read_max_ms': round(max(read_latencies), 1) if read_latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--writers', type=int, default=4, help='processus écrivains')
+    parser.add_argument('--readers', type=int, default=4, help='processus lecteurs')
+    parser.add_argument('--duration', type=float, default=10.0, help='durée de la charge (secondes)')
+    parser.add_argument('--max-error-rate', type=float, help="taux d'erreurs d'écriture toléré en mode réglé")
+    args = parser.parse_args()
+
+    results = {mode: run_mode(mode, args.writers, args.readers, args.duration) for mode in args.modes}
+    print(json.dumps(results, indent=2))
+
+    tuned_rate = results.get('tuned', {}).get('write_error_rate')
+    if args.max_error_rate is not None and tuned_rate is not None and tuned_rate > args.max_error_rate:
+        print(f"RÉGRESSION : taux d'erreurs d'écriture {tuned_rate} > {args.max_error_rate}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+
+# Mode SQLite pour un déploiement sur un seul serveur (sans DATABASE_URL) :
+# journal WAL (les lectures ne bloquent plus sur les écritures), pragmas
+# réglés à chaque connexion, écritures sérialisées entre workers par un
+# verrou de fichier, et maintenance périodique (checkpoint, ANALYZE, VACUUM).
+
+SQLITE_ANALYSIS_LIMIT = 1000  # lignes examinées par index lors d'ANALYZE
+VACUUM_FREE_RATIO = 0.2  # VACUUM quand au moins 20 % des pages sont libres
+
+
+def sqlite_path(engine):
+    """Chemin du fichier de la base, ou None (autre SGBD, base en mémoire)."""
+    database = engine.url.database
+    if engine.dialect.name != 'sqlite' or not database or database == ':memory:':
+        return None
+    return database
+
+
+def set_sqlite_pragmas(engine, config):
+    """Applique les pragmas SQLITE_* de la configuration à chaque nouvelle connexion."""
+    pragmas = ["journal_mode = WAL",
+               f"busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+               f"synchronous = {config['SQLITE_SYNCHRONOUS']}",
+               f"mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+               "temp_store = MEMORY"]
+
+    @event.listens_for(engine, 'connect')
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+
+class SqliteWriterLock:
+    """
+    File d'attente des écrivains : SQLite n'accepte qu'une transaction
+    d'écriture à la fois, et un écrivain qui perd la course reçoit « database
+    is locked » au lieu d'attendre quand sa transaction avait déjà lu. Le
+    verrou (thread, puis flock sur un fichier voisin de la base pour les
+    autres workers) est pris avant la première écriture et rendu à la fin de
+    la transaction ; les lectures ne le prennent jamais. Réentrant par thread.
+    """
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.Lock()
+        self._local = threading.local()
+        self._fd = None
+        self._pid = None
+        self.stats = {'acquired': 0, 'wait_seconds': 0.0, 'timeouts': 0}
+
+    def _file(self):
+        # Descripteur propre à chaque processus : après un fork, flock serait partagé
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def acquire(self):
+        """:return: False si le verrou n'a pas été obtenu dans le délai (l'écriture tente sa chance)."""
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            self._local.depth = depth + 1
+            return True
+        started = time.monotonic()
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            self.stats['timeouts'] += 1
+            return False
+        if fcntl is not None:
+            fd = self._file()
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() - started >= self.timeout:
+                        self._thread_lock.release()
+                        self.stats['timeouts'] += 1
+                        return False
+                    time.sleep(0.002)  # attente coopérative, y compris sous gevent
+        self._local.depth = 1
+        self.stats['acquired'] += 1
+        self.stats['wait_seconds'] += time.monotonic() - started
+        return True
+
+    def release(self):
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            return
+        self._local.depth = depth - 1
+        if depth == 1:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._thread_lock.release()
+
+
+def sqlite_maintenance(engine, writer_lock=None, vacuum=None):
+    """
+    Checkpoint du journal WAL (remis à zéro), ANALYZE borné, puis VACUUM si
+    la base a trop de pages libres (`vacuum` True/False pour forcer). Le
+    verrou d'écriture est tenu pendant VACUUM : les écritures attendent au
+    lieu d'échouer, les lectures continuent.
+    :return: Le rapport des opérations effectuées.
+    """
+    report = {}
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        busy, wal_pages, checkpointed = connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+        report['checkpoint'] = {'busy': bool(busy), 'wal_pages': wal_pages, 'checkpointed': checkpointed}
+
+        started = time.perf_counter()
+        connection.exec_driver_sql(f"PRAGMA analysis_limit = {SQLITE_ANALYSIS_LIMIT}")
+        connection.exec_driver_sql("ANALYZE")
+        report['analyze_seconds'] = round(time.perf_counter() - started, 3)
+
+        page_count = connection.exec_driver_sql("PRAGMA page_count").scalar()
+        free_pages = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        report['free_ratio'] = round(free_pages / page_count, 3) if page_count else 0.0
+        if vacuum is None:
+            vacuum = report['free_ratio'] >= VACUUM_FREE_RATIO
+        if vacuum:
+            started = time.perf_counter()
+            locked = writer_lock.acquire() if writer_lock else False
+            try:
+                connection.exec_driver_sql("VACUUM")
+                connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                if locked:
+                    writer_lock.release()
+            report['vacuum_seconds'] = round(time.perf_counter() - started, 3)
+    return report
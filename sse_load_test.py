@@ -0,0 +1,276 @@
+"""
+Test de charge du flux SSE des notifications : des milliers de connexions
+inactives ouvertes sur chaque worker gunicorn (gevent), puis quelques vagues
+de notifications. Vérifie que chaque connexion reçoit chaque notification de
+son utilisateur, mesure le délai de livraison et la mémoire des workers.
+Base SQLite neuve dans un dossier temporaire.
+
+    python sse_load_test.py
+    python sse_load_test.py --connections 5000 --workers 2 --users 200
+    python sse_load_test.py --rounds 5 --max-latency 4
+
+Code de sortie 1 si une connexion échoue, si une notification n'est pas
+livrée ou si le p95 du délai de livraison dépasse --max-latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Exécuté dans un interpréteur neuf ; DATABASE_URL et SECRET_KEY viennent du parent
+CHILD_SCRIPT = r'''
+import json, sys, time
+import app as module
+
+role, users, rounds, interval = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4])
+application = module.create_app('production')
+db = module.db
+
+with application.app_context():
+    if role == 'seed':
+        module.init_db('load-test-password')
+        serializer = application.session_interface.get_signing_serializer(application)
+        cookies = {}
+        for i in range(users):
+            user = module.User(username=f"sse{i}", email=f"sse{i}@example.bj", password_hash='!')
+            db.session.add(user)
+            db.session.flush()
+            cookies[user.id] = serializer.dumps({'_user_id': str(user.id), '_fresh': True})
+        db.session.commit()
+        print(json.dumps({'cookies': cookies}))
+        sys.exit(0)
+
+    user_ids = [user_id for (user_id,) in db.session.execute(db.select(module.User.id)
+                                                             .where(module.User.username.like('sse%')))]
+    for round_number in range(rounds):
+        time.sleep(interval)
+        for user_id in user_ids:
+            db.session.add(module.Notification(name=f"charge {round_number} {time.time()}", user_id=user_id))
+        db.session.commit()
+print(json.dumps({'role': role, 'notified_users': len(user_ids)}))
+'''
+
+
+def run_child(env, role, users=0, rounds=0, interval=0.0):
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, role, str(users), str(rounds), str(interval)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"{role} : échec\n{result.stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def raise_fd_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == master_pid:
+                        pids.append(int(entry))
+            except (OSError, ValueError, IndexError):
+                pass
+    return pids
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+class Client:
+    """Une connexion SSE : attend l'événement initial puis note le délai de chaque notification."""
+
+    def __init__(self, user_id, cookie):
+        self.user_id = user_id
+        self.cookie = cookie
+        self.connected = False
+        self.error = None
+        self.latencies = []
+
+    async def run(self, port, stop):
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError as e:
+            self.error = f"connexion : {e}"
+            return
+        try:
+            writer.write((f"GET /notifications/stream HTTP/1.1\r\nHost: localhost\r\n"
+                          f"Cookie: session={self.cookie}\r\nAccept: text/event-stream\r\n\r\n").encode())
+            await writer.drain()
+            status = await reader.readline()
+            if b' 200 ' not in status:
+                self.error = f"statut : {status.decode(errors='replace').strip()}"
+                return
+            event = None
+            while not stop.is_set():
+                line = (await reader.readline()).decode()
+                if not line:
+                    self.error = 'connexion fermée par le serveur'
+                    return
+                if line.startswith('event: '):
+                    event = line[7:].strip()
+                elif line.startswith('data: ') and event == 'unread':
+                    self.connected = True
+                elif line.startswith('data: ') and event == 'notification':
+                    sent_at = float(json.loads(line[6:])['name'].rsplit(' ', 1)[1])
+                    self.latencies.append(time.time() - sent_at)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self.error = f"lecture : {e}"
+        finally:
+            writer.close()
+
+
+async def run_clients(clients, port, settle, notify):
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(client.run(port, stop)) for client in clients]
+    started = time.monotonic()
+    # Ouverture de toutes les connexions avant les notifications
+    while time.monotonic() - started < settle and sum(c.connected for c in clients) < len(clients):
+        await asyncio.sleep(0.5)
+    connected_after = round(time.monotonic() - started, 1)
+    result = await asyncio.get_running_loop().run_in_executor(None, notify)
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return connected_after, result
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', type=int, default=2000, help='connexions SSE ouvertes au total')
+    parser.add_argument('--workers', type=int, default=1, help='workers gunicorn (gevent)')
+    parser.add_argument('--users', type=int, default=100, help='utilisateurs entre lesquels répartir les connexions')
+    parser.add_argument('--rounds', type=int, default=3, help='vagues de notifications (une par utilisateur)')
+    parser.add_argument('--interval', type=float, default=3.0, help='secondes entre deux vagues')
+    parser.add_argument('--settle', type=float, default=60.0, help="délai maximal d'ouverture des connexions")
+    parser.add_argument('--max-latency', type=float, default=5.0, help='p95 toléré du délai de livraison (secondes)')
+    args = parser.parse_args()
+
+    fd_limit = raise_fd_limit(args.connections + 256)
+    if fd_limit < args.connections + 64:
+        raise SystemExit(f"limite de descripteurs trop basse ({fd_limit}) pour {args.connections} connexions")
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'sse.db')}",
+                   SECRET_KEY='sse-load-test', USER_CACHE_DIR='', SQL_QUERY_BUDGET='')
+        cookies = run_child(env, 'seed', users=args.users)['cookies']
+        user_ids = sorted(cookies, key=int)
+        clients = [Client(user_id, cookies[user_id]) for user_id in
+                   (user_ids[i % len(user_ids)] for i in range(args.connections))]
+
+        port = free_port()
+        per_worker = args.connections // args.workers + 100
+        log_path = os.path.join(directory, 'gunicorn.log')
+        with open(log_path, 'w') as log:
+            server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--worker-class', 'gevent',
+                                       '--workers', str(args.workers), '--worker-connections', str(per_worker),
+                                       '--bind', f'127.0.0.1:{port}', '--timeout', '120', '--graceful-timeout', '5',
+                                       'app:create_app()'],
+                                      cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                                      stdout=log, stderr=subprocess.STDOUT)
+        try:
+            if not wait_for_port(port):
+                with open(log_path) as log:
+                    raise SystemExit(f"gunicorn n'a pas démarré\n{log.read()}")
+            rss_before = {pid: rss_mb(pid) for pid in worker_pids(server.pid)}
+            rss_peak = {}
+
+            def notify():
+                result = run_child(env, 'notify', rounds=args.rounds, interval=args.interval)
+                time.sleep(args.max_latency)  # dernière vague : laisser le temps de livrer
+                rss_peak.update({pid: rss_mb(pid) for pid in worker_pids(server.pid)})
+                return result
+
+            connected_after, notified = asyncio.run(run_clients(clients, port, args.settle, notify))
+            with open(log_path) as log:
+                server_log = log.read().strip().splitlines()
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+    expected = args.rounds * args.connections
+    latencies = [latency for client in clients for latency in client.latencies]
+    errors = {}
+    for client in clients:
+        if client.error:
+            errors[client.error] = errors.get(client.error, 0) + 1
+    report = {
+        'connections': args.connections,
+        'workers': args.workers,
+        'connected': sum(c.connected for c in clients),
+        'connected_after_s': connected_after,
+        'errors': errors,
+        'notifications_expected': expected,
+        'notifications_delivered': len(latencies),
+        'notified_users': notified['notified_users'],
+        'latency_median_s': round(statistics.median(latencies), 3) if latencies else None,
+        'latency_p95_s': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'latency_max_s': round(max(latencies), 3) if latencies else None,
+        'worker_rss_mb_idle': rss_before,
+        'worker_rss_mb_loaded': rss_peak,
+    }
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if report['connected'] < args.connections or errors:
+        failures.append(f"{args.connections - report['connected']} connexion(s) non établie(s)")
+    if len(latencies) < expected:
+        failures.append(f"{expected - len(latencies)} notification(s) non livrée(s)")
+    if latencies and report['latency_p95_s'] > args.max_latency:
+        failures.append(f"p95 {report['latency_p95_s']} s > {args.max_latency} s")
+    if failures:
+        print('\n'.join(server_log[-30:]))
+    for failure in failures:
+        print(f"ÉCHEC : {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
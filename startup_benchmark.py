@@ -0,0 +1,113 @@
+"""
+Mesure du coût de démarrage d'un worker : temps d'import de app.py, temps
+jusqu'à la première réponse et mémoire résidente (RSS) après cette réponse.
+Chaque essai tourne dans un interpréteur neuf, comme un worker gunicorn.
+
+    python startup_benchmark.py                       # affiche les médianes
+    python startup_benchmark.py --save-baseline       # enregistre la référence
+    python startup_benchmark.py --baseline startup_baseline.json --tolerance 0.25
+    python startup_benchmark.py --max-import-ms 800 --max-rss-mb 150
+
+Code de sortie 1 si une mesure dépasse un seuil absolu ou la référence
+augmentée de la tolérance.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASELINE_FILE = 'startup_baseline.json'
+METRICS = ('import_ms', 'first_request_ms', 'rss_mb')
+
+# Exécuté dans un interpréteur neuf ; les durées partent d'avant l'import de app.py
+CHILD_SCRIPT = r'''
+import json, resource, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+application = module.create_app(sys.argv[1])
+response = application.test_client().get(sys.argv[2])
+answered = time.perf_counter()
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+if sys.platform == 'darwin':
+    rss_mb /= 1024  # ru_maxrss en octets sous macOS
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (answered - started) * 1000,
+    'rss_mb': rss_mb,
+    'modules': sorted(name for name in ('weasyprint', 'PIL', 'qrcode', 'cloudinary', 'requests')
+                      if name in sys.modules),
+}))
+'''
+
+
+def run_once(config_name, path):
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, config_name, path],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(runs, config_name, path):
+    samples = [run_once(config_name, path) for _ in range(runs)]
+    summary = {metric: round(statistics.median(s[metric] for s in samples), 1) for metric in METRICS}
+    summary['status'] = samples[-1]['status']
+    summary['heavy_modules'] = samples[-1]['modules']
+    return summary
+
+
+def check(summary, limits, baseline, tolerance):
+    """Liste des dépassements (seuils absolus puis référence + tolérance)."""
+    failures = []
+    for metric, limit in limits.items():
+        if limit is not None and summary[metric] > limit:
+            failures.append(f"{metric} = {summary[metric]} > seuil {limit}")
+    if baseline:
+        for metric in METRICS:
+            if metric in baseline and summary[metric] > baseline[metric] * (1 + tolerance):
+                failures.append(f"{metric} = {summary[metric]} > référence {baseline[metric]} "
+                                f"+ {tolerance:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='essais (médiane), 5 par défaut')
+    parser.add_argument('--config', default='testing', help="classe de config.py, 'testing' par défaut")
+    parser.add_argument('--path', default='/mentions-legales', help='URL de la première requête')
+    parser.add_argument('--baseline', help='fichier de référence JSON à comparer')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='marge sur la référence (0.25 = +25 %%)')
+    parser.add_argument('--save-baseline', action='store_true', help=f'écrit les mesures dans {BASELINE_FILE}')
+    parser.add_argument('--max-import-ms', type=float)
+    parser.add_argument('--max-first-request-ms', type=float)
+    parser.add_argument('--max-rss-mb', type=float)
+    args = parser.parse_args()
+
+    summary = measure(args.runs, args.config, args.path)
+    print(json.dumps(summary, indent=2))
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({metric: summary[metric] for metric in METRICS}, f, indent=2)
+        print(f"Référence enregistrée dans {BASELINE_FILE}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    limits = {'import_ms': args.max_import_ms, 'first_request_ms': args.max_first_request_ms,
+              'rss_mb': args.max_rss_mb}
+    failures = check(summary, limits, baseline, args.tolerance)
+    if summary['heavy_modules']:
+        failures.append(f"modules lourds chargés au démarrage : {', '.join(summary['heavy_modules'])}")
+    for failure in failures:
+        print(f"RÉGRESSION : {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
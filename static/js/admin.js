@@ -0,0 +1,128 @@
+// Console d'administration : tableaux paginés par curseur et actions groupées
+document.addEventListener('DOMContentLoaded', function () {
+    const container = document.getElementById('adminTabContent');
+    if (!container) return;
+    const csrfToken = container.dataset.csrfToken;
+
+    const statusBadge = (active) => active
+        ? '<span class="badge bg-success">Actif</span>'
+        : '<span class="badge bg-danger">Inactif</span>';
+
+    function cell(text) {
+        const td = document.createElement('td');
+        td.textContent = text == null ? '' : text;
+        return td;
+    }
+
+    function linkCell(text, href) {
+        const td = document.createElement('td');
+        const link = document.createElement('a');
+        link.href = href;
+        link.textContent = text;
+        td.appendChild(link);
+        return td;
+    }
+
+    const formatDate = (value) => value ? new Date(value + 'Z').toLocaleDateString('fr-FR') : '';
+
+    // Colonnes de chaque tableau, après la case à cocher
+    const renderers = {
+        users: (item) => {
+            const status = document.createElement('td');
+            status.innerHTML = statusBadge(item.is_active);
+            return [cell(item.id), cell(item.username), cell(item.email), cell(formatDate(item.created_at)), status];
+        },
+        signalements: (item) => [
+            cell(item.id), linkCell(item.title, item.url), cell(item.type), cell(item.author),
+            cell(formatDate(item.created_at)), cell(item.status)
+        ],
+        comments: (item) => [
+            cell(item.id), cell(item.content), cell(item.author),
+            linkCell(item.signalement_title, item.url), cell(formatDate(item.timestamp))
+        ],
+    };
+
+    document.querySelectorAll('.admin-table').forEach(function (pane) {
+        const dataset = pane.id;
+        const form = pane.querySelector('.admin-filters');
+        const tbody = pane.querySelector('tbody');
+        const selectAll = pane.querySelector('.select-all');
+        const prevButton = pane.querySelector('[data-page="prev"]');
+        const nextButton = pane.querySelector('[data-page="next"]');
+        let page = {next_cursor: null, prev_cursor: null};
+        let currentCursor = null;
+        let loaded = false;
+
+        async function load(cursor) {
+            const params = new URLSearchParams();
+            new FormData(form).forEach((value, key) => { if (value) params.append(key, value); });
+            if (cursor) params.append('cursor', cursor);
+            const response = await fetch(pane.dataset.url + '?' + params.toString(), {credentials: 'include'});
+            const result = await response.json();
+            if (!response.ok) {
+                alert(result.error || 'Erreur de chargement');
+                return;
+            }
+            currentCursor = cursor;
+            page = result;
+            selectAll.checked = false;
+            tbody.textContent = '';
+            if (!result.items.length) {
+                const row = document.createElement('tr');
+                const empty = cell('Aucun résultat');
+                empty.colSpan = 7;
+                row.appendChild(empty);
+                tbody.appendChild(row);
+            }
+            result.items.forEach(function (item) {
+                const row = document.createElement('tr');
+                const check = document.createElement('td');
+                check.innerHTML = `<input type="checkbox" class="row-select" value="${Number(item.id)}">`;
+                row.appendChild(check);
+                renderers[dataset](item).forEach(td => row.appendChild(td));
+                tbody.appendChild(row);
+            });
+            prevButton.disabled = !result.prev_cursor;
+            nextButton.disabled = !result.next_cursor;
+            loaded = true;
+        }
+
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+            load(null);
+        });
+        prevButton.addEventListener('click', () => load(page.prev_cursor));
+        nextButton.addEventListener('click', () => load(page.next_cursor));
+        selectAll.addEventListener('change', function () {
+            tbody.querySelectorAll('.row-select').forEach(box => { box.checked = selectAll.checked; });
+        });
+
+        pane.querySelectorAll('[data-action]').forEach(function (button) {
+            button.addEventListener('click', async function () {
+                const ids = Array.from(tbody.querySelectorAll('.row-select:checked')).map(box => Number(box.value));
+                if (!ids.length) return;
+                if (!confirm(`${button.textContent.trim()} : ${ids.length} élément(s) ?`)) return;
+                const response = await fetch(pane.dataset.bulkUrl, {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken},
+                    credentials: 'include',
+                    body: JSON.stringify({action: button.dataset.action, ids: ids})
+                });
+                const result = await response.json();
+                if (!response.ok) {
+                    alert(result.error || "L'action a échoué");
+                    return;
+                }
+                load(currentCursor);
+            });
+        });
+
+        // Chargement à la première ouverture de l'onglet
+        const tab = document.querySelector(`[data-bs-target="#${dataset}"]`);
+        if (pane.classList.contains('active')) {
+            load(null);
+        } else if (tab) {
+            tab.addEventListener('shown.bs.tab', () => { if (!loaded) load(null); });
+        }
+    });
+});
@@ -114,44 +114,45 @@ class SignalAlertApp {
     }
     
     setupNotifications() {
-        // Charger les notifications si l'utilisateur est connecté
-        if (document.body.dataset.userId) {
-            this.loadNotifications();
-        }
-    }
-    
-    async loadNotifications() {
-        try {
-            const response = await fetch('/api/notifications', {
-                credentials: 'include'
+        // Flux SSE : le serveur pousse le compteur et les nouvelles notifications
+        if (document.body.dataset.userId && window.EventSource) {
+            const source = new EventSource('/notifications/stream');
+
+            source.addEventListener('unread', (event) => {
+                this.updateNotificationBadges(JSON.parse(event.data).count);
+            });
+
+            source.addEventListener('notification', (event) => {
+                const notification = JSON.parse(event.data);
+                const text = document.createElement('span');
+                text.textContent = notification.name;
+                this.showAlert(text.innerHTML, 'info');
             });
-            
-            if (response.ok) {
-                const notifications = await response.json();
-                this.displayNotifications(notifications);
-            }
-        } catch (error) {
-            console.error('Erreur chargement notifications:', error);
         }
     }
     
-    displayNotifications(notifications) {
-        // Implémenter l'affichage des notifications
-        const unreadCount = notifications.filter(n => !n.is_read).length;
+    updateNotificationBadges(unreadCount) {
+        const targets = [
+            ['.nav-icon-btn', 'notification-badge'],
+            ['.dropdown-item[href$="/notifications"]', 'badge-pill']
+        ];
         
-        if (unreadCount > 0) {
-            // Ajouter un badge au menu
-            const userBtn = document.querySelector('.user-btn');
-            if (userBtn) {
-                let badge = userBtn.querySelector('.notification-badge');
+        targets.forEach(([selector, className]) => {
+            const container = document.querySelector(selector);
+            if (!container) return;
+            
+            let badge = container.querySelector('.' + className);
+            if (unreadCount > 0) {
                 if (!badge) {
                     badge = document.createElement('span');
-                    badge.className = 'notification-badge';
-                    userBtn.appendChild(badge);
+                    badge.className = className;
+                    container.appendChild(badge);
                 }
                 badge.textContent = unreadCount;
+            } else if (badge) {
+                badge.remove();
             }
-        }
+        });
     }
     
     setupMobileMenu() {
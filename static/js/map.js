@@ -43,42 +43,73 @@ document.addEventListener('DOMContentLoaded', function () {
         })
     };
 
-    // Récupérer les données des signalements depuis l'API
-    fetch('/api/signalements/locations')
-        .then(response => response.json())
-        .then(data => {
-            if (data.length === 0) {
-                console.log("Aucun signalement avec des coordonnées à afficher.");
-                return;
-            }
+    // Couche redessinée à chaque déplacement : agrégats calculés côté serveur,
+    // puis signalements individuels une fois suffisamment zoomé.
+    const layer = L.layerGroup().addTo(map);
+    let pendingRequest = null;
 
-            const markers = L.markerClusterGroup();
+    function clusterIcon(count) {
+        let size = 'small';
+        if (count >= 100) {
+            size = 'large';
+        } else if (count >= 10) {
+            size = 'medium';
+        }
+        return L.divIcon({
+            html: `<div><span>${count}</span></div>`,
+            className: `marker-cluster marker-cluster-${size}`,
+            iconSize: L.point(40, 40)
+        });
+    }
+
+    function loadViewport() {
+        if (pendingRequest) {
+            pendingRequest.abort();
+        }
+        pendingRequest = new AbortController();
+
+        const params = new URLSearchParams({
+            bbox: map.getBounds().toBBoxString(),
+            zoom: map.getZoom()
+        });
 
-            data.forEach(signalement => {
-                const icon = icons[signalement.type] || icons.default;
-                const marker = L.marker([signalement.lat, signalement.lng], { icon: icon });
+        fetch(`/api/signalements/clusters?${params}`, { signal: pendingRequest.signal })
+            .then(response => response.json())
+            .then(data => {
+                layer.clearLayers();
 
-                marker.bindPopup(`
-                    <strong>${signalement.title}</strong>
-                    <br>
-                    <span class="badge badge-${signalement.type}">${signalement.type}</span>
-                    <br><br>
-                    <a href="/signalement/${signalement.id}" class="btn btn-primary btn-sm">Voir les détails</a>
-                `);
+                data.clusters.forEach(cluster => {
+                    const marker = L.marker([cluster.lat, cluster.lng], { icon: clusterIcon(cluster.count) });
+                    // Zoomer sur l'agrégat au clic
+                    marker.on('click', () => map.setView([cluster.lat, cluster.lng], map.getZoom() + 2));
+                    layer.addLayer(marker);
+                });
 
-                markers.addLayer(marker);
+                data.points.forEach(signalement => {
+                    const icon = icons[signalement.type] || icons.default;
+                    const marker = L.marker([signalement.lat, signalement.lng], { icon: icon });
+
+                    marker.bindPopup(`
+                        <strong>${signalement.title}</strong>
+                        <br>
+                        <span class="badge badge-${signalement.type}">${signalement.type}</span>
+                        <br><br>
+                        <a href="/signalement/${signalement.id}" class="btn btn-primary btn-sm">Voir les détails</a>
+                    `);
+
+                    layer.addLayer(marker);
+                });
+            })
+            .catch(error => {
+                if (error.name === 'AbortError') {
+                    return;
+                }
+                console.error('Erreur lors de la récupération des signalements de la carte:', error);
+                const mapContainer = document.getElementById('map');
+                mapContainer.innerHTML = '<p style="text-align:center; color:red;">Impossible de charger les données de la carte.</p>';
             });
+    }
 
-            map.addLayer(markers);
-            
-            // Centrer la carte sur les marqueurs
-            if (markers.getBounds().isValid()) {
-                map.fitBounds(markers.getBounds().pad(0.1));
-            }
-        })
-        .catch(error => {
-            console.error('Erreur lors de la récupération des localisations:', error);
-            const mapContainer = document.getElementById('map');
-            mapContainer.innerHTML = '<p style="text-align:center; color:red;">Impossible de charger les données de la carte.</p>';
-        });
+    map.on('moveend', loadViewport);
+    loadViewport();
 });
@@ -0,0 +1,69 @@
+import threading
+import time
+
+
+# Compteurs matérialisés (table stat_counter) :
+#   'signalements'      nombre total de signalements
+#   'status:<statut>'   signalements par statut
+#   'active:<type>'     signalements actifs par type
+#   'users'             nombre total d'utilisateurs
+
+STATS_CACHE_TTL = 30  # secondes
+
+
+def signalement_counter_keys(status, type_):
+    """Compteurs auxquels contribue un signalement dans cet état."""
+    keys = ['signalements', f'status:{status}']
+    if status == 'active':
+        keys.append(f'active:{type_}')
+    return keys
+
+
+def counters_from_groups(rows, total_users):
+    """Construit les compteurs à partir des lignes (type, status, count) d'un GROUP BY."""
+    counters = {'signalements': 0, 'users': total_users}
+    for type_, status, count in rows:
+        for key in signalement_counter_keys(status, type_):
+            counters[key] = counters.get(key, 0) + count
+    return counters
+
+
+def stats_from_counters(counters):
+    """Statistiques affichées sur l'accueil et renvoyées par /api/stats."""
+    return {
+        'total_signalements': counters.get('signalements', 0),
+        'active_signalements': counters.get('status:active', 0),
+        'found_items': counters.get('status:found', 0),
+        'total_users': counters.get('users', 0),
+        'by_type': {
+            'lost': counters.get('active:lost', 0),
+            'missing': counters.get('active:missing', 0),
+            'stolen': counters.get('active:stolen', 0),
+            'found': counters.get('active:found', 0),
+        },
+    }
+
+
+class TTLCache:
+    """Cache en mémoire par worker, avec expiration."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._data.pop(key, None)
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
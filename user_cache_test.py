@@ -0,0 +1,103 @@
+"""
+Test du cache d'identités de load_user : une désactivation ou un changement
+de mot de passe fait par une autre instance (écriture directe en base, sans
+invalidation locale) est pris en compte dès la requête suivante ; le reste de
+l'identité continue de venir du cache.
+
+    python user_cache_test.py
+    python -m pytest user_cache_test.py
+
+Base SQLite en mémoire (configuration 'testing'). Code de sortie 1 si un
+des tests échoue.
+"""
+import argparse
+import sys
+import traceback
+
+import app as module
+
+db = module.db
+
+_application = None
+
+
+def application():
+    global _application
+    if _application is None:
+        _application = module.create_app('testing')
+        with _application.app_context():
+            db.create_all()
+    return _application
+
+
+def make_user(name):
+    db.session.execute(db.delete(module.User).where(module.User.username == name))
+    db.session.commit()
+    user = module.User(username=name, email=f"{name}@example.bj", is_active=True)
+    user.set_password('mot-de-passe-1')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def load(user_id):
+    """load_user dans une requête neuve, comme Flask-Login."""
+    db.session.remove()
+    return module.load_user(str(user_id))
+
+
+def update_elsewhere(user_id, **values):
+    # Autre instance : la ligne change sans passer par la session ni les marqueurs locaux
+    with db.engine.begin() as connection:
+        connection.execute(db.update(module.User).where(module.User.id == user_id).values(**values))
+
+
+def test_deactivation_seen_on_next_request():
+    with application().test_request_context():
+        user_id = make_user('alice')
+        assert load(user_id).is_active
+        hits = module.user_cache.stats['hits']
+        assert load(user_id).is_active
+        assert module.user_cache.stats['hits'] == hits + 1
+
+        update_elsewhere(user_id, is_active=False)
+        assert not load(user_id).is_active
+        assert not load(user_id).is_active
+
+
+def test_password_change_seen_on_next_request():
+    with application().test_request_context():
+        user_id = make_user('bob')
+        assert load(user_id).check_password('mot-de-passe-1')
+        update_elsewhere(user_id, password_hash=module.generate_password_hash('mot-de-passe-2'))
+        user = load(user_id)
+        assert user.check_password('mot-de-passe-2') and not user.check_password('mot-de-passe-1')
+
+
+def test_deleted_user_not_loaded():
+    with application().test_request_context():
+        user_id = make_user('carol')
+        assert load(user_id) is not None
+        with db.engine.begin() as connection:
+            connection.execute(db.delete(module.User).where(module.User.id == user_id))
+        assert load(user_id) is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    tests = [(name, func) for name, func in globals().items() if name.startswith('test_') and callable(func)]
+    failures = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"OK     {name}")
+        except Exception:
+            failures += 1
+            print(f"ÉCHEC  {name}\n{traceback.format_exc()}")
+    print(f"{len(tests) - failures}/{len(tests)} tests réussis")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
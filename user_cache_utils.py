@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Cache des identités chargées par le user_loader de Flask-Login : à chaque
+# requête authentifiée, la lecture de la ligne user se réduit à deux colonnes
+# relues par clé primaire.
+
+USER_CACHE_TTL = 60          # secondes
+USER_CACHE_MAX_ENTRIES = 10000
+
+
+class UserIdentityCache:
+    """
+    LRU en mémoire avec expiration. Si `invalidation_dir` est fourni (dossier
+    partagé par les workers d'une même machine), une invalidation y dépose un
+    marqueur par utilisateur : les autres processus comparent son horodatage
+    à celui de leur entrée, ce qui ne coûte qu'un stat().
+
+    Les marqueurs ne propagent l'invalidation qu'aux workers de la machine
+    (un dossier local, pas un volume réseau dont l'horloge diffère). Entre
+    instances, load_user relit is_active et password_hash à chaque requête :
+    seuls le nom, l'email ou l'avatar peuvent rester périmés jusqu'à `ttl`
+    secondes.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_entries=USER_CACHE_MAX_ENTRIES, invalidation_dir=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.invalidation_dir = invalidation_dir
+        self._data = OrderedDict()  # user_id -> (expire_à, chargé_à, valeurs)
+        self._invalidated = {}  # user_id -> date de la dernière invalidation locale
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        if invalidation_dir:
+            os.makedirs(invalidation_dir, exist_ok=True)
+
+    def _marker(self, user_id):
+        return os.path.join(self.invalidation_dir, str(user_id))
+
+    def _invalidated_since(self, user_id, loaded_at):
+        if not self.invalidation_dir:
+            return False
+        try:
+            return os.stat(self._marker(user_id)).st_mtime >= loaded_at
+        except FileNotFoundError:
+            return False
+
+    def get(self, user_id):
+        """Valeurs des colonnes de l'utilisateur, ou None si absentes ou périmées."""
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None:
+                self._data.move_to_end(user_id)
+        if entry is None or entry[0] < time.monotonic() or self._invalidated_since(user_id, entry[1]):
+            if entry is not None:
+                with self._lock:
+                    self._data.pop(user_id, None)
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry[2]
+
+    def set(self, user_id, values, loaded_at):
+        """
+        `loaded_at` (time.time()) est pris avant la lecture en base : une
+        invalidation survenue pendant la lecture rend l'entrée aussitôt périmée.
+        """
+        if self._invalidated_since(user_id, loaded_at):
+            return
+        with self._lock:
+            if self._invalidated.get(user_id, 0) >= loaded_at:
+                return
+            self._data[user_id] = (time.monotonic() + self.ttl, loaded_at, values)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, user_id):
+        """Retire une entrée jugée périmée par l'appelant, sans prévenir les autres processus."""
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def invalidate(self, user_ids):
+        now = time.time()
+        with self._lock:
+            for user_id in user_ids:
+                self._data.pop(user_id, None)
+                self._invalidated[user_id] = now
+            if len(self._invalidated) > self.max_entries:
+                # Seules les lectures encore en cours ont besoin de ces dates
+                horizon = now - max(self.ttl, 60)
+                self._invalidated = {k: v for k, v in self._invalidated.items() if v >= horizon}
+        if self.invalidation_dir:
+            for user_id in user_ids:
+                try:
+                    with open(self._marker(user_id), 'a'):
+                        pass
+                    os.utime(self._marker(user_id))
+                except OSError as e:
+                    print(f"Warning: Could not write user cache marker for {user_id}: {e}")
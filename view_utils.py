@@ -0,0 +1,131 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+# Comptage des vues en écriture différée : les vues sont agrégées en mémoire
+# (par worker) puis reportées en base par lots, hors du chemin de la requête.
+
+VIEW_FLUSH_INTERVAL = 10       # secondes entre deux reports
+VIEW_FLUSH_THRESHOLD = 500     # report anticipé au-delà de ce nombre de vues en attente
+VIEW_DEDUP_SECONDS = 30 * 60   # un même visiteur ne compte qu'une fois par fenêtre
+VIEW_DEDUP_MAX_ENTRIES = 50000
+
+BOT_USER_AGENT = re.compile(
+    r'bot|crawl|spider|slurp|preview|facebookexternalhit|headless|curl|wget|python-requests|httpclient',
+    re.IGNORECASE
+)
+
+
+def is_bot(user_agent):
+    return not user_agent or BOT_USER_AGENT.search(user_agent) is not None
+
+
+def visitor_key(user_id, remote_addr, user_agent):
+    """Identifiant de visiteur pour la déduplication (jamais stocké en base)."""
+    if user_id is not None:
+        return f"u:{user_id}"
+    raw = f"{remote_addr}|{user_agent}".encode('utf-8')
+    return 'a:' + hashlib.sha1(raw).hexdigest()[:16]
+
+
+class ViewCounter:
+    """
+    Tampon de vues. `flush_callback(increments)` reçoit un dict {id: nombre}
+    et doit l'appliquer en base ; en cas d'échec les vues sont remises en attente.
+    """
+
+    def __init__(self, flush_callback, interval=VIEW_FLUSH_INTERVAL, threshold=VIEW_FLUSH_THRESHOLD,
+                 dedup_seconds=VIEW_DEDUP_SECONDS, dedup_max_entries=VIEW_DEDUP_MAX_ENTRIES):
+        self.flush_callback = flush_callback
+        self.interval = interval
+        self.threshold = threshold
+        self.dedup_seconds = dedup_seconds
+        self.dedup_max_entries = dedup_max_entries
+        self._pending = {}
+        self._pending_total = 0
+        self._seen = OrderedDict()  # (id, visiteur) -> instant de la dernière vue comptée
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # seuil atteint : report anticipé par le thread de fond
+        self._thread = None
+        self.last_error = None
+        self.stats = {'recorded': 0, 'flushes': 0, 'failed_flushes': 0, 'written': 0}
+
+    def record(self, signalement_id, visitor):
+        """Enregistre une vue ; renvoie False si elle est ignorée (doublon)."""
+        now = time.monotonic()
+        key = (signalement_id, visitor)
+        with self._lock:
+            seen_at = self._seen.get(key)
+            if seen_at is not None and now - seen_at < self.dedup_seconds:
+                return False
+            self._seen[key] = now
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.dedup_max_entries:
+                self._seen.popitem(last=False)
+            self._pending[signalement_id] = self._pending.get(signalement_id, 0) + 1
+            self._pending_total += 1
+            self.stats['recorded'] += 1
+            should_flush = self._pending_total >= self.threshold
+        if should_flush:
+            # Jamais de thread par requête : base lente ou en échec, le seuil
+            # resterait dépassé et chaque vue en lancerait un nouveau
+            self._wake.set()
+        return True
+
+    def pending(self, signalement_id):
+        """Vues comptées mais pas encore reportées en base."""
+        with self._lock:
+            return self._pending.get(signalement_id, 0)
+
+    def flush(self):
+        """Reporte les vues en attente. :return: Le nombre de vues écrites."""
+        with self._flush_lock:
+            with self._lock:
+                increments, self._pending, self._pending_total = self._pending, {}, 0
+            if not increments:
+                return 0
+            try:
+                self.flush_callback(increments)
+                self.last_error = None
+            except Exception as e:
+                print(f"Warning: Could not flush view counts: {e}")
+                self.last_error = e
+                self.stats['failed_flushes'] += 1
+                with self._lock:
+                    for signalement_id, count in increments.items():
+                        self._pending[signalement_id] = self._pending.get(signalement_id, 0) + count
+                        self._pending_total += count
+                return 0
+            written = sum(increments.values())
+            self.stats['flushes'] += 1
+            self.stats['written'] += written
+            return written
+
+    def start(self):
+        """Démarre le report périodique en arrière-plan (une fois par processus, y compris après un fork)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.flush()
+            if self.last_error is not None:
+                # Échec : attendre l'intervalle complet, même si le seuil est dépassé
+                self._stop.wait(self.interval)
+
+    def shutdown(self):
+        """Arrêt du worker : stoppe le report périodique et vide le tampon."""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
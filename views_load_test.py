@@ -0,0 +1,170 @@
+"""
+Test de charge de la page détail d'un signalement et du compteur de vues
+différé (ViewCounter) : des processus lecteurs ouvrent la page la plus
+consultée pendant que des processus écrivains ajoutent des commentaires,
+sur une base SQLite neuve (WAL et file d'écriture). Mesure le débit et la
+latence de la page, et vérifie que chaque vue comptée arrive en base, sans
+« database is locked » au report et sans multiplication des threads.
+
+    python views_load_test.py
+    python views_load_test.py --readers 6 --writers 2 --duration 15
+    python views_load_test.py --threshold 5 --max-threads 8
+
+Code de sortie 1 si des vues sont perdues, si un report échoue ou si un
+lecteur dépasse --max-threads threads actifs.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Exécuté dans un interpréteur neuf ; DATABASE_URL vient du parent
+CHILD_SCRIPT = r'''
+import json, os, sys, threading, time
+from datetime import date
+from sqlalchemy.exc import OperationalError
+import app as module
+
+role, start_at, duration, threshold = sys.argv[1], float(sys.argv[2]), float(sys.argv[3]), int(sys.argv[4])
+application = module.create_app('production')
+application.config['SQL_QUERY_BUDGET'] = None
+db = module.db
+
+if role in ('seed', 'count'):
+    with application.app_context():
+        if role == 'seed':
+            module.init_db('load-test-password')
+            user = module.User.query.first()
+            for i in range(20):
+                db.session.add(module.Signalement(type=('lost', 'found')[i % 2], title=f"Objet {i}",
+                                                  description="Signalement de test", location="Cotonou",
+                                                  date=date(2024, 1 + i % 12, 1 + i % 28), status='active',
+                                                  user_id=user.id))
+            db.session.commit()
+        views = db.session.query(db.func.coalesce(db.func.sum(module.Signalement.views), 0)).scalar()
+    print(json.dumps({'role': role, 'views': views}))
+    sys.exit(0)
+
+with application.app_context():
+    user_id = module.User.query.first().id
+    signalement_ids = [s.id for s in module.Signalement.query.order_by(module.Signalement.id)]
+module.view_counter.threshold = threshold
+client = application.test_client()
+ok, errors, latencies, max_threads = 0, 0, [], 0
+time.sleep(max(0.0, start_at - time.time()))
+deadline = start_at + duration
+i = 0
+while time.time() < deadline:
+    i += 1
+    started = time.perf_counter()
+    if role == 'writer':
+        with application.app_context():
+            try:
+                db.session.add(module.Comment(content=f"Commentaire {i}", user_id=user_id,
+                                              signalement_id=signalement_ids[i % len(signalement_ids)]))
+                db.session.commit()
+                ok += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    else:
+        # Page la plus consultée : trois vues sur quatre ; un visiteur distinct par requête
+        signalement_id = signalement_ids[0] if i % 4 else signalement_ids[i % len(signalement_ids)]
+        response = client.get(f'/signalement/{signalement_id}',
+                              headers={'User-Agent': f"Mozilla/5.0 (charge {os.getpid()}-{i})"})
+        if response.status_code == 200:
+            ok += 1
+        else:
+            errors += 1
+        max_threads = max(max_threads, threading.active_count())
+    latencies.append((time.perf_counter() - started) * 1000)
+if role == 'reader':
+    module.view_counter.shutdown()
+print(json.dumps({'role': role, 'ok': ok, 'errors': errors, 'latencies': latencies,
+                  'max_threads': max_threads, 'views': dict(module.view_counter.stats)}))
+'''
+
+
+def spawn(role, env, start_at, duration, threshold):
+    return subprocess.Popen([sys.executable, '-c', CHILD_SCRIPT,
+                             role, str(start_at), str(duration), str(threshold)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def collect(process):
+    stdout, stderr = process.communicate()
+    if process.returncode:
+        raise SystemExit(f"processus en échec\n{stderr.strip()}")
+    # Les messages de démarrage éventuels précèdent la ligne JSON
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4, help='processus lecteurs de la page détail')
+    parser.add_argument('--writers', type=int, default=2, help='processus écrivains (commentaires)')
+    parser.add_argument('--duration', type=float, default=10.0, help='durée de la charge (secondes)')
+    parser.add_argument('--threshold', type=int, default=20,
+                        help='vues en attente déclenchant un report anticipé (bas : reports fréquents)')
+    parser.add_argument('--max-threads', type=int, default=10, help='threads actifs tolérés par lecteur')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'views.db')}",
+                   USER_CACHE_DIR='', SQL_QUERY_BUDGET='')
+        collect(spawn('seed', env, 0, 0, 0))
+        # Départ commun, une fois tous les interpréteurs démarrés
+        start_at = time.time() + 3
+        processes = ([spawn('reader', env, start_at, args.duration, args.threshold) for _ in range(args.readers)]
+                     + [spawn('writer', env, start_at, args.duration, args.threshold)
+                        for _ in range(args.writers)])
+        results = [collect(process) for process in processes]
+        stored = collect(spawn('count', env, 0, 0, 0))['views']
+
+    read = [r for r in results if r['role'] == 'reader']
+    written = [r for r in results if r['role'] == 'writer']
+    latencies = [ms for r in read for ms in r['latencies']]
+    recorded = sum(r['views']['recorded'] for r in read)
+    report = {
+        'page_views': sum(r['ok'] for r in read),
+        'page_errors': sum(r['errors'] for r in read),
+        'req_per_s': round(sum(r['ok'] for r in read) / args.duration, 1),
+        'median_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+        'comments': sum(r['ok'] for r in written),
+        'comment_errors': sum(r['errors'] for r in written),
+        'views_recorded': recorded,
+        'views_stored': stored,
+        'view_flushes': sum(r['views']['flushes'] for r in read),
+        'failed_view_flushes': sum(r['views']['failed_flushes'] for r in read),
+        'max_threads_per_reader': max(r['max_threads'] for r in read) if read else None,
+    }
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if stored != recorded:
+        failures.append(f"{recorded - stored} vue(s) comptée(s) mais absente(s) de la base")
+    if report['failed_view_flushes']:
+        failures.append(f"{report['failed_view_flushes']} report(s) de vues en échec")
+    if report['page_errors'] or report['comment_errors']:
+        failures.append(f"{report['page_errors']} erreur(s) de page, {report['comment_errors']} de commentaire")
+    if read and report['max_threads_per_reader'] > args.max_threads:
+        failures.append(f"{report['max_threads_per_reader']} threads actifs > {args.max_threads}")
+    for failure in failures:
+        print(f"ÉCHEC : {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())